@@ -0,0 +1,124 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Compares memory use and construction speed of `FRETRequirement` against
+the previous plain (non-slotted, list based) dataclass.
+
+Run with `python benchmarks/requirement_model.py [--count N]`.
+"""
+
+import argparse
+import dataclasses
+import gc
+import time
+import tracemalloc
+
+from fretish_robot.requirements import FRETRequirement, _transform_to_fret_req
+
+
+@dataclasses.dataclass
+class LegacyFRETRequirement:
+    req_id: str
+    requirement_phrase: str
+    scope_mode: str | None
+    trigger_event: str | None
+    timing: str
+    condition_to_check: str
+    variables: list[str]
+
+
+def _legacy_transform(req: dict) -> LegacyFRETRequirement:
+    fulltext = req["fulltext"]
+    semantics = req["semantics"]
+    timing_start, timing_end = semantics["timingTextRange"]
+
+    return LegacyFRETRequirement(
+        req_id=req["reqid"],
+        requirement_phrase=fulltext,
+        scope_mode=semantics["scope_mode"] if semantics["scopeTextRange"] else None,
+        trigger_event=semantics.get("regular_condition_unexp_pt", None),
+        timing=fulltext[timing_start : timing_end + 1],
+        condition_to_check=semantics["post_condition_unexp_ft"],
+        variables=semantics["variables"],
+    )
+
+
+def _requirement_dict(i: int, signal_count: int = 300) -> dict:
+    # fresh string objects per requirement, like `json` decoding returns them
+    signals = [f"signal_{(i * 7 + k) % signal_count}" for k in range(4)]
+    phrase = (
+        f"In mode_{i % 5} mode, upon {signals[0]}, the component shall within "
+        f"200 milliseconds satisfy ({signals[1]} & {signals[2]} = {signals[3]})."
+    )
+    timing_start = phrase.index("within")
+    return {
+        "reqid": f"REQ-{i:06}",
+        "fulltext": phrase,
+        "semantics": {
+            "scope_mode": f"mode_{i % 5}",
+            "scopeTextRange": [0, 12],
+            "regular_condition_unexp_pt": signals[0],
+            "timingTextRange": [timing_start, timing_start + 22],
+            "post_condition_unexp_ft": f"({signals[1]} & ({signals[2]} = {signals[3]}))",
+            "variables": signals,
+        },
+    }
+
+
+def _retained_memory(transform, count: int) -> int:
+    """Memory kept by `count` requirements, with their source dicts dropped."""
+    gc.collect()
+    tracemalloc.start()
+    result = [transform(_requirement_dict(i)) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _transform_time(transform, reqs: list[dict]) -> float:
+    start = time.perf_counter()
+    for req in reqs:
+        transform(req)
+    return time.perf_counter() - start
+
+
+def _construct_only(cls, reqs: list[FRETRequirement]) -> float:
+    # only the fields `cls` has, as the legacy model lacks the newer ones
+    names = [field.name for field in dataclasses.fields(cls)]
+    fields = [tuple(getattr(req, name) for name in names) for req in reqs]
+    start = time.perf_counter()
+    for req in fields:
+        cls(*req)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    reqs = [_requirement_dict(i) for i in range(args.count)]
+
+    for name, transform in [
+        ("legacy dataclass", _legacy_transform),
+        ("FRETRequirement", _transform_to_fret_req),
+    ]:
+        size = _retained_memory(transform, args.count)
+        duration = _transform_time(transform, reqs)
+        print(
+            f"{name:>20}: {size / args.count:8.1f} bytes/requirement, "
+            f"transform {duration * 1e6 / args.count:6.2f} us/requirement"
+        )
+
+    fret_reqs = [_transform_to_fret_req(req) for req in reqs]
+    for name, cls in [
+        ("legacy dataclass", LegacyFRETRequirement),
+        ("FRETRequirement", FRETRequirement),
+    ]:
+        duration = _construct_only(cls, fret_reqs)
+        print(f"{name:>20}: construct {duration * 1e6 / args.count:6.2f} us/object")
+
+
+if __name__ == "__main__":
+    main()
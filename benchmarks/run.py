@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks of the generation and execution hot paths.
+
+Times loading, generating and writing synthetic FRET exports of each size, and
+the `Satisfy` and `Within` keywords against `ExampleUserLib`. Each benchmark
+runs `--repeat` times, the fastest run counts.
+
+Run with `python benchmarks/run.py --output results.json`, and compare a later
+run against it with `python benchmarks/run.py --compare results.json`, which
+fails if a benchmark got slower by more than `--tolerance`.
+"""
+
+import argparse
+import io
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+import robot
+from robot.api import TestSuite
+from synthetic import synthetic_export
+
+from fretish_robot.generate_robot import generate_robot_suite_from_fret
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.writer import write_requirements, write_testsuite
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+KEYWORD_ITERATIONS = 1000
+USER_LIB = "fretish_robot.example_user_lib.ExampleUserLib"
+
+
+def _best_time(func: Callable[[], object], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def benchmark_generation(size: int, repeat: int, work_dir: pathlib.Path) -> dict:
+    export_path = work_dir / f"export_{size}.json"
+    with open(export_path, "w") as export_file:
+        json.dump(synthetic_export(size), export_file)
+
+    reqs = load_fret_requirements(export_path)
+    suite = generate_robot_suite_from_fret(reqs, [USER_LIB])
+    output_dir = work_dir / f"robot_files_{size}"
+
+    return {
+        f"load_fret_requirements[{size}]": _best_time(
+            lambda: load_fret_requirements(export_path), repeat
+        ),
+        f"generate_robot_suite_from_fret[{size}]": _best_time(
+            lambda: generate_robot_suite_from_fret(reqs, [USER_LIB]), repeat
+        ),
+        f"write_testsuite[{size}]": _best_time(
+            lambda: write_testsuite(suite, output_dir), repeat
+        ),
+        # the fast path of `fret-to-robot`, generating and writing in one go
+        f"write_requirements[{size}]": _best_time(
+            lambda: write_requirements(reqs, [USER_LIB], output_dir), repeat
+        ),
+    }
+
+
+def _keyword_loop_time(keyword: str, *args: str) -> float:
+    """Seconds per call of `keyword` with `args`, run in a loop by Robot."""
+    suite = TestSuite("Benchmark")
+    suite.resource.imports.library("fretish_robot.FRETLib")
+    suite.resource.imports.library(USER_LIB)
+    test = suite.tests.create("Loop")
+    loop = test.body.create_for(
+        assign=["${i}"], flavor="IN RANGE", values=[str(KEYWORD_ITERATIONS)]
+    )
+    loop.body.create_keyword(keyword, args=args)
+
+    result = suite.run(output=None, log=None, report=None, stdout=io.StringIO())
+    test_result = result.suite.tests[0]
+    if not test_result.passed:
+        raise RuntimeError(f"Benchmark of {keyword} failed: {test_result.message}")
+    return test_result.elapsed_time.total_seconds() / KEYWORD_ITERATIONS
+
+
+def benchmark_keywords(repeat: int) -> dict:
+    satisfiable = "when $get_true then ($result == 0)"
+    return {
+        "satisfy": min(
+            _keyword_loop_time("Satisfy", satisfiable) for _ in range(repeat)
+        ),
+        "within": min(
+            _keyword_loop_time("Within", "1 second", "Satisfy", satisfiable)
+            for _ in range(repeat)
+        ),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns the benchmarks of `results` slower than in `baseline` by more
+    than `tolerance` (a fraction), printing all ratios."""
+    regressions = []
+    for name, duration in results.items():
+        if name not in baseline:
+            print(f"{name:>45}: {duration * 1000:10.3f} ms (no baseline)")
+            continue
+
+        ratio = duration / baseline[name]
+        marker = ""
+        if ratio > 1 + tolerance:
+            marker = "  <-- slower"
+            regressions.append(name)
+        print(f"{name:>45}: {duration * 1000:10.3f} ms, {ratio:5.2f}x baseline{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, metavar="SIZE"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON file of a run")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline, as fraction (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            results.update(
+                benchmark_generation(size, args.repeat, pathlib.Path(work_dir))
+            )
+    results.update(benchmark_keywords(args.repeat))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "robotframework": robot.version.VERSION,
+                    "results": results,
+                },
+                output_file,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, duration in results.items():
+            print(f"{name:>45}: {duration * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Synthetic FRET exports for benchmarks.
+
+The requirements vary like real exports: without scope, with one or several
+`|`-separated modes, with one or several `|`-separated triggers, different
+timings and nested conditions over a shared set of signals.
+
+Run with `python benchmarks/synthetic.py COUNT OUTPUT_JSON` to write an export.
+"""
+
+import argparse
+import json
+import random
+
+TIMINGS = [
+    "within 200 milliseconds",
+    "within 1 second",
+    "after 100 milliseconds",
+    "immediately",
+    "at the next timepoint",
+    "always",
+]
+
+
+def _condition(rng: random.Random, signals: list[str], depth: int) -> str:
+    if depth == 0:
+        left, right = rng.sample(signals, 2)
+        return rng.choice(
+            [left, f"(! {left})", f"({left} = {right})", f"({left} <= {right} + 10)"]
+        )
+
+    left = _condition(rng, signals, depth - 1)
+    right = _condition(rng, signals, depth - 1)
+    return f"({left} {rng.choice(['&', '|', '->'])} {right})"
+
+
+def _disjunction(names: list[str], separator: str = " | ") -> str:
+    if len(names) == 1:
+        return names[0]
+    return "(" + separator.join(names) + ")"
+
+
+def synthetic_requirement(i: int, rng: random.Random, signal_count: int = 500) -> dict:
+    """Returns the FRET export entry of the `i`th synthetic requirement."""
+    signals = [f"signal_{rng.randrange(signal_count)}" for _ in range(8)]
+    modes = [f"mode_{rng.randrange(20)}" for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+    triggers = [
+        f"request_{rng.randrange(100)}" for _ in range(rng.choice([1, 1, 2, 3]))
+    ]
+    timing = rng.choice(TIMINGS)
+    condition = _condition(rng, signals, rng.choice([0, 1, 2, 3]))
+
+    scope = ""
+    scope_mode = ""
+    if modes:
+        # FRET quotes several modes, without spaces around `|`
+        scope_mode = f'"{_disjunction(modes, "|")}"' if len(modes) > 1 else modes[0]
+        scope = f"In {scope_mode} mode, "
+    trigger = _disjunction(triggers)
+    prefix = f"{scope}upon {trigger}, the component shall "
+    phrase = f"{prefix}{timing} satisfy {condition}."
+    timing_start = len(prefix)
+
+    return {
+        "reqid": f"REQ-{i:06}",
+        "parent_reqid": "",
+        "project": "Benchmark",
+        "rationale": "",
+        "fulltext": phrase,
+        "semantics": {
+            "type": "nasa",
+            "scope": {"type": "in" if modes else "null"},
+            "scope_mode": scope_mode,
+            "scopeTextRange": [0, len(scope) - 3] if modes else None,
+            "condition": "regular",
+            "regular_condition_unexp_pt": trigger,
+            "timing": timing.split()[0],
+            "timingTextRange": [timing_start, timing_start + len(timing) - 1],
+            "post_condition_unexp_ft": condition,
+            "variables": sorted(set(signals + modes + triggers)),
+            "ft": f"(LAST V {condition})",
+        },
+    }
+
+
+def synthetic_export(count: int, seed: int = 0) -> list[dict]:
+    """Returns a FRET export with `count` synthetic requirements."""
+    rng = random.Random(seed)
+    return [synthetic_requirement(i, rng) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("count", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, "w") as output_file:
+        json.dump(synthetic_export(args.count, args.seed), output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
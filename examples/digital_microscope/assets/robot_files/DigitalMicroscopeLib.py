@@ -1,20 +1,53 @@
 # SPDX-FileCopyrightText: Copyright (c) 2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+import threading
 
-from robot.api.deco import keyword, library
+from robot.api.deco import keyword, library, not_keyword
 from robot.libraries.BuiltIn import BuiltIn
 
+from fretish_robot.devices import current_device
+from fretish_robot.signals import SHARED_SCOPE_METADATA
+from fretish_robot.snapshot import snapshot_cached
+
 ZEPHYR_LIB_NAME = "twister_harness.robot_framework.ZephyrLibrary"
 
 FAIL_INDICATORS = ["Usage:", "command not found", "Unknown", "Failed:", "Denied:"]
 
+# Signals that can be computed from the output of `system status`
+STATUS_SIGNALS = {
+    "tube_moving_upwards",
+    "tube_moving_downwards",
+    "tube_moving",
+    "tube_position_hold",
+    "tube_upper_end",
+    "tube_at_upper_end",
+    "tube_bottom_end",
+    "tube_at_bottom_end",
+    "illumination_on",
+    "actual_brightness",
+    "configured_brightness",
+    "max_brightness",
+    "min_brightness",
+    "configured_brightness_increased_by_10_percent",
+    "objective_lense_changed_clockwise_ok",
+}
+
+# Signals that only depend on the commands of the test, not on the device state
+ANSWER_SIGNALS = {"answer_request_ok", "answer_request_denied"}
+
 
 @library(scope="SUITE", listener="SELF")
 class DigitalMicroscopeLib:
+    # The signals `sample_signals` returns, for `fret-to-robot --check`
+    SAMPLED_SIGNALS = STATUS_SIGNALS
+
     def __init__(self):
         self._requests = []
         self._responses = []
+        self._shared_scope = None
+        # Monitors of `Always` and the like sample from background threads
+        self._device_lock = threading.Lock()
 
         self._builtin = BuiltIn()
 
@@ -22,11 +55,28 @@ class DigitalMicroscopeLib:
         self._builtin.import_library(ZEPHYR_LIB_NAME)
         self._lib = self._builtin.get_library_instance(ZEPHYR_LIB_NAME)
 
+        port = self._device_port()
+        if port is not None:
+            # `Get a device` of the Zephyr library connects to this serial port
+            self._builtin.set_suite_variable("${DEVICE_SERIAL}", port)
         self._builtin.run_keyword("Get a device")
         self._builtin.run_keyword("Run device")
 
+    def _device_port(self) -> str | None:
+        # The port of the device given by `fret-run-devices`, e.g. with
+        # `--device dut1:PORT=/dev/ttyUSB0`, or by `robot --variable DEVICE:...`.
+        # Without either, e.g. for simulators, the Zephyr library picks the device.
+        device = current_device()
+        if device is not None:
+            return dict(device.variables).get("PORT")
+        return self._builtin.get_variable_value("${DEVICE}")
+
     def _start_test(self, testcase, result):
-        self._exec("system reset")
+        # Tests grouped by scope share the mode entered by their suite and only
+        # reset their signals in their setup, see `reset_signals`
+        self._shared_scope = testcase.parent.metadata.get(SHARED_SCOPE_METADATA)
+        if self._shared_scope is None:
+            self._exec("system reset")
 
         self._requests.clear()
         self._responses.clear()
@@ -44,31 +94,48 @@ class DigitalMicroscopeLib:
 
     @keyword
     def tube_moving_upwards(self):
-        res = self._exec("tube move get dir", check_command=True)
+        res = self._query("tube move get dir", check_command=True)
         return self._search_for_response("Tube is moving upwards", res)
 
     @keyword
     def tube_moving_downwards(self):
-        res = self._exec("tube move get dir", check_command=True)
+        res = self._query("tube move get dir", check_command=True)
         return self._search_for_response("Tube is moving downwards", res)
 
+    @keyword
+    def tube_moving(self):
+        return self.tube_moving_upwards() or self.tube_moving_downwards()
+
+    @keyword
+    def tube_position_hold(self):
+        res = self._query("tube move get dir", check_command=True)
+        return self._search_for_response("Tube is on hold", res)
+
     @keyword("tube_upper_end")
     def tube_upper_end(self):
-        res = self._exec("tube position is_upper")
+        res = self._query("tube position is_upper")
         return self._search_for_response("Tube is in the upper position", res)
 
+    @keyword
+    def tube_at_upper_end(self):
+        return self.tube_upper_end()
+
     @keyword("tube_bottom_end")
     def tube_bottom_end(self):
-        res = self._exec("tube position is_bottom")
+        res = self._query("tube position is_bottom")
         return self._search_for_response("Tube is in the bottom position", res)
 
+    @keyword
+    def tube_at_bottom_end(self):
+        return self.tube_bottom_end()
+
     @keyword("request_illuminate_${onoff}")
     def request_illuminate_onoff(self, onoff):
         self._exec(f"illumination active {onoff}", check_command=True)
 
     @keyword
     def illumination_on(self):
-        res = self._exec("illumination active get")
+        res = self._query("illumination active get")
         return self._search_for_response("Illumination is on", res)
 
     @keyword
@@ -77,7 +144,7 @@ class DigitalMicroscopeLib:
 
     @keyword
     def configured_brightness(self):
-        res = self._exec("illumination value get configured", check_command=True)
+        res = self._query("illumination value get configured", check_command=True)
         if not self._search_for_response("Configured illumination value", res):
             return False
         value = self._extract_brightness_value(res)
@@ -85,7 +152,7 @@ class DigitalMicroscopeLib:
 
     @keyword
     def actual_brightness(self):
-        res = self._exec("illumination value get actual", check_command=True)
+        res = self._query("illumination value get actual", check_command=True)
         if not self._search_for_response("Actual illumination value", res):
             return False
         value = self._extract_brightness_value(res)
@@ -93,12 +160,20 @@ class DigitalMicroscopeLib:
 
     @keyword
     def max_brightness(self):
-        res = self._exec("illumination value get max", check_command=True)
+        res = self._query("illumination value get max", check_command=True)
         if not self._search_for_response("Maximum illumination value", res):
             return False
         value = self._extract_brightness_value(res)
         return value
 
+    @keyword
+    def min_brightness(self):
+        res = self._query("illumination value get min", check_command=True)
+        if not self._search_for_response("Minimum illumination value", res):
+            return False
+        value = self._extract_brightness_value(res)
+        return value
+
     def _extract_brightness_value(self, res: list[str]) -> int:
         content_line = res[1]
         if not self._search_for_response("illumination value:", [content_line]):
@@ -118,11 +193,11 @@ class DigitalMicroscopeLib:
 
     @keyword
     def objective_lense_changed_clockwise_ok(self):
-        res = self._exec("objective get")
+        res = self._query("objective get")
         if not self._search_for_response("Current objective", res):
             return False
         cur_value = int(res[1].split(":")[1].strip())
-        res = self._exec("objective history")
+        res = self._query("objective history")
         if not self._search_for_response("Previous objectives", res):
             return False
         prev_value = int(res[1].split(":")[1].strip().split()[0])
@@ -143,12 +218,83 @@ class DigitalMicroscopeLib:
 
         return False
 
-    def _exec(self, command: str, check_command: bool = False) -> list[str]:
-        self._requests.append(command)
-        command_responses = self._builtin.run_keyword("Run command", command)
-        self._responses.append(command_responses)
+    @not_keyword
+    def sample_signals(self, names: list[str]) -> dict:
+        """Samples all known signals of `names` with a single `system status` command.
+
+        Called by FRETLib once per evaluation, also from the background monitors
+        of `Always`, `Never` and `Eventually`. Other signals are run as keywords.
+        """
+        batched = [name for name in names if name in STATUS_SIGNALS]
+        if not batched:
+            return {}
+
+        res = self._query("system status", check_command=True)
+
+        def has(term):
+            return self._search_for_response(term, res)
+
+        def number(term, index=0):
+            for line in res:
+                if term in line:
+                    return int(line.split(":")[1].split()[index])
+            raise AssertionError(f"'{term}' missing in the status")
+
+        values = {
+            "tube_moving_upwards": lambda: has("Tube is moving upwards"),
+            "tube_moving_downwards": lambda: has("Tube is moving downwards"),
+            "tube_moving": lambda: has("Tube is moving"),
+            "tube_position_hold": lambda: has("Tube is on hold"),
+            "tube_upper_end": lambda: has("Tube is in the upper position"),
+            "tube_at_upper_end": lambda: has("Tube is in the upper position"),
+            "tube_bottom_end": lambda: has("Tube is in the bottom position"),
+            "tube_at_bottom_end": lambda: has("Tube is in the bottom position"),
+            "illumination_on": lambda: has("Illumination is on"),
+            "actual_brightness": lambda: number("Actual illumination value"),
+            "configured_brightness": lambda: number("Configured illumination value"),
+            "max_brightness": lambda: number("Maximum illumination value"),
+            "min_brightness": lambda: number("Minimum illumination value"),
+            "configured_brightness_increased_by_10_percent": lambda: (
+                number("Actual illumination value") * 11
+                == number("Configured illumination value") * 10
+            ),
+            "objective_lense_changed_clockwise_ok": lambda: (
+                (number("Current objective") - number("Previous objectives")) % 5 == 1
+            ),
+        }
+        return {name: values[name]() for name in batched}
+
+    @not_keyword
+    def reset_signals(self, names: list[str]):
+        """Called by `Reset Signals` of FRETLib. The answer signals depend on the
+        commands of the test, all other signals on the device state, e.g. the tube
+        motion left by the previous test, which is reset in the suite's mode."""
+        if set(names) - ANSWER_SIGNALS:
+            self._exec("system reset")
+            if self._shared_scope is not None:
+                self.in_mode_name_mode(self._shared_scope)
+        self._requests.clear()
+        self._responses.clear()
+
+    # Signals sharing a query, like `configured_brightness` and
+    # `configured_brightness_increased_by_10_percent`, only send it once per timepoint.
+    # Queries are not requests, so `answer_request_*` keep checking the last request.
+    @snapshot_cached
+    def _query(self, command: str, check_command: bool = False) -> list[str]:
+        return self._exec(command, check_command, request=False)
+
+    def _exec(
+        self, command: str, check_command: bool = False, request: bool = True
+    ) -> list[str]:
+        # The Zephyr library is called directly instead of its `Run command`
+        # keyword, as keywords can not run in the threads of monitors
+        with self._device_lock:
+            command_responses = self._lib.run_command(command)
+        if request:
+            self._requests.append(command)
+            self._responses.append(command_responses)
         if check_command:
-            error = self._check_last_command_success()
+            error = self._check_command_success(command_responses)
             if error is not None:
                 assert (
                     False
@@ -156,9 +302,11 @@ class DigitalMicroscopeLib:
         return command_responses
 
     def _check_last_command_success(self) -> str | None:
-        last_response_lines = self._responses[-1]
+        return self._check_command_success(self._responses[-1])
+
+    def _check_command_success(self, response_lines: list[str]) -> str | None:
         for fail_indicator in FAIL_INDICATORS:
-            for response_line in last_response_lines:
+            for response_line in response_lines:
                 if fail_indicator in response_line:
                     return response_line
 
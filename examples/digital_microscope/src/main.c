@@ -24,6 +24,7 @@ enum illumination_state {
   ILLUMINATION_OFF
 };
 
+static const int min_illumination_value = 0;
 static const int max_illumination_value = 100;
 
 enum tube_movement_state { TUBE_HOLD, TUBE_MOVING_UP, TUBE_MOVING_DOWN };
@@ -130,6 +131,12 @@ static int cmd_illumination_value_get_max(const struct shell *shell,
   return 0;
 }
 
+static int cmd_illumination_value_get_min(const struct shell *shell,
+                                          size_t argc, char **argv) {
+  shell_print(shell, "Minimum illumination value: %d", min_illumination_value);
+  return 0;
+}
+
 static int cmd_illumination_value_increase(const struct shell *shell,
                                            size_t argc, char **argv) {
   // Increase by 10%
@@ -149,7 +156,8 @@ static int cmd_illumination_value_get(const struct shell *shell, size_t argc,
                                       char **argv) {
 
   if (argc < 2) {
-    shell_print(shell, "Usage: illumination value get <actual|configured|max>");
+    shell_print(shell,
+                "Usage: illumination value get <actual|configured|max|min>");
     return -EINVAL;
   }
 
@@ -159,6 +167,8 @@ static int cmd_illumination_value_get(const struct shell *shell, size_t argc,
     return cmd_illumination_value_get_configured(shell, argc, argv);
   } else if (strcmp(argv[1], "max") == 0) {
     return cmd_illumination_value_get_max(shell, argc, argv);
+  } else if (strcmp(argv[1], "min") == 0) {
+    return cmd_illumination_value_get_min(shell, argc, argv);
   } else {
     shell_print(shell, "Unknown parameter: %s", argv[1]);
     return -EINVAL;
@@ -181,11 +191,7 @@ static void update_tube_height() {
   }
 }
 
-static int cmd_tube_position_is_upper(const struct shell *shell, size_t argc,
-                                      char **argv) {
-  // simulate tube movement by calls
-  update_tube_height();
-
+static void print_tube_position_upper(const struct shell *shell) {
   if (state.tube_height == tube_max_height) {
     shell_print(shell, "Tube is in the upper position (height: %d)",
                 state.tube_height);
@@ -193,14 +199,9 @@ static int cmd_tube_position_is_upper(const struct shell *shell, size_t argc,
     shell_print(shell, "Tube is not in the upper position (current height: %d)",
                 state.tube_height);
   }
-  return 0;
 }
 
-static int cmd_tube_position_is_bottom(const struct shell *shell, size_t argc,
-                                       char **argv) {
-  // simulate tube movement by calls
-  update_tube_height();
-
+static void print_tube_position_bottom(const struct shell *shell) {
   if (state.tube_height == tube_min_height) {
     shell_print(shell, "Tube is in the bottom position (height: %d)",
                 state.tube_height);
@@ -209,6 +210,21 @@ static int cmd_tube_position_is_bottom(const struct shell *shell, size_t argc,
                 "Tube is not in the bottom position (current height: %d)",
                 state.tube_height);
   }
+}
+
+static int cmd_tube_position_is_upper(const struct shell *shell, size_t argc,
+                                      char **argv) {
+  // simulate tube movement by calls
+  update_tube_height();
+  print_tube_position_upper(shell);
+  return 0;
+}
+
+static int cmd_tube_position_is_bottom(const struct shell *shell, size_t argc,
+                                       char **argv) {
+  // simulate tube movement by calls
+  update_tube_height();
+  print_tube_position_bottom(shell);
   return 0;
 }
 
@@ -293,6 +309,26 @@ static int cmd_system_reset(const struct shell *shell, size_t argc,
   return 0;
 }
 
+// Prints the output of all state queries at once, so a test can sample every
+// signal with a single command. The tube moves one step per status, like per
+// position query.
+static int cmd_system_status(const struct shell *shell, size_t argc,
+                             char **argv) {
+  update_tube_height();
+
+  cmd_illumination_active_get(shell, argc, argv);
+  cmd_illumination_value_get_actual(shell, argc, argv);
+  cmd_illumination_value_get_configured(shell, argc, argv);
+  cmd_illumination_value_get_max(shell, argc, argv);
+  cmd_illumination_value_get_min(shell, argc, argv);
+  print_tube_position_upper(shell);
+  print_tube_position_bottom(shell);
+  cmd_tube_move_get(shell, argc, argv);
+  cmd_objective_get(shell, argc, argv);
+  cmd_objective_history(shell, argc, argv);
+  return 0;
+}
+
 SHELL_STATIC_SUBCMD_SET_CREATE(subcmd_mode,
                                SHELL_CMD(set, NULL, "Set mode", cmd_mode_set),
                                SHELL_SUBCMD_SET_END);
@@ -350,6 +386,8 @@ SHELL_STATIC_SUBCMD_SET_CREATE(
 SHELL_STATIC_SUBCMD_SET_CREATE(subcmd_system,
                                SHELL_CMD(reset, NULL, "Reboot the system",
                                          cmd_system_reset),
+                               SHELL_CMD(status, NULL, "Print the whole state",
+                                         cmd_system_status),
                                SHELL_SUBCMD_SET_END);
 
 SHELL_CMD_REGISTER(mode, &subcmd_mode, "Mode management", NULL);
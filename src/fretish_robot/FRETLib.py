@@ -1,12 +1,54 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
+import json
+import pathlib
 import re
+from typing import Any
 
+from robot.api import logger
 from robot.api.deco import keyword
-from robot.libraries.BuiltIn import BuiltIn
+from robot.errors import ExecutionFailed
+from robot.utils import timestr_to_secs
 
-VAREXPR_RE = re.compile(r"\$([\w_]+)")
+from fretish_robot.clock import Clock, current_clock, make_clock, use_clock
+from fretish_robot.monitors import Monitor
+from fretish_robot.polling import PollingStrategy
+from fretish_robot.profiler import profile_section
+from fretish_robot.satisfiable import CompiledSatisfiable, compile_satisfiable
+from fretish_robot.signals import (
+    RESET_METHOD,
+    SIGNAL_CHANGES,
+    SignalReader,
+    SignalSampler,
+    find_library_hooks,
+    find_signal_samplers,
+    resolve_signal_reader,
+    sample_signals,
+)
+from fretish_robot.snapshot import timepoint
+from fretish_robot.timings import TimingRecord, TimingRecorder
+
+
+def _is_satisfy(keyword_name: str) -> bool:
+    return keyword_name.lower().replace(" ", "").replace("_", "") == "satisfy"
+
+
+def _condition_variables(keyword_name: str, keyword_args: tuple) -> tuple[str, ...]:
+    """Returns the signals of the `Satisfy` condition in a keyword call."""
+    call = [keyword_name, *keyword_args]
+    for position, name in enumerate(call[:-1]):
+        if _is_satisfy(name):
+            return compile_satisfiable(call[position + 1]).variables
+    return ()
+
+
+def _background_read_error(signal: str) -> str:
+    return (
+        f"Signal '${signal}' is not a keyword of a Python library, "
+        "so it can not be sampled in the background"
+    )
 
 
 class FRETLib:
@@ -18,27 +60,253 @@ class FRETLib:
 
     Please note that it only provides the FRET keyword implementation, not the
     behaviour for keywords regarding the SuT.
+
+    How `Within` samples its condition can be configured when importing the
+    library, see `Set Within Polling` for the arguments. `monitor_interval` is
+    the time between two samples of `Always`, `Never`, `Eventually` and
+    `Holds For`. `monitor_window` is how long `Always`, `Never` and `Eventually`
+    observe their condition, unless the `${FRET_MONITOR_WINDOW}` variable is
+    set, e.g. with `robot --variable FRET_MONITOR_WINDOW:5s`.
+
+    The latencies of the timing keywords are measured per `REQID` tag and
+    summarized in the suite metadata. If `timing_output` is a directory (e.g.
+    `${OUTPUT DIR}`), they are also written to
+    `<suite>.fret_timings.json` and `.csv` there at the end of each suite.
+
+    If `trace_output` is a directory, all sampled signal values, `Upon` events
+    and `In ... mode` keywords are recorded with their time and written to
+    `<suite>.fret_trace.json` there at the end of each suite, to check the
+    requirements' formulas offline with `fret-check-trace`.
+
+    `keyword_table` is the `keyword_table.json` written by
+    `fret-to-robot --check`. Signals and events are then run by the qualified
+    keyword names resolved there.
+
+    With `clock=virtual`, the timing keywords run on a virtual clock, e.g.
+    against a simulated SUT: `After` and the waits of `Within` advance it
+    instead of sleeping, so timeframes pass instantly in the order they would
+    have passed. See `fretish_robot.clock` for how a simulation uses it.
     """
 
-    def __init__(self) -> None:
-        self.built_in = BuiltIn()
+    ROBOT_LIBRARY_SCOPE = "SUITE"
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(
+        self,
+        backoff: str = "capped",
+        poll_interval: str = "1 ms",
+        max_poll_interval: str = "50 ms",
+        push: bool = False,
+        monitor_interval: str = "10 ms",
+        monitor_window: str = "1 s",
+        timing_output: str | None = None,
+        keyword_table: str | None = None,
+        trace_output: str | None = None,
+        clock: str | None = None,
+    ) -> None:
+        # Installed with the first keyword, as Robot Framework may create several
+        # instances on import, and restored at the end of the suite
+        self._suite_clock = make_clock(clock) if clock is not None else None
+        self._previous_clock: Clock | None = None
+
+        # The library is also a listener, to evaluate the monitors at test end
+        # and to report the timings at suite end
+        self.ROBOT_LIBRARY_LISTENER = self
+
+        self._polling = PollingStrategy()
+        self.set_within_polling(backoff, poll_interval, max_poll_interval, push)
+
+        self._keyword_table: dict[str, str] = {}
+        if keyword_table is not None:
+            with open(keyword_table) as table_file:
+                self._keyword_table = json.load(table_file)
+
+        self._signal_readers: dict[str, SignalReader | None] = {}
+        self._signal_samplers: list[SignalSampler] | None = None
+
+        self._monitor_interval = timestr_to_secs(monitor_interval)
+        self._monitor_window = monitor_window
+        self._monitors: list[Monitor] = []
+
+        self._timings = TimingRecorder()
+        self._timing_output = timing_output
+        self._test_name = ""
+        self._req_id = ""
+        self._triggered: float | None = None
+        self._combinations = 0
+
+        self._trace_output = trace_output
+        self._trace = None
+        if trace_output is not None:
+            # only imported when recording, like the other optional parts
+            from fretish_robot.traces import TraceRecorder
+
+            self._trace = TraceRecorder()
+
+    @functools.cached_property
+    def built_in(self):
+        # created on first use, Robot Framework creates several instances on import
+        from robot.libraries.BuiltIn import BuiltIn
+
+        return BuiltIn()
+
+    def set_within_polling(
+        self,
+        backoff: str = "capped",
+        poll_interval: str = "1 ms",
+        max_poll_interval: str = "50 ms",
+        push: bool = False,
+    ):
+        """Sets how `Within` samples its condition, for the rest of the suite.
+
+        `backoff` is `fixed` (every `poll_interval`), `exponential` (doubling the
+        interval after each sample, starting at `poll_interval`) or `capped`
+        (like `exponential`, but at most `max_poll_interval`).
+
+        With `push`, `Within` only samples again when a user library reports a
+        change of one of the condition's signals with
+        `fretish_robot.signals.signal_changed`, and at the end of the timeframe.
+        """
+        self._polling = PollingStrategy(
+            backoff=backoff,
+            interval=timestr_to_secs(poll_interval),
+            max_interval=timestr_to_secs(max_poll_interval),
+            push=push,
+        )
+
+    # not named `reset_signals`, which would make FRETLib a hook itself
+    @keyword("Reset Signals")
+    def reset_signal_state(self, *names):
+        """Resets the state behind the signals `names`, e.g. in the `[Setup]` of
+        tests grouped by scope, which share the mode entered by the suite.
+
+        Calls `reset_signals(names)` of all user libraries implementing it; what
+        is reset is up to them.
+        """
+        for reset in find_library_hooks(RESET_METHOD):
+            reset(list(names))
+
+    def check_combination(self, scope, trigger, keyword, *keyword_args):
+        """Checks one row of a data-driven test generated with `--template`.
+
+        Enters the `scope` mode and runs `Upon` for each of the `&`-separated
+        events of `trigger`, unless they are `always`, then runs `keyword` with
+        `keyword_args`, and waits for its monitors like `Wait For Monitors`.
+        Before every row but the first, the signals of the condition are reset
+        like with `Reset Signals`, as the rows share one test.
+        """
+        if self._combinations:
+            self.reset_signal_state(*_condition_variables(keyword, keyword_args))
+        self._combinations += 1
+        self._triggered = None
+
+        if scope != "always":
+            self.built_in.run_keyword(self._qualified(f"In {scope} mode"))
+        if trigger != "always":
+            for event in trigger.split("&"):
+                self.upon(event.strip())
+        self.built_in.run_keyword(keyword, *keyword_args)
+        self.wait_for_monitors()
 
     def upon(self, event_name):
-        """Runs the `event_name` keyword. Like `Run Keyword` but for FRET read"""
-        self.built_in.run_keyword(event_name)
+        """Runs the `event_name` keyword. Like `Run Keyword` but for FRET read
+
+        Latencies of the following timing keywords are measured from its start.
+        """
+        self._triggered = self._clock.now()
+        if self._trace is not None:
+            self._trace.add_event(event_name, self._triggered)
+        self.built_in.run_keyword(self._qualified(event_name))
 
     def within(self, timeframe, keyword, *keyword_args):
         """Check that `keyword` called with `keyword_args` holds true
           during a timeframe. `keyword` must a `satisfy`.
 
-        This is done by using the 'wait_until_keyword_succeeds" keyword with a
-        sleep of 0, making it executing 'keyword' during the timeframe and wait until
-        it succeeds.
+        The condition is sampled until it holds or the timeframe is over, with the
+        backoff set by `Set Within Polling`. Only the final failing sample is
+        reported; signals of library keywords are read without logging each sample.
 
         Note: Right now, only expressions of 'within     xxx (milli)seconds' are supported,
-        other forms of within will be implemented soon.
+        other forms of within will be implemented soon. Other keywords than
+        `satisfy` are retried in real time, also with a virtual clock.
         """
-        self.built_in.wait_until_keyword_succeeds(timeframe, 0, keyword, *keyword_args)
+        if not _is_satisfy(keyword) or len(keyword_args) != 1:
+            interval = next(self._polling.intervals())
+            self.built_in.wait_until_keyword_succeeds(
+                timeframe, interval, keyword, *keyword_args
+            )
+            return
+
+        compiled = compile_satisfiable(keyword_args[0])
+        clock = self._clock
+        start = clock.now()
+        deadline = start + timestr_to_secs(timeframe)
+        intervals = self._polling.intervals()
+        samples = 0
+
+        while True:
+            version = SIGNAL_CHANGES.version
+            samples += 1
+            values, error = self._check(compiled)
+            if error is None:
+                satisfied = clock.now()
+                self._record_timing("Within", start, start, satisfied, deadline)
+                logger.info(
+                    f"Satisfied after {samples} samples in {satisfied - start:.3f} s, "
+                    f"{deadline - satisfied:.3f} s before the deadline"
+                )
+                return
+
+            remaining = deadline - clock.now()
+            if remaining <= 0:
+                break
+            with profile_section("sleep"):
+                if self._polling.push:
+                    clock.wait_for_change(compiled.variables, version, remaining)
+                else:
+                    clock.sleep(min(next(intervals), remaining))
+
+        self._record_timing("Within", start, start, None, deadline)
+        self._set_diagnostic_variables(values)
+        raise AssertionError(
+            f"Not satisfied within {timeframe} ({samples} samples). "
+            f"The last error was: {error}"
+        )
+
+    def always(self, keyword, satisfiable: str, window: str | None = None):
+        """Checks that `satisfiable` holds from now on for `window`.
+
+        `keyword` must be a `satisfy`. The condition is sampled in the background
+        while the test continues, the test fails at its end if any sample did not
+        hold. Hence, all signals must be keywords of Python libraries, which can be
+        called from another thread.
+
+        Sampling stops after `window`, which defaults to `${FRET_MONITOR_WINDOW}`
+        or the `monitor_window` of the library import, or at the end of the test.
+        Use `Wait For Monitors` to observe the whole window.
+        """
+        self._start_monitor("always", keyword, satisfiable, self._window(window))
+
+    def never(self, keyword, satisfiable: str, window: str | None = None):
+        """Checks that `satisfiable` does not hold from now on for `window`.
+
+        Like `Always`, but the test fails if any sample holds.
+        """
+        self._start_monitor("never", keyword, satisfiable, self._window(window))
+
+    def eventually(self, keyword, satisfiable: str, window: str | None = None):
+        """Checks that `satisfiable` holds at some point within `window`.
+
+        Like `Always`, but the test fails if no sample holds.
+        """
+        self._start_monitor("eventually", keyword, satisfiable, self._window(window))
+
+    def holds_for(self, timeframe, keyword, satisfiable: str):
+        """Checks that `satisfiable` holds for `timeframe` from now on.
+
+        Like `Always`, with `timeframe` as window.
+        """
+        self._start_monitor("always", keyword, satisfiable, timestr_to_secs(timeframe))
 
     def after(self, timeframe, keyword, *keyword_args):
         """After a time of `timeframe`, execute and check success of `keyword`.
@@ -46,17 +314,26 @@ class FRETLib:
 
         This is done by sleeping the given amount of time and call the argument afterwards.
         """
-        self.built_in.sleep(timeframe)
-        self.built_in.run_keyword(keyword, *keyword_args)
+        clock = self._clock
+        started = clock.now()
+        with profile_section("sleep"):
+            if clock.virtual:
+                clock.sleep(timestr_to_secs(timeframe))
+                logger.info(f"Advanced the virtual clock by {timeframe}")
+            else:
+                self.built_in.sleep(timeframe)
+        self._run_timed("After", started, keyword, *keyword_args)
 
     def immediately(self, keyword, *keyword_args):
         """Immediately runs the `keyword`. Like `Run Keyword` but for FRET read"""
-        self.built_in.run_keyword(keyword, *keyword_args)
+        self._run_timed("Immediately", self._clock.now(), keyword, *keyword_args)
 
     def at_the_next_timepoint(self, keyword, *keyword_args):
         """runs the `keyword` and checks as soon as possible if holds.
         Like `Run Keyword` but for FRET read"""
-        self.built_in.run_keyword(keyword, *keyword_args)
+        self._run_timed(
+            "At The Next Timepoint", self._clock.now(), keyword, *keyword_args
+        )
 
     def satisfy(self, satisfiable: str):
         """Checks if `satisfiable` is satisified right now.
@@ -65,18 +342,246 @@ class FRETLib:
 
         Variables are substituted for the keyword with values once so all occurances have the
         same value.
+
+        The expression is compiled once and cached, so repeated checks (e.g. in `within`)
+        only sample the variables. Sampled values are only set as local Robot variables
+        if the check fails, for diagnostics.
+
+        All variables are sampled in one timepoint, so user library functions
+        decorated with `fretish_robot.snapshot.snapshot_cached` run only once.
         """
 
-        expression_vars = set(VAREXPR_RE.findall(satisfiable))
+        compiled = compile_satisfiable(satisfiable)
+
+        values = self._sample(compiled)
+
+        if not compiled.evaluate(values):
+            self._set_diagnostic_variables(values)
+            raise AssertionError(compiled.failure_message(values))
+
+    def _check(
+        self, compiled: CompiledSatisfiable
+    ) -> tuple[dict[str, Any], str | None]:
+        """Samples and evaluates `compiled` once, returning the sampled values and
+        the error message if it does not hold."""
+        values: dict[str, Any] = {}
+        try:
+            values = self._sample(compiled)
+            if compiled.evaluate(values):
+                return values, None
+            return values, compiled.failure_message(values)
+        except ExecutionFailed as err:
+            if err.dont_continue:
+                raise
+            return values, str(err)
+        except Exception as err:
+            # failing signal keywords or evaluations fail the sample, like in `Run Keyword`
+            return values, str(err)
+
+    def _run_timed(self, name: str, started: float, keyword, *keyword_args):
+        first_sample = self._clock.now()
+        satisfied = None
+        try:
+            self.built_in.run_keyword(keyword, *keyword_args)
+            satisfied = self._clock.now()
+        finally:
+            self._record_timing(name, started, first_sample, satisfied)
+
+    def _record_timing(
+        self,
+        name: str,
+        started: float,
+        first_sample: float,
+        satisfied: float | None,
+        deadline: float | None = None,
+    ):
+        self._timings.add(
+            TimingRecord(
+                req_id=self._req_id,
+                test=self._test_name,
+                keyword=name,
+                started=started,
+                first_sample=first_sample,
+                triggered=self._triggered,
+                satisfied=satisfied,
+                deadline=deadline,
+            )
+        )
+
+    def wait_for_monitors(self):
+        """Waits until the windows of the monitors started by `Always`, `Never`,
+        `Eventually` and `Holds For` ended, and fails if one was violated.
+
+        Generated tests end with it, so their monitors observe the whole window.
+        """
+        failures = self._finish_monitors()
+        if failures:
+            raise AssertionError("\n".join(failures))
+
+    def _window(self, window: str | None) -> float:
+        if window is None:
+            window = self.built_in.get_variable_value(
+                "${FRET_MONITOR_WINDOW}", self._monitor_window
+            )
+        return timestr_to_secs(window)
+
+    def _start_monitor(
+        self,
+        mode: str,
+        keyword: str,
+        satisfiable: str,
+        window: float | None = None,
+    ):
+        if not _is_satisfy(keyword):
+            raise ValueError(f"Expected 'Satisfy', got '{keyword}'")
+
+        compiled = compile_satisfiable(satisfiable)
+        samplers = self._samplers()
+        readers = {var: self._signal_reader(var) for var in compiled.variables}
+
+        unreadable = [var for var, reader in readers.items() if reader is None]
+        if unreadable and not samplers:
+            # without batched sampling, the monitor could never read them
+            raise ValueError(_background_read_error(unreadable[0]))
+
+        def read_in_background(name: str) -> Any:
+            reader = readers[name]
+            if reader is None:
+                raise ValueError(_background_read_error(name))
+            return reader()
+
+        clock = self._clock
+
+        def sample() -> dict[str, Any]:
+            sampled_at = clock.now()
+            values = sample_signals(compiled.variables, samplers, read_in_background)
+            if self._trace is not None:
+                self._trace.add_samples(sampled_at, values)
+            return values
+
+        monitor = Monitor(mode, compiled, sample, self._monitor_interval, window, clock)
+        monitor.start()
+        self._monitors.append(monitor)
+
+    def _start_test(self, data, result):
+        self._test_name = data.name
+        self._req_id = next(
+            (tag[len("REQID=") :] for tag in data.tags if tag.startswith("REQID=")),
+            data.name,
+        )
+        self._triggered = None
+        self._combinations = 0
+
+    def _start_keyword(self, data, result):
+        if self._suite_clock is not None and self._previous_clock is None:
+            self._previous_clock = use_clock(self._suite_clock)
+
+        if self._trace is not None:
+            self._trace.add_keyword(data.name, self._clock.now())
+
+    def _end_suite(self, data, result):
+        basename = re.sub(r"\W+", "_", result.full_name)
+        if self._trace is not None:
+            output_dir = pathlib.Path(self._trace_output)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            self._trace.write_suite(output_dir, basename)
+            self._trace.clear()
+
+        if self._timings.records:
+            self._report_timings(result, basename)
+
+        if self._previous_clock is not None:
+            use_clock(self._previous_clock)
+            self._previous_clock = None
+
+    def _report_timings(self, result, basename: str):
+        lines = []
+        for req_id, stats in self._timings.summary().items():
+            line = f"{req_id}: {stats['satisfied']}/{stats['count']} satisfied"
+            if stats["p90_ms"] is not None:
+                line += f", p90 latency {stats['p90_ms']} ms"
+            if stats["min_headroom_ms"] is not None:
+                line += f", min headroom {stats['min_headroom_ms']} ms"
+            lines.append(line)
+
+        if self._timing_output is not None:
+            output_dir = pathlib.Path(self._timing_output)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            basename += ".fret_timings"
+            self._timings.write_json(output_dir / f"{basename}.json")
+            self._timings.write_csv(output_dir / f"{basename}.csv")
+            lines.append(f"Written to {output_dir / basename}.json and .csv")
+
+        result.metadata["FRET Timings"] = "\n\n".join(lines)
+        self._timings.clear()
+
+    def _finish_monitors(self, wait: bool = True) -> list[str]:
+        """Stops the monitors, after their windows ended if `wait`, and returns
+        their violations."""
+        monitors, self._monitors = self._monitors, []
+        failures = []
+        for monitor in monitors:
+            if wait:
+                monitor.wait()
+        for monitor in monitors:
+            violation = monitor.stop()
+            name = monitor.mode.capitalize()
+            if violation is None:
+                logger.info(f"{name} held for {monitor.samples} samples")
+            else:
+                failures.append(
+                    f"{name} violated after {violation.elapsed:.3f} s: "
+                    f"{violation.message}"
+                )
+        return failures
+
+    def _end_test(self, data, result):
+        # the time after the test is not part of it, so only stop
+        failures = self._finish_monitors(wait=False)
+
+        if failures and result.passed:
+            result.status = "FAIL"
+            result.message = "\n".join(failures)
+        elif failures:
+            result.message = "\n".join([result.message, *failures])
+
+    def _sample(self, compiled: CompiledSatisfiable) -> dict[str, Any]:
+        sampled_at = self._clock.now()
+        with timepoint(), profile_section("signals"):
+            values = sample_signals(
+                compiled.variables, self._samplers(), self._read_signal
+            )
+        if self._trace is not None:
+            self._trace.add_samples(sampled_at, values)
+        return values
+
+    @property
+    def _clock(self) -> Clock:
+        # looked up each time, so simulations and FRETLib share the installed clock
+        return current_clock()
+
+    def _samplers(self) -> list[SignalSampler]:
+        if self._signal_samplers is None:
+            self._signal_samplers = find_signal_samplers()
+        return self._signal_samplers
+
+    def _qualified(self, name: str) -> str:
+        return self._keyword_table.get(name, name)
+
+    def _signal_reader(self, name: str) -> SignalReader | None:
+        if name not in self._signal_readers:
+            self._signal_readers[name] = resolve_signal_reader(self._qualified(name))
+        return self._signal_readers[name]
 
-        for var in expression_vars:
-            res = self.built_in.run_keyword(var)
-            self.built_in.set_local_variable(f"${var}", res)
+    def _read_signal(self, name: str) -> Any:
+        reader = self._signal_reader(name)
+        if reader is None:
+            return self.built_in.run_keyword(self._qualified(name))
+        return reader()
 
-        if satisfiable.startswith("when"):
-            self.built_in.run_keyword(satisfiable)
-        else:
-            self.built_in.should_be_true(satisfiable)
+    def _set_diagnostic_variables(self, values: dict[str, Any]):
+        for var, value in values.items():
+            self.built_in.set_local_variable(f"${var}", value)
 
     @keyword("when ${pre_cond} then ${check}")
     def when_then_construct(self, pre_cond, check):
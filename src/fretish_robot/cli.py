@@ -1,11 +1,18 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+# Robot Framework and the generation are only imported after parsing the
+# arguments, as importing Robot Framework dominates short runs and `--help`.
 import argparse
+import shlex
+import sys
 
-from fretish_robot.generate_robot import generate_robot_suite_from_fret
-from fretish_robot.requirements import load_fret_requirements
-from fretish_robot.writer import write_testsuite
+from fretish_robot.combinations import COMBINATION_STRATEGIES, CombinationStrategy
+from fretish_robot.requirements import (
+    iter_sorted_fret_requirements,
+    load_fret_requirements,
+)
+from fretish_robot.sharding import SHARD_MODES
 
 
 def get_cli_arguments():
@@ -27,6 +34,99 @@ def get_cli_arguments():
         help="Output folder for generated Robot Framework file(s) (default: ./robot_files)",
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only regenerate tests of requirements that changed since the last "
+        "incremental run, based on a manifest stored in the output folder",
+    )
+
+    parser.add_argument(
+        "--shard-by",
+        choices=SHARD_MODES,
+        help="Split the tests into several .robot files for parallel execution, one "
+        "per SCOPE or TRIGGER tag, per requirement id prefix, or into --shards files "
+        "balanced by duration",
+    )
+
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Number of files for --shard-by duration",
+    )
+
+    parser.add_argument(
+        "--shard-durations",
+        help="Robot Framework output.xml of a previous run, to balance --shard-by "
+        "duration by test durations (default: equal durations)",
+    )
+
+    parser.add_argument(
+        "--group-by-scope",
+        action="store_true",
+        help="Write one .robot file per scope mode, which enters the mode once in "
+        "its Suite Setup; tests only reset their signals with Reset Signals",
+    )
+
+    parser.add_argument(
+        "--combinations",
+        choices=COMBINATION_STRATEGIES,
+        default="full",
+        help="Which scope mode and trigger combinations of a requirement to test: "
+        "all, each mode and trigger at least once, or a seeded sample of "
+        "--max-combinations (default: full)",
+    )
+
+    parser.add_argument(
+        "--max-combinations",
+        type=int,
+        help="Number of combinations per requirement for --combinations sample",
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of --combinations sample (default: 0)",
+    )
+
+    parser.add_argument(
+        "--template",
+        action="store_true",
+        help="Generate one data-driven test per requirement, with one [Template] "
+        "row per combination",
+    )
+
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="Run tests of different requirements that check the same only once, "
+        "tagged with all their REQIDs; the merged requirements are listed in "
+        "merged_requirements.json in the output folder",
+    )
+
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that the --extra-libraries implement all modes, events "
+        "and signals of the tests, without generating them; the resolved keywords "
+        "are written to keyword_table.json in the output folder",
+    )
+
+    parser.add_argument(
+        "--signal-index",
+        action="store_true",
+        help="Also write signal_index.json to the output folder, mapping each "
+        "mode, event and signal to the tests using it, for fret-select-tests",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes to generate the tests with (default: 1)",
+    )
+
     parser.add_argument(
         "fret_json_input_filepath",
         help="Input filepath for FRET JSON requirement file",
@@ -34,17 +134,322 @@ def get_cli_arguments():
 
     args = parser.parse_args()
 
+    if args.shard_by == "duration" and not args.shards:
+        parser.error("--shard-by duration requires --shards")
+    if args.incremental and args.shard_by:
+        parser.error("--incremental can not be combined with --shard-by")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.jobs > 1 and args.shard_by:
+        parser.error("--jobs can not be combined with --shard-by")
+    if args.group_by_scope and (args.incremental or args.shard_by or args.jobs > 1):
+        parser.error(
+            "--group-by-scope can not be combined with --incremental, --shard-by "
+            "or --jobs"
+        )
+    if args.combinations == "sample" and not args.max_combinations:
+        parser.error("--combinations sample requires --max-combinations")
+    if args.max_combinations is not None and args.combinations != "sample":
+        parser.error("--max-combinations requires --combinations sample")
+    if args.incremental and args.template:
+        parser.error("--incremental can not be combined with --template")
+    if args.deduplicate and (args.incremental or args.group_by_scope or args.jobs > 1):
+        parser.error(
+            "--deduplicate can not be combined with --incremental, --group-by-scope "
+            "or --jobs"
+        )
+    if args.template and args.group_by_scope:
+        parser.error("--template can not be combined with --group-by-scope")
+
     return args
 
 
+def check(fret_requirements, combinations, args) -> int:
+    """Prints the modes, events and signals no library implements, and returns
+    the exit code."""
+    from robot.errors import DataError
+
+    from fretish_robot.generate_robot import iter_generated_tests
+    from fretish_robot.preflight import check_keywords, write_keyword_table
+
+    try:
+        uses = check_keywords(
+            iter_generated_tests(fret_requirements, combinations), args.extra_libraries
+        )
+    except DataError as err:
+        print(err, file=sys.stderr)
+        return 1
+    write_keyword_table(uses, args.robot_output_folder)
+
+    for use in uses:
+        if use.resolved is None:
+            status = "sampled" if use.sampled else "MISSING"
+            print(f"{status:<7}  {use.kind:<6}  {use.name}  ({', '.join(use.req_ids)})")
+
+    missing = sum(use.missing for use in uses)
+    print(f"{len(uses)} keywords checked, {missing} missing")
+    return 1 if missing else 0
+
+
 def main():
     args = get_cli_arguments()
 
-    fret_requirements = load_fret_requirements(args.fret_json_input_filepath)
-    fret_requirements = sorted(fret_requirements, key=lambda r: r.req_id)
-    suite = generate_robot_suite_from_fret(fret_requirements, args.extra_libraries)
+    from fretish_robot.generate_robot import (
+        deduplicate_tests,
+        generate_robot_suite,
+        generate_scope_suites,
+        iter_generated_tests,
+    )
+    from fretish_robot.incremental import write_testsuite_incrementally
+    from fretish_robot.parallel import render_testsuite_parallel
+    from fretish_robot.selection import signal_index, write_signal_index
+    from fretish_robot.writer import (
+        read_test_durations,
+        write_generated_tests,
+        write_merge_report,
+        write_testsuite,
+        write_testsuite_content,
+        write_testsuites,
+    )
+
+    def fret_requirements():
+        # streamed anew for each pass, ordered by requirement id
+        return iter_sorted_fret_requirements(args.fret_json_input_filepath)
+
+    combinations = CombinationStrategy(
+        args.combinations, args.max_combinations, args.seed, args.template
+    )
+
+    if args.check:
+        sys.exit(check(fret_requirements(), combinations, args))
+
+    if args.signal_index:
+        indexed = (
+            deduplicate_tests(fret_requirements(), combinations)
+            if args.deduplicate
+            else iter_generated_tests(fret_requirements(), combinations)
+        )
+        write_signal_index(signal_index(indexed), args.robot_output_folder)
+
+    if args.group_by_scope:
+        suites = generate_scope_suites(
+            fret_requirements(), args.extra_libraries, combinations
+        )
+        write_testsuites(suites, args.robot_output_folder)
+        return
+
+    if args.incremental:
+        # compared with the manifest and then written, so needed twice
+        write_testsuite_incrementally(
+            list(fret_requirements()),
+            args.extra_libraries,
+            args.robot_output_folder,
+            jobs=args.jobs,
+            combinations=combinations,
+        )
+        return
+
+    if args.jobs > 1:
+        content = render_testsuite_parallel(
+            list(fret_requirements()), args.extra_libraries, args.jobs, combinations
+        )
+        write_testsuite_content(content, args.robot_output_folder)
+        return
+
+    if args.deduplicate:
+        tests = deduplicate_tests(fret_requirements(), combinations)
+        write_merge_report(tests, args.robot_output_folder)
+    else:
+        tests = iter_generated_tests(fret_requirements(), combinations)
+
+    if args.shard_by is None:
+        write_generated_tests(tests, args.extra_libraries, args.robot_output_folder)
+        return
+
+    suite = generate_robot_suite(tests, args.extra_libraries)
+
+    test_durations = None
+    if args.shard_durations:
+        test_durations = read_test_durations(args.shard_durations)
+
+    write_testsuite(
+        suite,
+        args.robot_output_folder,
+        shard_by=args.shard_by,
+        shard_count=args.shards,
+        test_durations=test_durations,
+    )
+
+
+def get_select_cli_arguments():
+    parser = argparse.ArgumentParser(
+        description="Print the Robot Framework options selecting the generated tests "
+        "that use changed modes, events or signals, from the signal_index.json "
+        "written by fret-to-robot --signal-index."
+    )
+
+    parser.add_argument(
+        "signal_index",
+        help="signal_index.json, or the output folder of fret-to-robot containing it",
+    )
+
+    parser.add_argument(
+        "changed",
+        nargs="+",
+        help="Names of the changed keywords, e.g. result or 'In test mode'",
+    )
+
+    return parser.parse_args()
+
+
+def select_tests_main():
+    args = get_select_cli_arguments()
+
+    from fretish_robot.selection import load_signal_index, robot_options, select_tests
+
+    index = load_signal_index(args.signal_index)
+    tests, unknown = select_tests(index, args.changed)
+    for name in unknown:
+        print(f"No generated test uses '{name}'", file=sys.stderr)
+
+    if not tests:
+        # no options would make Robot Framework run all tests
+        print("No tests selected", file=sys.stderr)
+        sys.exit(1)
+    print(shlex.join(robot_options(index, tests)))
+
+
+def get_devices_cli_arguments():
+    parser = argparse.ArgumentParser(
+        description="Run a generated suite on several devices or simulator "
+        "instances concurrently, one Robot Framework process per device, and "
+        "combine their results."
+    )
+
+    parser.add_argument(
+        "--device",
+        action="append",
+        default=[],
+        help="A device as NAME or NAME:VAR=value,VAR=value, with the Robot "
+        "Framework variables of its process; repeat for each device",
+    )
+
+    parser.add_argument(
+        "--simulators",
+        type=int,
+        default=0,
+        help="Number of additional simulator devices sim-1 to sim-N",
+    )
+
+    parser.add_argument(
+        "--durations",
+        help="Robot Framework output.xml of a previous run, to balance the tests "
+        "by their durations (default: equal durations)",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        default="./results",
+        help="Folder for the combined results and one subfolder per device "
+        "(default: ./results)",
+    )
+
+    parser.add_argument("suite", help="Generated .robot file or folder")
+
+    args = parser.parse_args()
+
+    from fretish_robot.devices import Device, simulators
+
+    try:
+        args.devices = [Device.parse(spec) for spec in args.device]
+    except ValueError as err:
+        parser.error(str(err))
+    args.devices += simulators(args.simulators)
+    if not args.devices:
+        parser.error("at least one --device or --simulators is required")
+    names = [device.name for device in args.devices]
+    if len(set(names)) != len(names):
+        parser.error("device names must be unique")
+
+    return args
+
+
+def run_devices_main():
+    args = get_devices_cli_arguments()
+
+    from fretish_robot.devices import read_durations, run_on_devices
+
+    durations = read_durations(args.durations) if args.durations else None
+    try:
+        return_code = run_on_devices(
+            args.suite, args.devices, args.output_dir, durations
+        )
+    except RuntimeError as err:
+        print(err, file=sys.stderr)
+        sys.exit(252)
+    sys.exit(return_code)
+
+
+def get_trace_cli_arguments():
+    parser = argparse.ArgumentParser(
+        description="Check the future-time formulas of exported FRET requirements on "
+        "signal traces recorded by FRETLib with `trace_output`, or given as CSV files."
+    )
+
+    parser.add_argument(
+        "--step",
+        default="1 ms",
+        help="Time of one timepoint of the formulas, e.g. 1 ms if the timings of "
+        "the requirements are in milliseconds (default: 1 ms)",
+    )
+
+    parser.add_argument(
+        "fret_json_input_filepath",
+        help="Input filepath for FRET JSON requirement file",
+    )
+
+    parser.add_argument("traces", nargs="+", help="Trace files (.json or .csv)")
+
+    return parser.parse_args()
+
+
+def check_trace_main():
+    args = get_trace_cli_arguments()
+
+    from robot.utils import timestr_to_secs
+
+    # NumPy is an optional dependency, only needed here
+    from fretish_robot.trace_eval import check_trace, load_trace
+
+    fret_requirements = [
+        fret_req
+        for fret_req in load_fret_requirements(
+            args.fret_json_input_filepath, formulas=True
+        )
+        if fret_req.ft is not None
+    ]
+
+    violated = 0
+    for trace_path in args.traces:
+        print(trace_path)
+        trace = load_trace(trace_path)
+        for verdict in check_trace(
+            fret_requirements, trace, timestr_to_secs(args.step)
+        ):
+            if verdict.holds:
+                print(f"  PASS  {verdict.req_id}")
+                continue
+            violated += 1
+            if verdict.error is not None:
+                print(f"  ERROR {verdict.req_id}, {verdict.error}")
+            elif verdict.violated_at is not None:
+                print(
+                    f"  FAIL  {verdict.req_id}, violated at {verdict.violated_at:.3f} s"
+                )
+            else:
+                print(f"  FAIL  {verdict.req_id}")
 
-    write_testsuite(suite, args.robot_output_folder)
+    sys.exit(1 if violated else 0)
 
 
 if __name__ == "__main__":
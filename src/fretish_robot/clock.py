@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""The clock of the timing keywords, real or virtual.
+
+FRETLib reads the time, waits in `Within` and `After`, and schedules the
+samples of monitors through the current clock. By default, this is the real
+monotonic clock. Against a simulated SUT, a `VirtualClock` lets timeframes pass
+instantly: waiting advances the virtual time, firing everything scheduled in
+between in order of its due time.
+
+A simulation schedules its reactions with `call_later` of `current_clock()`,
+which works with both clocks, and can advance the virtual time itself with
+`VirtualClock.advance`:
+
+```python
+from fretish_robot.clock import current_clock
+
+current_clock().call_later(0.05, self.model.set, 2)
+```
+
+Use a virtual clock with `Library    fretish_robot.FRETLib    clock=virtual`.
+It is installed with the first keyword of the suite importing the library, and
+the previous clock restored at its end.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import Callable, Collection
+from typing import Any
+
+from fretish_robot.signals import SIGNAL_CHANGES
+
+CLOCKS = ("real", "virtual")
+
+
+class Clock:
+    """The real monotonic clock."""
+
+    virtual = False
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def call_later(self, delay: float, callback: Callable, *args: Any):
+        """Calls `callback(*args)` after `delay` seconds, in another thread.
+        Returns a timer with a `cancel()` method."""
+        timer = threading.Timer(delay, callback, args=args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def wait_for_change(
+        self, names: Collection[str], since_version: int, timeout: float
+    ) -> bool:
+        """Waits up to `timeout` seconds until one of the signals `names`
+        changed, see `fretish_robot.signals.SignalChanges.wait`."""
+        return SIGNAL_CHANGES.wait(names, since_version, timeout)
+
+
+class _VirtualTimer:
+    def __init__(self, callback: Callable, args: tuple) -> None:
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class VirtualClock(Clock):
+    """A clock that only moves when waited on or advanced.
+
+    Callbacks scheduled with `call_later` run in the thread advancing the
+    clock, when their due time is reached. The time is kept in integer
+    nanoseconds, so repeated steps like `5 ms` do not drift past due times.
+    """
+
+    virtual = True
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = _nanoseconds(start)
+        self._timers: list[tuple[int, int, _VirtualTimer]] = []
+        self._order = itertools.count()
+
+    def now(self) -> float:
+        return self._now / 1e9
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """Moves the time forward by `seconds`, running the callbacks due until
+        then in order."""
+        self._advance_to(self._now + _nanoseconds(max(seconds, 0)))
+
+    def call_later(self, delay: float, callback: Callable, *args: Any):
+        timer = _VirtualTimer(callback, args)
+        due = self._now + _nanoseconds(max(delay, 0))
+        heapq.heappush(self._timers, (due, next(self._order), timer))
+        return timer
+
+    def wait_for_change(
+        self, names: Collection[str], since_version: int, timeout: float
+    ) -> bool:
+        def changed() -> bool:
+            return SIGNAL_CHANGES.changed(names, since_version)
+
+        until = self._now + _nanoseconds(max(timeout, 0))
+        return changed() or self._advance_to(until, changed)
+
+    def _advance_to(self, until: int, stop: Callable[[], bool] | None = None) -> bool:
+        """Runs the callbacks due until `until`. Returns True if `stop` held
+        after one of them, leaving the time at its due time."""
+        while self._timers and self._timers[0][0] <= until:
+            due, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            self._now = max(self._now, due)
+            timer.callback(*timer.args)
+            if stop is not None and stop():
+                return True
+        self._now = max(self._now, until)
+        return False
+
+
+def _nanoseconds(seconds: float) -> int:
+    return round(seconds * 1e9)
+
+
+REAL_CLOCK = Clock()
+_current_clock: Clock = REAL_CLOCK
+
+
+def current_clock() -> Clock:
+    """Returns the clock used by FRETLib."""
+    return _current_clock
+
+
+def use_clock(clock: Clock) -> Clock:
+    """Makes `clock` the clock used by FRETLib, returning the previous one."""
+    global _current_clock
+    previous, _current_clock = _current_clock, clock
+    return previous
+
+
+def make_clock(name: str) -> Clock:
+    """Returns a new clock by its name, `real` or `virtual`."""
+    if name not in CLOCKS:
+        raise ValueError(f"Unknown clock '{name}', use one of {CLOCKS}")
+    return VirtualClock() if name == "virtual" else REAL_CLOCK
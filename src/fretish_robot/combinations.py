@@ -0,0 +1,64 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Selection of the scope mode × trigger combinations tested per requirement.
+
+A requirement `In "(a|b|c)" mode, upon (x | y), ...` expands into one test per
+combination of mode and trigger. `CombinationStrategy` bounds this expansion:
+
+* `full`: all combinations, e.g. for nightly runs.
+* `each-choice`: every mode and every trigger in at least one combination, so
+  `max(modes, triggers)` combinations. With only two factors, pairwise
+  coverage is the same as `full`, so this is the reduced covering strategy.
+* `sample`: at most `max_combinations` combinations, chosen randomly but
+  reproducibly from `seed` and the requirement id.
+
+With `template`, the selected combinations of a requirement become the rows
+of one data-driven test with `[Template]    Check Combination`.
+"""
+
+import dataclasses
+import random
+
+COMBINATION_STRATEGIES = ("full", "each-choice", "sample")
+TEMPLATE_KEYWORD = "Check Combination"
+
+
+@dataclasses.dataclass(frozen=True)
+class CombinationStrategy:
+    strategy: str = "full"
+    max_combinations: int | None = None
+    seed: int = 0
+    template: bool = False
+
+    def __post_init__(self):
+        if self.strategy not in COMBINATION_STRATEGIES:
+            raise ValueError(
+                f"Unknown combination strategy '{self.strategy}', expected one of "
+                f"{', '.join(COMBINATION_STRATEGIES)}"
+            )
+        if self.strategy == "sample" and (
+            self.max_combinations is None or self.max_combinations < 1
+        ):
+            raise ValueError("Sampling combinations needs a positive maximum")
+
+    def select(
+        self, req_id: str, scope_count: int, event_count: int
+    ) -> list[tuple[int, int]]:
+        """Returns the selected `(scope index, event index)` pairs, in the order
+        of the full expansion."""
+        if self.strategy == "each-choice":
+            count = max(scope_count, event_count)
+            return sorted({(i % scope_count, i % event_count) for i in range(count)})
+
+        total = scope_count * event_count
+        if self.strategy == "sample" and self.max_combinations < total:
+            # seeded per requirement, so other requirements do not change the choice
+            rng = random.Random(f"{self.seed}:{req_id}")
+            indices = sorted(rng.sample(range(total), self.max_combinations))
+        else:
+            indices = list(range(total))
+        return [divmod(index, event_count) for index in indices]
+
+
+FULL_EXPANSION = CombinationStrategy()
@@ -0,0 +1,207 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Running generated suites on a pool of devices concurrently.
+
+User libraries like the one of the digital microscope example grab one device
+per suite, so one bench limits the throughput. `run_on_devices` splits the
+tests of a suite onto several devices, or simulator instances, and runs each
+part in its own `robot` process, so each device has its own user library
+instances. The tests are balanced by their durations of a previous run,
+longest first.
+
+The outputs are combined into one `output.xml` (with log and report), with one
+child suite per device, named after it, with the device in its `FRET Device`
+metadata. Every test is tagged `DEVICE=<name>`.
+
+A device is a name and the Robot Framework variables of its process, e.g. the
+port of its serial channel:
+
+```sh
+fret-run-devices --device dut1:PORT=/dev/ttyUSB0 --device dut2:PORT=/dev/ttyUSB1 robot_files
+fret-run-devices --simulators 4 --durations results/output.xml robot_files
+```
+
+User libraries read these variables, or `current_device()` when they are
+created, to connect to their device.
+"""
+
+import dataclasses
+import os
+import pathlib
+import re
+import subprocess
+import sys
+from collections.abc import Sequence
+
+import robot
+from robot.api import ExecutionResult
+from robot.running import TestSuite
+
+from fretish_robot.sharding import balance_by_duration
+
+DEVICE_ENV = "FRET_DEVICE"
+DEVICE_METADATA = "FRET Device"
+_DEVICE_NAME_RE = re.compile(r"[\w-]+")
+
+
+@dataclasses.dataclass(frozen=True)
+class Device:
+    """A device, or simulator instance, with the variables of its process."""
+
+    name: str
+    variables: tuple[tuple[str, str], ...] = ()
+
+    @classmethod
+    def parse(cls, spec: str) -> "Device":
+        """Parses `name` or `name:VAR=value,VAR=value`."""
+        name, _, assignments = spec.partition(":")
+        if not _DEVICE_NAME_RE.fullmatch(name):
+            raise ValueError(
+                f"Invalid device name '{name}', use letters, digits, '_' and '-'"
+            )
+
+        variables = []
+        for assignment in filter(None, assignments.split(",")):
+            variable, separator, value = assignment.partition("=")
+            if not separator:
+                raise ValueError(f"Expected VAR=value in device '{spec}'")
+            variables.append((variable, value))
+        return cls(name, tuple(variables))
+
+    def __str__(self) -> str:
+        assignments = ",".join(f"{var}={value}" for var, value in self.variables)
+        return f"{self.name}:{assignments}" if assignments else self.name
+
+
+def simulators(count: int) -> list[Device]:
+    """Returns `count` simulator devices, `sim-1` to `sim-<count>`."""
+    return [Device(f"sim-{index + 1}") for index in range(count)]
+
+
+def current_device() -> Device | None:
+    """Returns the device of this process, if run by `run_on_devices`."""
+    spec = os.environ.get(DEVICE_ENV)
+    return Device.parse(spec) if spec else None
+
+
+def _relative_name(test, top) -> str:
+    # the names of the suites between `top` and `test`, without device suites
+    names = [test.name]
+    suite = test.parent
+    while suite is not top:
+        if DEVICE_METADATA not in suite.metadata:
+            names.append(suite.name)
+        suite = suite.parent
+    return ".".join(reversed(names))
+
+
+def read_durations(robot_output_xml: str) -> dict[str, float]:
+    """Reads the test durations (in seconds) of a previous run, on devices or
+    not, by full name relative to the top-level suite, without device suites."""
+    suite = ExecutionResult(robot_output_xml).suite
+    return {
+        _relative_name(test, suite): test.elapsed_time.total_seconds()
+        for test in suite.all_tests
+    }
+
+
+def schedule(
+    suite_path: str, devices: Sequence[Device], durations: dict[str, float]
+) -> dict[str, list[str]]:
+    """Assigns the tests of the suite at `suite_path` to `devices`, balanced by
+    their `durations` (seconds by name, see `read_durations`). Returns the full
+    names of each device's tests, relative to the top-level suite."""
+    suite = TestSuite.from_file_system(suite_path)
+    names = [_relative_name(test, suite) for test in suite.all_tests]
+    shards = balance_by_duration(names, len(devices), durations)
+
+    return {
+        device.name: [names[position] for position in shard]
+        for device, shard in zip(devices, shards)
+    }
+
+
+def _robot_command(device: Device, device_dir: pathlib.Path, suite_path: str):
+    command = [
+        sys.executable,
+        "-m",
+        "robot",
+        "--argumentfile",
+        str(device_dir / "tests.args"),
+        "--name",
+        device.name,
+        "--metadata",
+        f"{DEVICE_METADATA}:{device}",
+        "--settag",
+        f"DEVICE={device.name}",
+        "--outputdir",
+        str(device_dir),
+        "--log",
+        "NONE",
+        "--report",
+        "NONE",
+    ]
+    for variable, value in device.variables:
+        command += ["--variable", f"{variable}:{value}"]
+    return [*command, suite_path]
+
+
+def run_on_devices(
+    suite_path: str,
+    devices: Sequence[Device],
+    output_dir: str,
+    durations: dict[str, float] | None = None,
+) -> int:
+    """Runs the suite at `suite_path` (a file or folder) on `devices`
+    concurrently and writes the combined result into `output_dir`.
+
+    Returns the return code of Robot Framework for the combined result. Raises
+    `RuntimeError` if a device wrote no output, after combining the others.
+    """
+    output_folder = pathlib.Path(output_dir)
+    shards = schedule(suite_path, devices, durations or {})
+    suite_name = TestSuite.from_file_system(suite_path).name
+
+    processes = []
+    for device in devices:
+        if not shards[device.name]:
+            continue
+        device_dir = output_folder / device.name
+        device_dir.mkdir(parents=True, exist_ok=True)
+        # an argument file, as thousands of `--test` options exceed command lines
+        with open(device_dir / "tests.args", "w") as args_file:
+            for test in shards[device.name]:
+                args_file.write(f"--test {device.name}.{test}\n")
+
+        with open(device_dir / "console.txt", "w") as console:
+            process = subprocess.Popen(
+                _robot_command(device, device_dir, suite_path),
+                stdout=console,
+                stderr=subprocess.STDOUT,
+                env={**os.environ, DEVICE_ENV: str(device)},
+            )
+        processes.append((device, device_dir / "output.xml", process))
+
+    outputs, failed = [], []
+    for device, output, process in processes:
+        process.wait()
+        if output.exists():
+            outputs.append(str(output))
+        else:
+            failed.append(device.name)
+
+    return_code = 0
+    if outputs:
+        return_code = robot.rebot(
+            *outputs,
+            name=suite_name,
+            outputdir=str(output_folder),
+            output="output.xml",
+            stdout=None,
+        )
+    if failed:
+        raise RuntimeError(
+            f"No output of device(s) {', '.join(failed)}, see their console.txt"
+        )
+    return return_code
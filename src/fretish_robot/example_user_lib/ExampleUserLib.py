@@ -3,19 +3,28 @@
 
 import random
 
+from robot.api.deco import not_keyword
+
 from fretish_robot.example_user_lib.example_model import ExampleModel
+from fretish_robot.signals import SHARED_SCOPE_METADATA, signal_changed
 
 
 class ExampleUserLib:
+    # The signals `sample_signals` returns, for `fret-to-robot --check`
+    SAMPLED_SIGNALS = ("mode", "result")
+
     def __init__(self):
         # This makes this library also a visitor, allowing reactions on test start, ...
         self.ROBOT_LIBRARY_LISTENER = self
 
-        self.model = ExampleModel()
+        # Report changes of `result`, so `Within` in push mode wakes up on them
+        self.model = ExampleModel(on_change=lambda: signal_changed("result"))
 
     # Prefix visitor methods with _underscore, so they don't become keywords by accident
     def _start_test(self, data, result):
-        self.model.reset()
+        # Tests grouped by scope share the mode of their suite, see `reset_signals`
+        if SHARED_SCOPE_METADATA not in data.parent.metadata:
+            self.model.reset()
 
     def in_test_mode(self):
         self.model.set_test_mode()
@@ -29,9 +38,25 @@ class ExampleUserLib:
     def request_to_set_two(self):
         self.model.set(2)
 
+    def request_to_set_two_slowly(self):
+        self.model.set_later(2, 0.05)
+
     def result(self):
         return self.model.get()
 
+    # Called by FRETLib with all signals of a condition, to read them in one go.
+    # Signals missing in the result, like `get_true`, are run as keywords.
+    @not_keyword
+    def sample_signals(self, names: list[str]) -> dict:
+        status = self.model.status()
+        return {name: status[name] for name in names if name in status}
+
+    # Called by `Reset Signals` of FRETLib, to only reset what a test checks
+    @not_keyword
+    def reset_signals(self, names: list[str]):
+        if "result" in names:
+            self.model.set(0)
+
     @staticmethod
     def get_random_bool():
         return random.random() < 0.5
@@ -3,6 +3,8 @@
 
 import enum
 
+from fretish_robot.clock import current_clock
+
 
 class Modes(enum.Enum):
     UNKNOWN = enum.auto()
@@ -11,12 +13,13 @@ class Modes(enum.Enum):
 
 
 class ExampleModel:
-    def __init__(self) -> None:
+    def __init__(self, on_change=None) -> None:
         self.mode = Modes.UNKNOWN
         self.number = 0
+        self.on_change = on_change
 
     def reset(self):
-        self.__init__()
+        self.__init__(self.on_change)
 
     def set_test_mode(self):
         self.mode = Modes.TEST
@@ -26,6 +29,16 @@ class ExampleModel:
 
     def set(self, param: int):
         self.number = param
+        if self.on_change is not None:
+            self.on_change()
+
+    def set_later(self, param: int, delay: float):
+        """Sets `param` after `delay` seconds, like a device that reacts slowly."""
+        current_clock().call_later(delay, self.set, param)
 
     def get(self):
         return self.number
+
+    def status(self) -> dict:
+        """Returns the whole state at once, like a single device status command."""
+        return {"mode": self.mode, "result": self.number}
@@ -0,0 +1,471 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tokenizer, parser and Python emitter for FRET's `*_unexp_ft` expressions.
+
+Besides boolean, comparison and arithmetic operators, the parser understands the
+temporal operators FRET uses in its `ft` formulas (`X`, `F`, `G`, `U`, `V`, ...),
+including bounds like `F[<=200]`, and the `LAST` timepoint, when parsing with
+`temporal=True`. In conditions, these names are signals like any other, as are
+`xor` and `mod` where an operand is expected.
+"""
+
+import dataclasses
+import functools
+import re
+from collections.abc import Collection, Iterator
+
+
+class FRETishSyntaxError(ValueError):
+    pass
+
+
+class Node:
+    """Base class of all FRETish expression nodes."""
+
+
+@dataclasses.dataclass(frozen=True)
+class Var(Node):
+    name: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Const(Node):
+    value: bool | int | float
+
+
+@dataclasses.dataclass(frozen=True)
+class Last(Node):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Paren(Node):
+    """Explicit parentheses of the source, kept to emit expressions as written."""
+
+    inner: Node
+
+
+@dataclasses.dataclass(frozen=True)
+class Not(Node):
+    operand: Node
+
+
+@dataclasses.dataclass(frozen=True)
+class Neg(Node):
+    operand: Node
+
+
+@dataclasses.dataclass(frozen=True)
+class BinaryOp(Node):
+    op: str
+    left: Node
+    right: Node
+
+
+@dataclasses.dataclass(frozen=True)
+class Temporal(Node):
+    """A temporal operator with one (`X`, `F`, ...) or two (`U`, `V`, ...)
+    operands. `bound` is an inclusive `(low, high)` number of timepoints."""
+
+    op: str
+    operands: tuple[Node, ...]
+    bound: tuple[int, int] | None = None
+
+
+UNARY_TEMPORAL_OPS = frozenset("XFGYOHZ")
+BINARY_TEMPORAL_OPS = frozenset("UVST")
+
+# Binary operators from lowest to highest binding, as (operators, right associative)
+_BINARY_LEVELS: list[tuple[frozenset[str], bool]] = [
+    (frozenset({"<->"}), False),
+    (frozenset({"->"}), True),
+    (frozenset({"|", "xor"}), False),
+    (frozenset({"&"}), False),
+]
+_TEMPORAL_BINARY_LEVELS = [*_BINARY_LEVELS, (BINARY_TEMPORAL_OPS, False)]
+_COMPARISON_OPS = frozenset({"=", "!=", "<", "<=", ">", ">="})
+_ADDITIVE_OPS = frozenset({"+", "-"})
+_MULTIPLICATIVE_OPS = frozenset({"*", "/", "mod"})
+
+# Alternative spellings accepted in the input
+_OP_ALIASES = {"=>": "->", "==": "="}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<bound>\[\s*(?:(?P<cmp><=|<|=)\s*(?P<limit>\d+)|(?P<low>\d+)\s*,\s*(?P<high>\d+))\s*\])
+    | (?P<name>[A-Za-z_]\w*)
+    | (?P<op><->|->|=>|<=|>=|!=|==|[!&|=<>+\-*/^()])
+    """,
+    re.VERBOSE,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Token:
+    kind: str
+    text: str
+    pos: int
+    bound: tuple[int, int] | None = None
+
+
+def _tokenize(expr: str) -> Iterator[_Token]:
+    pos = 0
+    for match in _TOKEN_RE.finditer(expr):
+        if match.start() != pos:
+            break
+        pos = match.end()
+
+        kind = match.lastgroup
+        if kind == "ws":
+            continue
+
+        text = match.group()
+        if kind == "bound":
+            yield _Token(kind, text, match.start(), _to_bound(match))
+        elif kind == "op":
+            yield _Token(kind, _OP_ALIASES.get(text, text), match.start())
+        else:
+            yield _Token(kind, text, match.start())
+
+    if pos != len(expr):
+        raise FRETishSyntaxError(f"Unexpected character {expr[pos]!r} at {pos}")
+
+    yield _Token("end", "", len(expr))
+
+
+def _to_bound(match: re.Match) -> tuple[int, int]:
+    if match["low"] is not None:
+        return int(match["low"]), int(match["high"])
+
+    limit = int(match["limit"])
+    match match["cmp"]:
+        case "<=":
+            return 0, limit
+        case "<":
+            return 0, limit - 1
+        case _:
+            return limit, limit
+
+
+class _Parser:
+    def __init__(self, expr: str, temporal: bool) -> None:
+        self._expr = expr
+        self._tokens = list(_tokenize(expr))
+        self._index = 0
+        self._temporal = temporal
+        self._levels = _TEMPORAL_BINARY_LEVELS if temporal else _BINARY_LEVELS
+
+    @property
+    def _current(self) -> _Token:
+        return self._tokens[self._index]
+
+    def _advance(self) -> _Token:
+        token = self._current
+        self._index += 1
+        return token
+
+    def _error(self, message: str) -> FRETishSyntaxError:
+        token = self._current
+        found = repr(token.text) if token.kind != "end" else "end of expression"
+        return FRETishSyntaxError(
+            f"{message}, found {found} at {token.pos} in '{self._expr}'"
+        )
+
+    def _is_op(self, ops: Collection[str]) -> bool:
+        token = self._current
+        return token.kind in ("op", "name") and token.text in ops
+
+    def parse(self) -> Node:
+        node = self._binary(0)
+        if self._current.kind != "end":
+            raise self._error("Expected end of expression")
+        return node
+
+    def _binary(self, level: int) -> Node:
+        if level == len(self._levels):
+            return self._unary()
+
+        ops, right_assoc = self._levels[level]
+        left = self._binary(level + 1)
+        while self._is_op(ops):
+            op_token = self._advance()
+            bound = self._advance().bound if self._current.kind == "bound" else None
+            right = self._binary(level if right_assoc else level + 1)
+            if op_token.text in BINARY_TEMPORAL_OPS:
+                left = Temporal(op_token.text, (left, right), bound)
+            else:
+                left = BinaryOp(op_token.text, left, right)
+            if right_assoc:
+                break
+        return left
+
+    def _unary(self) -> Node:
+        if self._is_op({"!"}):
+            self._advance()
+            return Not(self._unary())
+
+        if self._temporal and self._is_op(UNARY_TEMPORAL_OPS):
+            op = self._advance().text
+            bound = self._advance().bound if self._current.kind == "bound" else None
+            return Temporal(op, (self._unary(),), bound)
+
+        return self._comparison()
+
+    def _comparison(self) -> Node:
+        left = self._arithmetic(_ADDITIVE_OPS, self._term)
+        if self._is_op(_COMPARISON_OPS):
+            op = self._advance().text
+            left = BinaryOp(op, left, self._arithmetic(_ADDITIVE_OPS, self._term))
+        return left
+
+    def _term(self) -> Node:
+        return self._arithmetic(_MULTIPLICATIVE_OPS, self._sign)
+
+    def _arithmetic(self, ops: frozenset[str], operand) -> Node:
+        left = operand()
+        while self._is_op(ops):
+            op = self._advance().text
+            left = BinaryOp(op, left, operand())
+        return left
+
+    def _sign(self) -> Node:
+        if self._is_op({"-"}):
+            self._advance()
+            return Neg(self._sign())
+        return self._power()
+
+    def _power(self) -> Node:
+        base = self._atom()
+        if self._is_op({"^"}):
+            self._advance()
+            return BinaryOp("^", base, self._sign())
+        return base
+
+    def _atom(self) -> Node:
+        token = self._current
+
+        if token.kind == "op" and token.text == "(":
+            self._advance()
+            inner = self._binary(0)
+            if not self._is_op({")"}):
+                raise self._error("Expected ')'")
+            self._advance()
+            return Paren(inner)
+
+        if token.kind == "number":
+            self._advance()
+            is_float = "." in token.text
+            return Const(float(token.text) if is_float else int(token.text))
+
+        if token.kind == "name" and not self._is_reserved(token.text):
+            self._advance()
+            match token.text:
+                case "TRUE" | "true":
+                    return Const(True)
+                case "FALSE" | "false":
+                    return Const(False)
+                case "LAST" if self._temporal:
+                    return Last()
+                case _:
+                    return Var(token.text)
+
+        raise self._error("Expected operand")
+
+    def _is_reserved(self, name: str) -> bool:
+        # `xor` and `mod` are only operators between operands
+        return self._temporal and (
+            name in UNARY_TEMPORAL_OPS or name in BINARY_TEMPORAL_OPS
+        )
+
+
+def parse(expr: str, temporal: bool = False) -> Node:
+    """Parses a FRETish expression into its AST, with the temporal operators
+    and `LAST` of `ft` formulas if `temporal`.
+
+    Raises `FRETishSyntaxError` if `expr` is not a valid expression.
+    """
+    return _Parser(expr, temporal).parse()
+
+
+def strip_parens(node: Node) -> Node:
+    while isinstance(node, Paren):
+        node = node.inner
+    return node
+
+
+def iter_vars(node: Node) -> Iterator[str]:
+    """Yields the names of all variables of `node`, in order of occurrence."""
+    match node:
+        case Var(name):
+            yield name
+        case Paren(inner) | Not(inner) | Neg(inner):
+            yield from iter_vars(inner)
+        case BinaryOp(_, left, right):
+            yield from iter_vars(left)
+            yield from iter_vars(right)
+        case Temporal(_, operands, _):
+            for operand in operands:
+                yield from iter_vars(operand)
+
+
+# Operators whose operands can be swapped, and those of them that chain
+_COMMUTATIVE_OPS = frozenset({"&", "|", "xor", "<->", "=", "!=", "+", "*"})
+_ASSOCIATIVE_OPS = frozenset({"&", "|", "+", "*"})
+_MIRRORED_OPS = {">": "<", ">=": "<="}
+
+
+def normalize(node: Node) -> Node:
+    """Returns a canonical form of `node`, to detect equivalent expressions.
+
+    Parentheses are removed, `a > b` becomes `b < a`, and chains of commutative
+    operators are sorted, so `(b & (a & c))` and `a & b & c` are equal. The
+    rewrites keep the meaning, but not every equivalent expression gets the
+    same form.
+    """
+    match node:
+        case Paren(inner):
+            return normalize(inner)
+        case Not(operand):
+            return Not(normalize(operand))
+        case Neg(operand):
+            return Neg(normalize(operand))
+        case BinaryOp(op, left, right):
+            left, right = normalize(left), normalize(right)
+            if op in _MIRRORED_OPS:
+                op, left, right = _MIRRORED_OPS[op], right, left
+            if op in _ASSOCIATIVE_OPS:
+                operands = sorted([*_chain(op, left), *_chain(op, right)], key=repr)
+                return functools.reduce(lambda a, b: BinaryOp(op, a, b), operands)
+            if op in _COMMUTATIVE_OPS and repr(right) < repr(left):
+                left, right = right, left
+            return BinaryOp(op, left, right)
+        case Temporal(op, operands, bound):
+            return Temporal(op, tuple(map(normalize, operands)), bound)
+    return node
+
+
+def _chain(op: str, node: Node) -> list[Node]:
+    if isinstance(node, BinaryOp) and node.op == op:
+        return [*_chain(op, node.left), *_chain(op, node.right)]
+    return [node]
+
+
+def to_dnf(node: Node) -> list[tuple[str, ...]]:
+    """Converts a positive boolean expression of variables, like the trigger
+    `(a | b) & c`, into its minimal disjunctive normal form `[(a, c), (b, c)]`.
+
+    Each conjunct holds its variables in order of occurrence. Duplicate
+    conjuncts and conjuncts subsumed by a smaller one (`a | a & b` is `a`) are
+    removed. Raises `FRETishSyntaxError` for any other operator.
+    """
+    conjuncts = list(dict.fromkeys(_dnf(node)))
+    order = {
+        name: position for position, name in enumerate(dict.fromkeys(iter_vars(node)))
+    }
+    return [
+        tuple(sorted(conjunct, key=order.__getitem__))
+        for conjunct in conjuncts
+        if not any(other < conjunct for other in conjuncts)
+    ]
+
+
+def _dnf(node: Node) -> list[frozenset[str]]:
+    match node:
+        case Var(name):
+            return [frozenset([name])]
+        case Paren(inner):
+            return _dnf(inner)
+        case BinaryOp("|", left, right):
+            return _dnf(left) + _dnf(right)
+        case BinaryOp("&", left, right):
+            return [a | b for a in _dnf(left) for b in _dnf(right)]
+    operator = getattr(node, "op", type(node).__name__)
+    raise FRETishSyntaxError(
+        f"Only variables combined with '&' and '|' can be converted, not '{operator}'"
+    )
+
+
+# Python operator precedences, from lowest to highest binding
+_PY_OR, _PY_AND, _PY_NOT, _PY_CMP, _PY_ADD, _PY_MUL, _PY_NEG, _PY_POW, _PY_ATOM = range(
+    1, 10
+)
+
+# FRETish operator -> (Python operator, precedence)
+_PY_BINARY_OPS = {
+    "|": ("or", _PY_OR),
+    "&": ("and", _PY_AND),
+    "xor": ("!=", _PY_CMP),
+    "<->": ("==", _PY_CMP),
+    "=": ("==", _PY_CMP),
+    "!=": ("!=", _PY_CMP),
+    "<": ("<", _PY_CMP),
+    "<=": ("<=", _PY_CMP),
+    ">": (">", _PY_CMP),
+    ">=": (">=", _PY_CMP),
+    "+": ("+", _PY_ADD),
+    "-": ("-", _PY_ADD),
+    "*": ("*", _PY_MUL),
+    "/": ("/", _PY_MUL),
+    "mod": ("%", _PY_MUL),
+    "^": ("**", _PY_POW),
+}
+
+
+def to_python(node: Node, variables: Collection[str] = ()) -> str:
+    """Emits `node` as Python expression, prefixing `variables` with `$`.
+
+    Parentheses of the source are kept, additional ones are only added where
+    Python's operator precedence requires them.
+    """
+    return _PythonEmitter(frozenset(variables)).emit(node, 0)
+
+
+class _PythonEmitter:
+    def __init__(self, variables: frozenset[str]) -> None:
+        self._variables = variables
+
+    def emit(self, node: Node, min_precedence: int) -> str:
+        text, precedence = self._emit(node)
+        if precedence < min_precedence:
+            return f"({text})"
+        return text
+
+    def _emit(self, node: Node) -> tuple[str, int]:
+        match node:
+            case Var(name):
+                return (f"${name}" if name in self._variables else name), _PY_ATOM
+            case Const(value):
+                return repr(value), _PY_ATOM
+            case Paren(inner):
+                return f"({self.emit(inner, 0)})", _PY_ATOM
+            case Not(operand):
+                return f"not {self.emit(operand, _PY_NOT)}", _PY_NOT
+            case Neg(operand):
+                return f"-{self.emit(operand, _PY_NEG)}", _PY_NEG
+            case BinaryOp("->", left, right):
+                antecedent = self.emit(left, _PY_NOT)
+                return f"not {antecedent} or {self.emit(right, _PY_OR + 1)}", _PY_OR
+            case BinaryOp(op, left, right):
+                py_op, precedence = _PY_BINARY_OPS[op]
+                if precedence == _PY_POW:
+                    left_min, right_min = precedence + 1, _PY_NEG
+                elif precedence == _PY_CMP:
+                    # avoid Python's chained comparisons
+                    left_min = right_min = precedence + 1
+                else:
+                    left_min, right_min = precedence, precedence + 1
+                left_text = self.emit(left, left_min)
+                right_text = self.emit(right, right_min)
+                return f"{left_text} {py_op} {right_text}", precedence
+            case Temporal(op, _, _):
+                raise FRETishSyntaxError(
+                    f"Temporal operator {op} can not be evaluated as Python expression"
+                )
+            case Last():
+                raise FRETishSyntaxError(
+                    "LAST can not be evaluated as Python expression"
+                )
+        raise TypeError(f"Unknown node {node!r}")
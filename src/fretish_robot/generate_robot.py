@@ -1,48 +1,76 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+import dataclasses
 import logging
-import re
+from collections.abc import Iterable, Iterator
 
-from robot.running.model import Body, Keyword, TestCase, TestSuite
+from robot.running.model import TestSuite
 
+from fretish_robot import fretish
+from fretish_robot.combinations import (
+    FULL_EXPANSION,
+    TEMPLATE_KEYWORD,
+    CombinationStrategy,
+)
 from fretish_robot.requirements import FRETRequirement
+from fretish_robot.satisfiable import compile_satisfiable
+from fretish_robot.signals import SHARED_SCOPE_METADATA
 
 logger = logging.getLogger(__name__)
 
+SUITE_NAME = "Generated FRET Testsuite"
 
-def _get_testsuite():
-    suite = TestSuite("Generated FRET Testsuite")
-    return suite
+# Timing keywords sampling in the background, generated tests wait for them
+MONITOR_KEYWORDS = ("Always", "Never", "Eventually", "Holds For")
 
 
-def _add_libs(suite: TestSuite, extra_libs: list[str]):
-    for lib in ["fretish_robot.FRETLib"] + extra_libs:
-        suite.resource.imports.library(lib)
+@dataclasses.dataclass(frozen=True, slots=True)
+class GeneratedTest:
+    """A generated test, independent of the Robot Framework model.
+
+    `body` holds one `(keyword, *args)` tuple per keyword call, starting with
+    `In <scope> mode` if the test has a `scope`. With a `template`, it holds
+    the arguments of each data row instead.
+    """
+
+    name: str
+    tags: tuple[str, ...]
+    body: tuple[tuple[str, ...], ...]
+    scope: str | None = None
+    template: str | None = None
+
+    @property
+    def req_ids(self) -> tuple[str, ...]:
+        return tuple(
+            tag[len("REQID=") :] for tag in self.tags if tag.startswith("REQID=")
+        )
+
+
+def suite_libraries(extra_libs: list[str]) -> list[str]:
+    return ["fretish_robot.FRETLib"] + extra_libs
 
 
-def _to_python_expr(expr: str) -> str:
-    # normal replacement
-    for cur, new in [
-        (" ^ ", " ** "),
-        (" & ", " and "),
-        (" | ", " or "),
-        (" = ", " == "),
-        ("! ", "not "),
-    ]:
-        expr = expr.replace(cur, new)
+def _get_testsuite():
+    suite = TestSuite(SUITE_NAME)
+    return suite
 
-    return expr
 
+def _add_libs(suite: TestSuite, extra_libs: list[str]):
+    for lib in suite_libraries(extra_libs):
+        suite.resource.imports.library(lib)
 
-def _prefix_vars(expr: str, variables: list[str]) -> str:
-    variable_find_expression = f"({'|'.join(variables)})"
 
-    match_expr_unexpanding = rf"(?<![^\W]){variable_find_expression}(?![^\W])"
+def _to_satisfiable(fret_req: FRETRequirement) -> str:
+    condition = fretish.parse(fret_req.condition_to_check)
 
-    expr_with_vars = re.sub(match_expr_unexpanding, r"$\1", expr)
+    inner = fretish.strip_parens(condition)
+    if isinstance(inner, fretish.BinaryOp) and inner.op == "->":
+        antecedent = fretish.to_python(inner.left, fret_req.variables)
+        consequence = fretish.to_python(inner.right, fret_req.variables)
+        return f"when {antecedent} then {consequence}"
 
-    return expr_with_vars
+    return fretish.to_python(condition, fret_req.variables)
 
 
 TAG = str
@@ -65,88 +93,320 @@ def _extract_scope_modes(fret_req: FRETRequirement) -> list[tuple[str | None, TA
         return [(None, "always")]
 
 
-# TODO: This currently can only handle '|' separated events,
-# we will need a more complex extraction and split code when we want
-# to also support '&'
-def _extract_events(event: str | None) -> list[tuple[str | None, TAG]]:
-    if event is not None:
-        all_events = re.findall(r"\w+", event)
-        return list(map(lambda x: (x, x), all_events))
-    else:
-        return [(None, "always")]
+def _extract_events(event: str | None) -> list[tuple[tuple[str, ...], tuple[TAG, ...]]]:
+    """Returns the conjuncts of the minimal DNF of the trigger `event`, each
+    fired by one test, with the tags of its events."""
+    if event is None:
+        return [((), ("always",))]
+
+    try:
+        trigger = fretish.parse(event)
+    except fretish.FRETishSyntaxError as err:
+        # kept as is, so the test fails visibly on the missing keyword
+        logger.warning(f"Trigger '{event}' can not be parsed: {err}")
+        return [((event,), (event,))]
+
+    try:
+        conjuncts = fretish.to_dnf(trigger)
+    except fretish.FRETishSyntaxError as err:
+        # e.g. comparisons, which can not be fired: keep each signal as alternative
+        logger.warning(f"Trigger '{event}' can not be split into events: {err}")
+        conjuncts = [(name,) for name in dict.fromkeys(fretish.iter_vars(trigger))]
+
+    return [(conjunct, conjunct) for conjunct in conjuncts]
 
 
-def _construct_taglist(req_id: str, mode: str, event: str) -> list[tuple[str, str]]:
-    tags = [("REQID", req_id), ("SCOPE", mode), ("TRIGGER", event)]
+def _construct_taglist(
+    req_id: str, mode: str, events: tuple[TAG, ...]
+) -> list[tuple[str, str]]:
+    tags = [("REQID", req_id), ("SCOPE", mode)]
+    tags += [("TRIGGER", event) for event in events]
 
     return tags
 
 
-def _add_single_test(suite: TestSuite, fret_req: FRETRequirement) -> None:
+def _templated_test(
+    req_id: str,
+    combinations: list[
+        tuple[tuple[str | None, TAG], tuple[tuple[str, ...], tuple[TAG, ...]]]
+    ],
+    check: tuple[str, ...],
+) -> GeneratedTest:
+    # the test has the tags of all its rows
+    scope_tags = dict.fromkeys(scope_tag for (_, scope_tag), _ in combinations)
+    event_tags = dict.fromkeys(
+        event_tag
+        for _, (_, conjunct_tags) in combinations
+        for event_tag in conjunct_tags
+    )
+    tags = [("REQID", req_id)]
+    tags += [("SCOPE", scope_tag) for scope_tag in scope_tags]
+    tags += [("TRIGGER", event_tag) for event_tag in event_tags]
+
+    # rows name the mode and the `&`-joined events by their tags, `always` for none
+    rows = [
+        (scope_tag, " & ".join(conjunct_tags), *check)
+        for (_, scope_tag), (_, conjunct_tags) in combinations
+    ]
+
+    return GeneratedTest(
+        name=f"TEST_{req_id}",
+        tags=tuple(f"{k}={v}" for k, v in tags),
+        body=tuple(rows),
+        template=TEMPLATE_KEYWORD,
+    )
+
+
+def _generate_tests(
+    fret_req: FRETRequirement, combinations: CombinationStrategy = FULL_EXPANSION
+) -> Iterator[GeneratedTest]:
     req_id = fret_req.req_id
     extracted_scopes = _extract_scope_modes(fret_req)
     extracted_events = _extract_events(fret_req.trigger_event)
 
-    test_number = 0
+    try:
+        satisfiable = ("Satisfy", _to_satisfiable(fret_req))
+    except fretish.FRETishSyntaxError as err:
+        logger.warning(f"{req_id} has a condition that can not be translated: {err}")
+        satisfiable = None
+
+    timing = fret_req.timing.lower()
+    if satisfiable is None:
+        check = ("FAIL", "condition can not be translated to Python")
+    elif timing.startswith("within") or timing.startswith("after"):
+        word, timing_cond = timing.split(" ", maxsplit=1)
+        check = (word.capitalize(), timing_cond, *satisfiable)
+    elif timing in ["immediately", "at the next timepoint"]:
+        check = (timing.capitalize(), *satisfiable)
+    elif timing in ["always", "never", "eventually"]:
+        check = (timing.capitalize(), *satisfiable)
+    elif timing.startswith("for "):
+        check = ("Holds For", timing.removeprefix("for "), *satisfiable)
+    else:
+        logger.warning(f"{req_id} has timing requirement {timing}, not implemented!")
+        check = ("FAIL", f"timing requirement '{timing}' not implemented")
+
+    selected = combinations.select(req_id, len(extracted_scopes), len(extracted_events))
+
+    if combinations.template:
+        yield _templated_test(
+            req_id,
+            [(extracted_scopes[s], extracted_events[e]) for s, e in selected],
+            check,
+        )
+        return
+
+    for scope_index, event_index in selected:
+        scope, scope_tag = extracted_scopes[scope_index]
+        events, event_tags = extracted_events[event_index]
+        # numbered as in the full expansion, so names do not depend on the strategy
+        test_number = scope_index * len(extracted_events) + event_index + 1
+
+        tags = _construct_taglist(req_id, scope_tag, event_tags)
+
+        body = []
+        if scope:
+            body.append((f"In {scope} mode",))
+
+        for event in events:
+            body.append(("Upon", event))
+
+        body.append(check)
+        if check[0] in MONITOR_KEYWORDS:
+            body.append(("Wait For Monitors",))
+
+        yield GeneratedTest(
+            name=f"TEST_{req_id}-{test_number}",
+            tags=tuple(f"{k}={v}" for k, v in tags),
+            body=tuple(body),
+            scope=scope,
+        )
+
+
+def iter_generated_tests(
+    fret_requirements: Iterable[FRETRequirement],
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> Iterator[GeneratedTest]:
+    for fret_req in fret_requirements:
+        yield from _generate_tests(fret_req, combinations)
+
+
+def _steps(test: GeneratedTest) -> Iterator[tuple[str, ...]]:
+    if test.template != TEMPLATE_KEYWORD:
+        yield from test.body
+        return
+
+    # the steps `Check Combination` runs for each row
+    for scope, trigger, *check in test.body:
+        if scope != "always":
+            yield (f"In {scope} mode",)
+        if trigger != "always":
+            for event in trigger.split("&"):
+                yield ("Upon", event.strip())
+        yield tuple(check)
+
+
+def _step_uses(step: tuple[str, ...]) -> Iterator[tuple[str, str]]:
+    name, *args = step
+    if name == "Upon":
+        yield args[0], "event"
+    elif not args and name.startswith("In ") and name.endswith(" mode"):
+        yield name, "mode"
+
+    for position, arg in enumerate(args[:-1]):
+        if arg == "Satisfy":
+            for signal in compile_satisfiable(args[position + 1]).variables:
+                yield signal, "signal"
+
+
+def iter_keyword_uses(test: GeneratedTest) -> Iterator[tuple[str, str]]:
+    """Yields `(name, kind)` of the modes (`In <mode> mode`), events and signals
+    `test` uses, `kind` being `mode`, `event` or `signal`."""
+    for step in _steps(test):
+        yield from _step_uses(step)
+
+
+def _condition_key(fret_req: FRETRequirement) -> tuple | None:
+    """Returns the normalized condition and its variables, or None if the
+    condition can not be parsed."""
+    try:
+        condition = fretish.parse(fret_req.condition_to_check)
+    except fretish.FRETishSyntaxError:
+        return None
+    variables = frozenset(fretish.iter_vars(condition)) & set(fret_req.variables)
+    return fretish.normalize(condition), variables
+
+
+def _without_condition(step: tuple[str, ...]) -> tuple[str, ...]:
+    # the condition is compared in its normalized form instead
+    if len(step) >= 2 and step[-2] == "Satisfy":
+        return step[:-1]
+    return step
+
+
+def deduplicate_tests(
+    fret_requirements: Iterable[FRETRequirement],
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> list[GeneratedTest]:
+    """Generates the tests of `fret_requirements`, merging tests that check the
+    same in the same way.
+
+    Tests are the same if they only differ in their name, their tags and the
+    formatting of their condition, compared with `fretish.normalize`. The first
+    of them is kept, with the `REQID` tags of all of them.
+    """
+    merged: dict[tuple, GeneratedTest] = {}
+    for fret_req in fret_requirements:
+        condition_key = _condition_key(fret_req)
+        for test in _generate_tests(fret_req, combinations):
+            if condition_key is None:
+                merged[(test.name,)] = test
+                continue
 
-    for scope, scope_tag in extracted_scopes:
-        for event, event_tag in extracted_events:
-            test_number += 1
+            shape = tuple(map(_without_condition, test.body))
+            key = (test.template, shape, condition_key)
+            if key not in merged:
+                merged[key] = test
+            elif (req_tag := f"REQID={fret_req.req_id}") not in merged[key].tags:
+                kept = merged[key]
+                merged[key] = dataclasses.replace(kept, tags=(*kept.tags, req_tag))
 
-            tags = _construct_taglist(req_id, scope_tag, event_tag)
+    return list(merged.values())
 
-            test: TestCase = suite.tests.create(
-                f"TEST_{req_id}-{test_number}", tags=[f"{k}={v}" for k, v in tags]
-            )
-            body: Body = test.body
 
-            if scope:
-                body.create_keyword(f"In {scope} mode")
+def merged_requirements(tests: Iterable[GeneratedTest]) -> dict[str, list[str]]:
+    """Returns the requirement ids by test name, of tests merged by
+    `deduplicate_tests`."""
+    return {test.name: list(test.req_ids) for test in tests if len(test.req_ids) > 1}
 
-            if event:
-                body.create_keyword("Upon", args=[event])
 
-            condition = fret_req.condition_to_check
-            condition = _to_python_expr(condition)
-            condition = _prefix_vars(condition, fret_req.variables)
+def generate_robot_suite(
+    tests: Iterable[GeneratedTest], extra_libs: list[str]
+) -> TestSuite:
+    """Builds the `TestSuite` of already generated `tests`."""
+    suite = _get_testsuite()
+    _add_libs(suite, extra_libs)
 
-            if " -> " in condition:
-                antecedent, consequence = condition[1:-1].split(" -> ")
-                satisfiable = Keyword(
-                    "Satisfy", args=[f"when {antecedent} then {consequence}"]
-                )
+    for generated in tests:
+        test = suite.tests.create(
+            generated.name, tags=generated.tags, template=generated.template
+        )
+        for name, *args in generated.body:
+            if generated.template:
+                # rows only hold arguments, like parsed templated tests
+                test.body.create_keyword(generated.template, args=(name, *args))
             else:
-                satisfiable = Keyword("Satisfy", args=[condition])
+                test.body.create_keyword(name, args=args)
 
-            timing = fret_req.timing.lower()
-            if timing.startswith("within") or timing.startswith("after"):
-                word, timing_cond = timing.split(" ", maxsplit=1)
-
-                body.create_keyword(word.capitalize(), args=[timing_cond, satisfiable])
-            elif timing in ["immediately", "at the next timepoint"]:
-                body.create_keyword(timing.capitalize(), args=[satisfiable])
-            else:
-                logger.warning(
-                    f"{req_id} has timing requirement {timing}, not implemented!"
-                )
-                body.create_keyword(
-                    "FAIL", args=[f"timing requirement '{timing}' not implemented"]
-                )
+    return suite
 
 
-def _add_tests_from_requirements(
-    suite: TestSuite, fret_requirements: list[FRETRequirement]
-) -> None:
+def generate_robot_suite_from_fret(
+    fret_requirements: list[FRETRequirement],
+    extra_libs: list[str],
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> TestSuite:
+    return generate_robot_suite(
+        iter_generated_tests(fret_requirements, combinations), extra_libs
+    )
+
+
+def _trigger_of(test: GeneratedTest) -> str:
+    return next(tag for tag in test.tags if tag.startswith("TRIGGER="))
+
+
+def _condition_signals(fret_req: FRETRequirement) -> tuple[str, ...]:
+    # FRET's variables also contain modes and triggers, only the signals of the
+    # condition are relevant for the check
+    try:
+        condition = fretish.parse(fret_req.condition_to_check)
+    except fretish.FRETishSyntaxError:
+        return ()  # the test fails anyway, see `_generate_tests`
+    names = set(fretish.iter_vars(condition))
+    return tuple(var for var in fret_req.variables if var in names)
+
+
+def generate_scope_suites(
+    fret_requirements: Iterable[FRETRequirement],
+    extra_libs: list[str],
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> list[TestSuite]:
+    """Generates one suite per scope mode, in order of first occurrence.
+
+    The mode is entered once in the `Suite Setup` instead of in each test, and
+    each test only resets the signals of its requirement with `Reset Signals`.
+    These suites have the mode in their `FRET Shared Scope` metadata.
+    Tests with the same trigger are adjacent. Tests without scope are in a
+    suite without setup, named after their `always` scope tag.
+
+    Data-driven tests (`combinations.template`) are not supported, as their
+    rows can be in different modes.
+    """
+    if combinations.template:
+        raise ValueError("Tests grouped by scope can not be data-driven")
+
+    groups: dict[str | None, list[tuple[GeneratedTest, tuple[str, ...]]]] = {}
     for fret_req in fret_requirements:
-        _add_single_test(suite, fret_req)
+        for test in _generate_tests(fret_req, combinations):
+            groups.setdefault(test.scope, []).append(
+                (test, _condition_signals(fret_req))
+            )
 
+    suites = []
+    for scope, tests in groups.items():
+        suite = TestSuite(f"{SUITE_NAME} {scope or 'always'}")
+        _add_libs(suite, extra_libs)
+        if scope:
+            suite.setup.config(name=f"In {scope} mode")
+            suite.metadata[SHARED_SCOPE_METADATA] = scope
 
-def generate_robot_suite_from_fret(
-    fret_requirements: list[FRETRequirement], extra_libs: list[str]
-) -> TestSuite:
-    suite = _get_testsuite()
+        for generated, variables in sorted(tests, key=lambda t: _trigger_of(t[0])):
+            test = suite.tests.create(generated.name, tags=generated.tags)
+            test.setup.config(name="Reset Signals", args=variables)
+            body = generated.body[1:] if scope else generated.body
+            for name, *args in body:
+                test.body.create_keyword(name, args=args)
 
-    _add_libs(suite, extra_libs)
-    _add_tests_from_requirements(suite, fret_requirements)
+        suites.append(suite)
 
-    return suite
+    return suites
@@ -0,0 +1,167 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Incremental regeneration of a generated test suite.
+
+A manifest next to the generated `tests.robot` maps each requirement id to a
+hash of its relevant semantics. Only tests of requirements whose hash changed
+are regenerated and spliced into the existing output. The manifest also holds
+a hash of the package version and the generation settings, everything is
+regenerated if they changed.
+"""
+
+import dataclasses
+import hashlib
+import importlib.metadata
+import json
+import logging
+import pathlib
+
+from fretish_robot.combinations import FULL_EXPANSION, CombinationStrategy
+from fretish_robot.parallel import render_testsuite_parallel
+from fretish_robot.requirements import FRETRequirement
+from fretish_robot.writer import (
+    TEST_CASES_HEADER,
+    TESTSUITE_FILENAME,
+    remove_shard_suites,
+    render_requirements,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".fret_manifest.json"
+MANIFEST_VERSION = 2
+
+
+def requirement_hash(fret_req: FRETRequirement) -> str:
+    content = json.dumps(dataclasses.astuple(fret_req))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _generator_version() -> str:
+    try:
+        return importlib.metadata.version("fretish-robot")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _settings_hash(extra_libs: list[str], combinations: CombinationStrategy) -> str:
+    settings = {
+        "generator": _generator_version(),
+        "extra_libs": extra_libs,
+        "combinations": dataclasses.asdict(combinations),
+    }
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()
+
+
+def _req_id_of_test(test_name: str) -> str:
+    # test names are `TEST_<reqid>-<number>`
+    return test_name.removeprefix("TEST_").rsplit("-", maxsplit=1)[0]
+
+
+def split_testsuite(content: str) -> tuple[str, dict[str, str]]:
+    """Splits a generated test suite into its header (everything up to the test
+    cases) and the test blocks, grouped and concatenated by requirement id."""
+    header, separator, tests = content.partition(f"{TEST_CASES_HEADER}\n")
+    if not separator:
+        raise ValueError(f"No '{TEST_CASES_HEADER}' section found")
+
+    blocks_by_req: dict[str, str] = {}
+    for block in tests.split("\n\n"):
+        if not block.strip():
+            continue
+        test_name = block.lstrip("\n").split("\n", maxsplit=1)[0]
+        req_id = _req_id_of_test(test_name)
+        blocks_by_req[req_id] = blocks_by_req.get(req_id, "") + block + "\n\n"
+
+    return header + separator, blocks_by_req
+
+
+def _load_manifest(manifest_path: pathlib.Path) -> dict | None:
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+
+    return manifest
+
+
+def write_testsuite_incrementally(
+    fret_requirements: list[FRETRequirement],
+    extra_libs: list[str],
+    root_output_dir: str,
+    jobs: int = 1,
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> list[str]:
+    """Writes the test suite for `fret_requirements` like `write_testsuite`,
+    but only regenerates tests of changed requirements.
+
+    Falls back to a full regeneration if no matching manifest or output exists.
+    With `jobs` > 1, the changed tests are generated in that many processes.
+    Returns the ids of the regenerated requirements.
+
+    Data-driven tests (`combinations.template`) are not supported, as their
+    names do not carry the number of a combination.
+    """
+    if combinations.template:
+        raise ValueError("Data-driven tests can not be regenerated incrementally")
+
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    output_path = root_output_folder / TESTSUITE_FILENAME
+    manifest_path = root_output_folder / MANIFEST_FILENAME
+
+    settings_hash = _settings_hash(extra_libs, combinations)
+    req_hashes = {
+        fret_req.req_id: requirement_hash(fret_req) for fret_req in fret_requirements
+    }
+
+    old_hashes: dict[str, str] = {}
+    old_blocks: dict[str, str] = {}
+    manifest = _load_manifest(manifest_path)
+    if manifest is not None and manifest["settings"] == settings_hash:
+        try:
+            _, old_blocks = split_testsuite(output_path.read_text())
+            old_hashes = manifest["requirements"]
+        except (OSError, ValueError):
+            logger.info("No usable previous output, regenerating all tests")
+
+    changed = [
+        fret_req
+        for fret_req in fret_requirements
+        if old_hashes.get(fret_req.req_id) != req_hashes[fret_req.req_id]
+        or fret_req.req_id not in old_blocks
+    ]
+
+    if jobs > 1:
+        content = render_testsuite_parallel(changed, extra_libs, jobs, combinations)
+    else:
+        content = render_requirements(changed, extra_libs, combinations)
+    header, new_blocks = split_testsuite(content)
+
+    remove_shard_suites(root_output_folder)
+    with open(output_path, "w") as output_file:
+        output_file.write(header)
+        for fret_req in fret_requirements:
+            req_id = fret_req.req_id
+            if req_id in new_blocks:
+                output_file.write(new_blocks[req_id])
+            else:
+                output_file.write(old_blocks[req_id])
+
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(
+            {
+                "version": MANIFEST_VERSION,
+                "settings": settings_hash,
+                "requirements": req_hashes,
+            },
+            manifest_file,
+            indent=2,
+        )
+
+    return [fret_req.req_id for fret_req in changed]
@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Background monitors for timings that span the rest of a test.
+
+A `Monitor` samples a `Satisfy` expression in its own thread at a steady rate,
+while the test continues with other keywords. It stops on its own when the
+outcome is decided (e.g. the first violation of `always`) or its window ended.
+Generated tests wait for the window with `Wait For Monitors`, otherwise a
+monitor is stopped at the end of the test.
+
+With a virtual clock, a monitor has no thread; its samples are scheduled on
+the clock and taken while the test advances it.
+"""
+
+import dataclasses
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from fretish_robot.clock import REAL_CLOCK, Clock
+from fretish_robot.satisfiable import CompiledSatisfiable, with_sampled_values
+from fretish_robot.snapshot import timepoint
+
+MONITOR_MODES = ("always", "never", "eventually")
+
+
+@dataclasses.dataclass(frozen=True)
+class Violation:
+    """The first sample deciding a monitor failed, `elapsed` seconds after its start."""
+
+    elapsed: float
+    message: str
+
+
+class Monitor:
+    """Samples `compiled` every `interval` seconds in a background thread.
+
+    * `always`: every sample must hold.
+    * `never`: no sample may hold.
+    * `eventually`: at least one sample must hold.
+
+    With a `window` (in seconds), sampling stops after that time, otherwise when
+    `stop` is called. Signals are only read with `sample`, which returns the
+    values of all variables of `compiled` and must not run Robot Framework
+    keywords, as these can not be run outside of the main thread.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        compiled: CompiledSatisfiable,
+        sample: Callable[[], dict[str, Any]],
+        interval: float,
+        window: float | None = None,
+        clock: Clock = REAL_CLOCK,
+    ) -> None:
+        if mode not in MONITOR_MODES:
+            raise ValueError(
+                f"Unknown monitor mode '{mode}', use one of {MONITOR_MODES}"
+            )
+
+        self.mode = mode
+        self.compiled = compiled
+        self.samples = 0
+
+        self._read_signals = sample
+        self._interval = interval
+        self._window = window
+        self._clock = clock
+        self._timer = None
+        self._violation: Violation | None = None
+        self._decided = False
+        self._last_error: str | None = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"FRET {mode} monitor", daemon=True
+        )
+        self._start = 0.0
+
+    def start(self) -> None:
+        self._start = self._clock.now()
+        if self._clock.virtual:
+            self._tick(self._start)
+        else:
+            self._thread.start()
+
+    def wait(self) -> None:
+        """Waits until the window ended or the outcome is decided, returns
+        immediately for a monitor without a window."""
+        if self._window is None:
+            return
+        if not self._clock.virtual:
+            self._thread.join()
+        elif self._timer is not None:
+            remaining = self._deadline() - self._clock.now()
+            if remaining > 0:
+                self._clock.sleep(remaining)
+
+    def stop(self) -> Violation | None:
+        """Stops sampling and returns the violation, if any."""
+        self._stopped.set()
+        if self._clock.virtual:
+            if self._timer is not None:
+                # like the thread, take a last sample when stopped
+                self._timer.cancel()
+                self._step(self._deadline())
+        else:
+            self._thread.join()
+
+        if self.mode == "eventually" and not self._decided:
+            elapsed = self._clock.now() - self._start
+            message = f"'{self.compiled.check_expression}' never became true."
+            if self._last_error is not None:
+                message += f" The last error was: {self._last_error}"
+            return Violation(elapsed, message)
+
+        return self._violation
+
+    def _deadline(self) -> float:
+        return float("inf") if self._window is None else self._start + self._window
+
+    def _step(self, deadline: float) -> bool:
+        """Takes a sample, returns whether sampling is over."""
+        ending = self._stopped.is_set() or self._clock.now() >= deadline
+        self._sample()
+        return self._decided or ending
+
+    def _run(self) -> None:
+        deadline = self._deadline()
+        next_sample = self._start
+
+        while not self._step(deadline):
+            # Scheduling from the planned time keeps the rate steady, even if
+            # reading the signals takes a while
+            next_sample += self._interval
+            timeout = min(next_sample, deadline) - self._clock.now()
+            self._stopped.wait(max(timeout, 0))
+
+    def _tick(self, planned: float) -> None:
+        deadline = self._deadline()
+        self._timer = None
+        if self._step(deadline):
+            return
+        planned += self._interval
+        self._timer = self._clock.call_later(
+            min(planned, deadline) - self._clock.now(), self._tick, planned
+        )
+
+    def _sample(self) -> None:
+        self.samples += 1
+        values: dict[str, Any] = {}
+        try:
+            with timepoint():
+                values = self._read_signals()
+            holds = self.compiled.evaluate(values)
+        except Exception as err:
+            holds, self._last_error = None, str(err)
+
+        elapsed = self._clock.now() - self._start
+        if self.mode == "eventually":
+            self._decided = holds is True
+        elif holds is None:
+            self._fail(elapsed, f"Sampling failed: {self._last_error}")
+        elif self.mode == "always" and not holds:
+            self._fail(elapsed, self.compiled.failure_message(values))
+        elif self.mode == "never" and holds:
+            message = f"'{self.compiled.check_expression}' should never be true."
+            self._fail(elapsed, with_sampled_values(message, values))
+
+    def _fail(self, elapsed: float, message: str) -> None:
+        self._violation = Violation(elapsed, message)
+        self._decided = True
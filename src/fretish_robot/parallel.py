@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Generation of the test suite text across several processes.
+
+Requirements are split into contiguous chunks, each worker generates and
+renders the tests of its chunks with `RobotTextEmitter`, and the parent concatenates the test blocks
+in chunk order. The result is identical to the serial generation.
+"""
+
+import dataclasses
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+from fretish_robot.combinations import FULL_EXPANSION, CombinationStrategy
+from fretish_robot.generate_robot import iter_generated_tests, suite_libraries
+from fretish_robot.requirements import FRETRequirement
+from fretish_robot.writer import RobotTextEmitter
+
+# More chunks than workers, so uneven chunks still keep all workers busy
+CHUNKS_PER_JOB = 4
+
+
+def _render_test_blocks(
+    combinations: CombinationStrategy, req_fields: list[tuple]
+) -> str:
+    fret_requirements = [FRETRequirement(*fields) for fields in req_fields]
+    output = io.StringIO()
+    RobotTextEmitter(output).write_tests(
+        iter_generated_tests(fret_requirements, combinations)
+    )
+    return output.getvalue()
+
+
+def render_testsuite_parallel(
+    fret_requirements: list[FRETRequirement],
+    extra_libs: list[str],
+    jobs: int,
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> str:
+    """Generates and renders the test suite for `fret_requirements` using `jobs`
+    processes, returning the same text as `render_testsuite` on the serially
+    generated suite."""
+    header = io.StringIO()
+    RobotTextEmitter(header).write_header(suite_libraries(extra_libs))
+    if not fret_requirements:
+        return header.getvalue()
+
+    # requirements are sent as plain tuples, which pickle cheaply
+    req_fields = [dataclasses.astuple(fret_req) for fret_req in fret_requirements]
+    chunk_count = min(len(req_fields), jobs * CHUNKS_PER_JOB)
+    chunk_size = -(-len(req_fields) // chunk_count)
+    chunks = [
+        req_fields[start : start + chunk_size]
+        for start in range(0, len(req_fields), chunk_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        render = functools.partial(_render_test_blocks, combinations)
+        blocks = executor.map(render, chunks)
+        return header.getvalue() + "".join(blocks)
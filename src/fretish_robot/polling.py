@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import itertools
+from collections.abc import Iterator
+
+BACKOFF_STRATEGIES = ("fixed", "exponential", "capped")
+
+
+@dataclasses.dataclass
+class PollingStrategy:
+    """How often `Within` samples its condition.
+
+    * `fixed`: every `interval` seconds.
+    * `exponential`: starting at `interval`, doubling after each sample.
+    * `capped`: like `exponential`, but at most every `max_interval` seconds.
+
+    In `push` mode, `Within` does not poll but waits until a user library
+    reports a change of one of the condition's signals.
+    """
+
+    backoff: str = "capped"
+    interval: float = 0.001
+    max_interval: float = 0.05
+    push: bool = False
+
+    def __post_init__(self):
+        if self.backoff not in BACKOFF_STRATEGIES:
+            raise ValueError(
+                f"Unknown backoff '{self.backoff}', use one of {BACKOFF_STRATEGIES}"
+            )
+        # a non-positive interval would sample in a busy loop
+        if self.interval <= 0:
+            raise ValueError(f"Polling interval must be positive, got {self.interval}")
+        # only `capped` uses `max_interval`, so `fixed` may poll less often than it
+        if self.backoff == "capped" and self.max_interval < self.interval:
+            raise ValueError(
+                f"Maximum polling interval {self.max_interval} is below the "
+                f"polling interval {self.interval}"
+            )
+
+    def intervals(self) -> Iterator[float]:
+        if self.backoff == "fixed":
+            yield from itertools.repeat(self.interval)
+
+        cap = self.max_interval if self.backoff == "capped" else float("inf")
+        interval = min(self.interval, cap)
+        while True:
+            yield interval
+            interval = min(interval * 2, cap)
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Static check that the user libraries implement the keywords of generated tests.
+
+`check_keywords` imports the libraries like Robot Framework does, but without
+starting a run, and resolves each mode (`In <mode> mode`), event (`Upon`) and
+signal (`$name` in conditions) of the generated tests to a library keyword,
+including keywords with embedded arguments like `request_move_${dir}`.
+
+The resolved keywords can be written as a table of qualified keyword names,
+which `FRETLib` uses at runtime with its `keyword_table` argument.
+"""
+
+import dataclasses
+import json
+import pathlib
+from collections.abc import Iterable
+
+from robot.running import TestLibrary
+from robot.utils import normalize
+
+from fretish_robot.generate_robot import GeneratedTest, iter_keyword_uses
+from fretish_robot.signals import SAMPLED_SIGNALS_ATTRIBUTE, SAMPLER_METHOD
+
+KEYWORD_TABLE_FILENAME = "keyword_table.json"
+
+
+@dataclasses.dataclass
+class KeywordUse:
+    """A keyword called by generated tests, and the library keyword it resolves to.
+
+    `kind` is `mode`, `event` or `signal`. `resolved` is the qualified name
+    (`Library.name`), or None if no library implements it. Signals without
+    keyword are `sampled` if a library implementing `sample_signals` declares
+    them in its `SAMPLED_SIGNALS`.
+    """
+
+    name: str
+    kind: str
+    req_ids: list[str] = dataclasses.field(default_factory=list)
+    resolved: str | None = None
+    sampled: bool = False
+
+    @property
+    def missing(self) -> bool:
+        return self.resolved is None and not self.sampled
+
+
+def keyword_uses(tests: Iterable[GeneratedTest]) -> dict[str, KeywordUse]:
+    """Returns the modes, events and signals used by `tests`, by name."""
+    uses: dict[str, KeywordUse] = {}
+    for test in tests:
+        for name, kind in iter_keyword_uses(test):
+            use = uses.setdefault(name, KeywordUse(name, kind))
+            use.req_ids.extend(r for r in test.req_ids if r not in use.req_ids)
+    return uses
+
+
+def import_library(name: str) -> TestLibrary:
+    """Imports the library `name` (a module, class or file path) like Robot
+    Framework. Raises `robot.errors.DataError` if it can not be imported."""
+    path = pathlib.Path(name)
+    if path.suffix == ".py" and path.is_file():
+        # Robot resolves relative paths against the suite file, there is none yet
+        name = str(path.absolute())
+    return TestLibrary.from_name(name)
+
+
+def _resolve(name: str, libraries: list[TestLibrary]) -> str | None:
+    # like Robot, exact names win over embedded arguments, in import order
+    normalized = normalize(name, ignore="_")
+    for library in libraries:
+        for kw in library.keywords:
+            if not kw.embedded and normalize(kw.name, ignore="_") == normalized:
+                if kw.args.minargs == 0:
+                    return f"{library.name}.{name}"
+    for library in libraries:
+        for kw in library.keywords:
+            match = kw.embedded.match(name) if kw.embedded else None
+            if match and kw.args.minargs <= len(kw.embedded.args):
+                return f"{library.name}.{name}"
+    return None
+
+
+def _sampled_signals(libraries: list[TestLibrary]) -> set[str]:
+    sampled: set[str] = set()
+    for library in libraries:
+        if callable(getattr(library.instance, SAMPLER_METHOD, None)):
+            sampled.update(getattr(library.instance, SAMPLED_SIGNALS_ATTRIBUTE, ()))
+    return sampled
+
+
+def check_keywords(
+    tests: Iterable[GeneratedTest], extra_libs: list[str]
+) -> list[KeywordUse]:
+    """Resolves the keywords used by `tests` in the libraries `extra_libs` and
+    `BuiltIn`, returning the uses in order of first occurrence."""
+    libraries = [import_library(lib) for lib in extra_libs]
+    sampled = _sampled_signals(libraries)
+    libraries.append(import_library("BuiltIn"))
+
+    uses = list(keyword_uses(tests).values())
+    for use in uses:
+        use.resolved = _resolve(use.name, libraries)
+        use.sampled = (
+            use.resolved is None and use.kind == "signal" and use.name in sampled
+        )
+    return uses
+
+
+def write_keyword_table(uses: Iterable[KeywordUse], root_output_dir: str):
+    """Writes the qualified names of the resolved `uses` as
+    `keyword_table.json` into `root_output_dir`."""
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    table = {use.name: use.resolved for use in uses if use.resolved is not None}
+    with open(root_output_folder / KEYWORD_TABLE_FILENAME, "w") as table_file:
+        json.dump(table, table_file, indent=2)
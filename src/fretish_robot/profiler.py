@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Opt-in listener attributing the run time of generated suites.
+
+Enable it with
+
+```sh
+robot --listener fretish_robot.profiler.FRETProfiler:output_dir=profile tests.robot
+```
+
+Wall and CPU time are attributed exclusively to the innermost of these
+categories:
+
+* `fretlib`: FRETLib keywords themselves, e.g. compiling and evaluating
+* `signals`: reading signals, by keyword or `sample_signals`
+* `events`: the keywords run by `Upon`
+* `sleep`: waiting in `Within`, `After` and `Sleep`
+* `keywords`: all other keywords, e.g. `In ... mode`
+
+At the end of the run, `fret_profile.json` holds the times per test and per
+`REQID`, `SCOPE` and `TRIGGER` tag, and `fret_profile.collapsed` the keyword
+stacks in the collapsed format of flamegraph tools (in microseconds). With
+`cprofile=True`, FRETLib keywords additionally run under `cProfile`, written to
+`fret_profile.prof`.
+"""
+
+import contextlib
+import dataclasses
+import json
+import pathlib
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+
+CATEGORIES = ("fretlib", "signals", "events", "sleep", "keywords")
+PROFILED_TAGS = ("REQID", "SCOPE", "TRIGGER")
+FRETLIB_NAME = "fretish_robot.FRETLib"
+
+_active_profiler: "FRETProfiler | None" = None
+
+
+@contextlib.contextmanager
+def profile_section(category: str) -> Iterator[None]:
+    """Attributes the time of the `with` block to `category`, if profiling."""
+    profiler = _active_profiler
+    if profiler is None or threading.get_ident() != profiler.thread_id:
+        yield
+        return
+
+    profiler.push(category, category)
+    try:
+        yield
+    finally:
+        profiler.pop()
+
+
+@dataclasses.dataclass
+class _Frame:
+    name: str
+    category: str
+
+
+class FRETProfiler:
+    """Robot Framework listener, see the module documentation."""
+
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(self, output_dir: str = ".", cprofile: str = "False") -> None:
+        self.thread_id = threading.get_ident()
+
+        self._output_dir = pathlib.Path(output_dir)
+        self._profile = None
+        if cprofile.lower() in ("true", "yes", "1"):
+            import cProfile
+
+            self._profile = cProfile.Profile()
+        self._profile_depth = 0
+
+        self._stack: list[_Frame] = []
+        self._last_wall = time.perf_counter()
+        self._last_cpu = time.process_time()
+
+        self._test_wall: Counter[str] = Counter()
+        self._test_cpu: Counter[str] = Counter()
+        self._tests: dict[str, dict] = {}
+        self._tags: dict[str, dict[str, Counter[str]]] = {}
+        self._stacks: Counter[str] = Counter()
+
+    def push(self, name: str, category: str) -> None:
+        self._account()
+        # `;` separates the frames of collapsed stacks
+        self._stack.append(_Frame(name.replace(";", ","), category))
+
+    def pop(self) -> None:
+        self._account()
+        self._stack.pop()
+
+    def _account(self) -> None:
+        """Attributes the time since the last push or pop to the innermost frame."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._stack:
+            category = self._stack[-1].category
+            self._test_wall[category] += wall - self._last_wall
+            self._test_cpu[category] += cpu - self._last_cpu
+            stack = ";".join(frame.name for frame in self._stack)
+            self._stacks[stack] += round((wall - self._last_wall) * 1e6)
+        self._last_wall, self._last_cpu = wall, cpu
+
+    def _category(self, data, result) -> str:
+        parent = self._stack[-1] if self._stack else None
+        in_fretlib = parent is not None and parent.category in ("fretlib", "signals")
+
+        if result.owner == FRETLIB_NAME:
+            return "fretlib"
+        if result.owner == "BuiltIn" and result.name == "Sleep":
+            return "sleep"
+        if in_fretlib and parent.name.endswith(".Upon"):
+            return "events"
+        if in_fretlib:
+            return "signals"
+        if parent is not None and parent.category in ("events", "signals"):
+            return parent.category
+        return "keywords"
+
+    def start_suite(self, data, result):
+        global _active_profiler
+        _active_profiler = self
+
+    def start_test(self, data, result):
+        self._test_wall.clear()
+        self._test_cpu.clear()
+        self.push(result.full_name, "keywords")
+
+    def end_test(self, data, result):
+        self.pop()
+        wall = {name: round(self._test_wall[name], 6) for name in CATEGORIES}
+        cpu = {name: round(self._test_cpu[name], 6) for name in CATEGORIES}
+        self._tests[result.full_name] = {"wall": wall, "cpu": cpu}
+
+        for tag in result.tags:
+            name, separator, _ = tag.partition("=")
+            if not separator or name not in PROFILED_TAGS:
+                continue
+            totals = self._tags.setdefault(tag, {"wall": Counter(), "cpu": Counter()})
+            totals["wall"].update(wall)
+            totals["cpu"].update(cpu)
+
+    def start_keyword(self, data, result):
+        category = self._category(data, result)
+        self.push(result.full_name, category)
+        if self._profile is not None and category == "fretlib":
+            if self._profile_depth == 0:
+                self._profile.enable()
+            self._profile_depth += 1
+
+    def end_keyword(self, data, result):
+        if self._profile is not None and self._stack[-1].category == "fretlib":
+            self._profile_depth -= 1
+            if self._profile_depth == 0:
+                self._profile.disable()
+        self.pop()
+
+    def close(self):
+        global _active_profiler
+        _active_profiler = None
+
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        totals = {"wall": Counter(), "cpu": Counter()}
+        for test in self._tests.values():
+            totals["wall"].update(test["wall"])
+            totals["cpu"].update(test["cpu"])
+
+        def rounded(times: dict[str, Counter[str]]) -> dict:
+            return {
+                kind: {name: round(counter[name], 6) for name in CATEGORIES}
+                for kind, counter in times.items()
+            }
+
+        with open(self._output_dir / "fret_profile.json", "w") as profile_file:
+            json.dump(
+                {
+                    "total": rounded(totals),
+                    "tests": self._tests,
+                    "tags": {tag: rounded(times) for tag, times in self._tags.items()},
+                },
+                profile_file,
+                indent=2,
+            )
+
+        with open(self._output_dir / "fret_profile.collapsed", "w") as stacks_file:
+            for stack, microseconds in self._stacks.items():
+                if microseconds > 0:
+                    stacks_file.write(f"{stack} {microseconds}\n")
+
+        if self._profile is not None:
+            self._profile.dump_stats(self._output_dir / "fret_profile.prof")
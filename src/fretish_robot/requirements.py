@@ -3,9 +3,27 @@
 
 import dataclasses
 import json
-
-
-@dataclasses.dataclass
+import sys
+from collections.abc import Iterator
+from typing import TextIO
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Only these parts of a requirement's `semantics` are needed, all other
+# (diagrams, descriptions, formulas, ...) are dropped right after parsing.
+_SEMANTICS_FIELDS = (
+    "scope_mode",
+    "scopeTextRange",
+    "regular_condition_unexp_pt",
+    "timingTextRange",
+    "post_condition_unexp_ft",
+    "variables",
+)
+# The future-time formula, only kept on request as it is long
+_FORMULA_FIELD = "ft"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class FRETRequirement:
     req_id: str
     requirement_phrase: str
@@ -13,7 +31,14 @@ class FRETRequirement:
     trigger_event: str | None
     timing: str
     condition_to_check: str
-    variables: list[str]
+    variables: tuple[str, ...]
+    ft: str | None = None
+
+
+def _intern(symbol: str | None) -> str | None:
+    # Signal names, modes, triggers and timings repeat across thousands of
+    # requirements, interning lets all requirements share one string object each.
+    return sys.intern(symbol) if symbol is not None else None
 
 
 def _transform_to_fret_req(req: dict) -> FRETRequirement:
@@ -34,27 +59,134 @@ def _transform_to_fret_req(req: dict) -> FRETRequirement:
 
     condition_to_check = semantics["post_condition_unexp_ft"]
 
-    variables = semantics["variables"]
+    variables = tuple(map(sys.intern, semantics["variables"]))
 
     fret_req = FRETRequirement(
         req_id=req_id,
         requirement_phrase=fulltext,
-        scope_mode=scope_mode,
-        trigger_event=pre_condition,
-        timing=timing,
+        scope_mode=_intern(scope_mode),
+        trigger_event=_intern(pre_condition),
+        timing=sys.intern(timing),
         condition_to_check=condition_to_check,
         variables=variables,
+        ft=semantics.get(_FORMULA_FIELD, None),
     )
 
     return fret_req
 
 
-def load_fret_requirements(fret_json_input_filepath: str) -> list[FRETRequirement]:
-    with open(fret_json_input_filepath, "r") as fret_json_file:
-        requirement_dicts = json.load(fret_json_file)
+def _iter_json_array(json_file: TextIO) -> Iterator:
+    """Incrementally decodes the elements of the top-level JSON array in `json_file`.
+
+    Only the currently decoded element and a read buffer are kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    read_size = _READ_CHUNK_SIZE
+    eof = False
+
+    def skip_whitespace():
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            chunk = json_file.read(read_size)
+            eof = not chunk
+            buffer, pos = chunk, 0
+
+    def expect(chars: str) -> str:
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] not in chars:
+            found = repr(buffer[pos]) if pos < len(buffer) else "end of file"
+            raise json.JSONDecodeError(
+                f"Expected one of {chars!r}, found {found}", buffer, pos
+            )
+        return buffer[pos]
+
+    expect("[")
+    pos += 1
+
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "]":
+        return
+
+    while True:
+        skip_whitespace()
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+
+        # element may not be complete yet (a number can be cut at the buffer end),
+        # read more with growing chunks for huge elements
+        if end is None or (end == len(buffer) and not eof):
+            chunk = json_file.read(read_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            read_size *= 2
+            continue
+
+        read_size = _READ_CHUNK_SIZE
+        pos = end
+        yield element
+
+        if expect(",]") == "]":
+            return
+        pos += 1
+
+
+def _strip_unused_fields(req: dict, fields: tuple[str, ...]) -> dict:
+    semantics = req["semantics"]
+    return {
+        "reqid": req["reqid"],
+        "fulltext": req["fulltext"],
+        "semantics": {k: semantics[k] for k in fields if k in semantics},
+    }
 
-    result = [
-        _transform_to_fret_req(req) for req in requirement_dicts if req["semantics"]
-    ]
 
-    return result
+def iter_fret_requirements(
+    fret_json_input_filepath: str, formulas: bool = False
+) -> Iterator[FRETRequirement]:
+    """Lazily loads the requirements of a FRET JSON export, one at a time.
+
+    With `formulas`, the future-time formulas (`ft`) are kept as well.
+    """
+    fields = (*_SEMANTICS_FIELDS, _FORMULA_FIELD) if formulas else _SEMANTICS_FIELDS
+    with open(fret_json_input_filepath, "r") as fret_json_file:
+        for req in _iter_json_array(fret_json_file):
+            if req["semantics"]:
+                yield _transform_to_fret_req(_strip_unused_fields(req, fields))
+
+
+def load_fret_requirements(
+    fret_json_input_filepath: str, formulas: bool = False
+) -> list[FRETRequirement]:
+    return list(iter_fret_requirements(fret_json_input_filepath, formulas))
+
+
+def iter_sorted_fret_requirements(
+    fret_json_input_filepath: str, formulas: bool = False
+) -> Iterator[FRETRequirement]:
+    """Like `iter_fret_requirements`, but ordered by requirement id.
+
+    Only the ids are sorted up front. The export is then streamed again and
+    only requirements read before their turn are held, so an export that is
+    (nearly) ordered already is still processed one requirement at a time.
+    """
+    req_ids = [r.req_id for r in iter_fret_requirements(fret_json_input_filepath)]
+    order = sorted(range(len(req_ids)), key=req_ids.__getitem__)
+    del req_ids
+
+    early: dict[int, FRETRequirement] = {}
+    rank = 0
+    requirements = iter_fret_requirements(fret_json_input_filepath, formulas)
+    for position, fret_req in enumerate(requirements):
+        early[position] = fret_req
+        while rank < len(order) and order[rank] in early:
+            yield early.pop(order[rank])
+            rank += 1
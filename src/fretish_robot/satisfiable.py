@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import builtins
+import dataclasses
+import functools
+import re
+from types import CodeType
+from typing import Any
+
+VAREXPR_RE = re.compile(r"\$([\w_]+)")
+WHEN_THEN_RE = re.compile(r"when (?P<pre_cond>.*?) then (?P<check>.*)", re.DOTALL)
+
+SATISFIABLE_CACHE_SIZE = 1024
+
+# Same prefix Robot Framework uses for `$var` in evaluated expressions, so
+# variables never clash with Python keywords or builtins.
+_VAR_PREFIX = "RF_VAR_"
+_EVAL_GLOBALS = {"__builtins__": builtins}
+
+
+def _compile_expr(expr: str) -> CodeType:
+    python_expr = VAREXPR_RE.sub(rf"{_VAR_PREFIX}\1", expr.strip())
+    return compile(python_expr, "<satisfy>", "eval")
+
+
+@dataclasses.dataclass(frozen=True)
+class CompiledSatisfiable:
+    """A `Satisfy` expression, parsed and compiled once.
+
+    `pre_cond` is only set for 'when-then' expressions; `check` must hold if
+    there is no `pre_cond` or if it evaluates to true.
+    """
+
+    expression: str
+    variables: tuple[str, ...]
+    check_expression: str
+    check: CodeType
+    pre_cond_expression: str | None = None
+    pre_cond: CodeType | None = None
+
+    def evaluate(self, values: dict[str, Any]) -> bool:
+        """Evaluates the expression with `values`, a mapping of variable names
+        (without `$`) to sampled values."""
+        namespace = {_VAR_PREFIX + name: value for name, value in values.items()}
+
+        if self.pre_cond is not None and not self._eval(
+            self.pre_cond, self.pre_cond_expression, namespace
+        ):
+            return True
+
+        return bool(self._eval(self.check, self.check_expression, namespace))
+
+    @staticmethod
+    def _eval(code: CodeType, expr: str, namespace: dict[str, Any]) -> Any:
+        try:
+            return eval(code, _EVAL_GLOBALS, namespace)
+        except Exception as err:
+            raise RuntimeError(
+                f"Evaluating expression '{expr}' failed: {type(err).__name__}: {err}"
+            ) from err
+
+    def failure_message(self, values: dict[str, Any]) -> str:
+        return with_sampled_values(f"'{self.check_expression}' should be true.", values)
+
+
+def with_sampled_values(message: str, values: dict[str, Any]) -> str:
+    """Appends the sampled signal `values`, if any, to a failure `message`."""
+    sampled = ", ".join(f"${name}={value!r}" for name, value in values.items())
+    return f"{message} Sampled values: {sampled}" if sampled else message
+
+
+@functools.lru_cache(maxsize=SATISFIABLE_CACHE_SIZE)
+def compile_satisfiable(satisfiable: str) -> CompiledSatisfiable:
+    """Parses and compiles a `Satisfy` expression, cached by its text."""
+    variables = tuple(dict.fromkeys(VAREXPR_RE.findall(satisfiable)))
+
+    when_then = WHEN_THEN_RE.fullmatch(satisfiable)
+    if when_then is None:
+        return CompiledSatisfiable(
+            expression=satisfiable,
+            variables=variables,
+            check_expression=satisfiable,
+            check=_compile_expr(satisfiable),
+        )
+
+    pre_cond, check = when_then["pre_cond"], when_then["check"]
+    return CompiledSatisfiable(
+        expression=satisfiable,
+        variables=variables,
+        check_expression=check,
+        check=_compile_expr(check),
+        pre_cond_expression=pre_cond,
+        pre_cond=_compile_expr(pre_cond),
+    )
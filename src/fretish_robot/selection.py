@@ -0,0 +1,121 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Selection of the generated tests affected by changed user library keywords.
+
+With `fret-to-robot --signal-index`, an index of the modes (`In <mode> mode`),
+events and signals used by each generated test is written as
+`signal_index.json` next to the `.robot` files. Modes are also indexed by
+their bare name and by the embedded keyword `In ${mode_name} mode`:
+
+```json
+{
+  "keywords": {"result": {"kind": "signal", "tests": ["TEST_REQ-123-1"]}},
+  "tests": {"TEST_REQ-123-1": ["REQ-123"]}
+}
+```
+
+After a change of a user library, `fret-select-tests` prints the Robot
+Framework options running only the tests using the changed keywords:
+
+```sh
+robot $(fret-select-tests robot_files/signal_index.json result) robot_files
+```
+"""
+
+import json
+import pathlib
+import re
+from collections.abc import Iterable, Iterator
+
+from fretish_robot.generate_robot import GeneratedTest, iter_keyword_uses
+
+SIGNAL_INDEX_FILENAME = "signal_index.json"
+MODE_KEYWORD_PATTERN = "In ${mode_name} mode"
+_EMBEDDED_ARG_RE = re.compile(r"\$\{[^}]*\}")
+
+
+def _index_names(name: str, kind: str) -> Iterator[str]:
+    yield name
+    if kind == "mode":
+        yield name.removeprefix("In ").removesuffix(" mode")
+        yield MODE_KEYWORD_PATTERN
+
+
+def signal_index(tests: Iterable[GeneratedTest]) -> dict:
+    """Returns the index of the keywords used by `tests`, see the module
+    documentation."""
+    keywords: dict[str, dict] = {}
+    test_req_ids: dict[str, list[str]] = {}
+    for test in tests:
+        test_req_ids[test.name] = list(test.req_ids)
+        for used_name, kind in iter_keyword_uses(test):
+            for name in _index_names(used_name, kind):
+                entry = keywords.setdefault(name, {"kind": kind, "tests": []})
+                if test.name not in entry["tests"]:
+                    entry["tests"].append(test.name)
+    return {"keywords": keywords, "tests": test_req_ids}
+
+
+def write_signal_index(index: dict, root_output_dir: str):
+    """Writes `index` as `signal_index.json` into `root_output_dir`."""
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    with open(root_output_folder / SIGNAL_INDEX_FILENAME, "w") as index_file:
+        json.dump(index, index_file, indent=2)
+
+
+def load_signal_index(path: str) -> dict:
+    """Loads an index from its file, or from the folder it was written to."""
+    index_path = pathlib.Path(path)
+    if index_path.is_dir():
+        index_path = index_path / SIGNAL_INDEX_FILENAME
+    with open(index_path) as index_file:
+        return json.load(index_file)
+
+
+def _normalized(name: str) -> str:
+    # like Robot Framework matches keyword names, embedded arguments by position
+    name = _EMBEDDED_ARG_RE.sub("${}", name)
+    return name.lower().replace(" ", "").replace("_", "")
+
+
+def select_tests(index: dict, changed: Iterable[str]) -> tuple[list[str], list[str]]:
+    """Returns the tests using one of the `changed` keywords, in generated
+    order, and the changed names the index does not know."""
+    by_name: dict[str, list[str]] = {}
+    for name, entry in index["keywords"].items():
+        by_name.setdefault(_normalized(name), []).extend(entry["tests"])
+
+    selected: set[str] = set()
+    unknown = []
+    for name in changed:
+        tests = by_name.get(_normalized(name))
+        if tests is None:
+            unknown.append(name)
+        else:
+            selected.update(tests)
+    return [test for test in index["tests"] if test in selected], unknown
+
+
+def robot_options(index: dict, tests: list[str]) -> list[str]:
+    """Returns the Robot Framework options running exactly `tests`.
+
+    Requirements whose tests are all selected are selected by their `REQID`
+    tag, the remaining tests by name.
+    """
+    selected = set(tests)
+    tests_of: dict[str, list[str]] = {}
+    for test, req_ids in index["tests"].items():
+        for req_id in req_ids:
+            tests_of.setdefault(req_id, []).append(test)
+
+    options = []
+    remaining = list(tests)
+    for req_id, req_tests in tests_of.items():
+        if len(req_tests) > 1 and selected.issuperset(req_tests):
+            options += ["--include", f"REQID={req_id}"]
+            remaining = [test for test in remaining if test not in req_tests]
+    for test in remaining:
+        options += ["--test", test]
+    return options
@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""How generated tests can be split into several `.robot` files, see
+`fretish_robot.writer.write_testsuite`, or onto several devices, see
+`fretish_robot.devices`.
+
+Kept apart from the writer, which needs Robot Framework, so the command line
+can offer the modes without importing it.
+"""
+
+import heapq
+
+SHARD_BY_TAG = {"scope": "SCOPE", "trigger": "TRIGGER", "prefix": "REQID"}
+SHARD_MODES = [*SHARD_BY_TAG, "duration"]
+
+
+def balance_by_duration(
+    names: list[str], shard_count: int, durations: dict[str, float]
+) -> list[list[int]]:
+    """Splits the tests `names` into `shard_count` shards of about the same total
+    duration (seconds by test name). Tests without a known duration count with
+    the average. Returns the indices of each shard's tests, in the given order.
+    """
+    known = [durations[name] for name in names if name in durations]
+    default_duration = sum(known) / len(known) if known else 1.0
+
+    # longest processing time first: assign each test to the least loaded shard
+    order = sorted(
+        range(len(names)),
+        key=lambda i: durations.get(names[i], default_duration),
+        reverse=True,
+    )
+    loads = [(0.0, index) for index in range(shard_count)]
+    assigned: list[list[int]] = [[] for _ in range(shard_count)]
+    for position in order:
+        load, index = heapq.heappop(loads)
+        assigned[index].append(position)
+        duration = durations.get(names[position], default_duration)
+        heapq.heappush(loads, (load + duration, index))
+
+    return [sorted(shard) for shard in assigned]
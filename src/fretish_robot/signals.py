@@ -0,0 +1,150 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Access to the signals (variables) of FRET requirements at runtime.
+
+Signals are keywords of user libraries. `resolve_signal_reader` resolves them
+to plain Python callables, so FRETLib can sample them without going through
+Robot Framework's keyword execution and logging.
+
+User libraries can read many signals at once by implementing a
+`sample_signals(names)` method, returning a dict with the values of the signals
+they know (decorate it with `robot.api.deco.not_keyword`). It is called once per
+evaluation with all signals of the condition; signals missing in the result are
+read one keyword at a time. The names it can provide are declared in the
+`SAMPLED_SIGNALS` attribute of the library, so `fret-to-robot --check` knows
+them. Likewise, `reset_signals(names)` is called by
+`Reset Signals`, to reset the state behind signals without a full reset.
+
+User libraries that know when a signal changes (e.g. from a device callback)
+can call `signal_changed` from any thread, which wakes up `Within` in push mode.
+"""
+
+import threading
+from collections.abc import Callable, Collection, Mapping, Sequence
+from typing import Any
+
+SignalReader = Callable[[], Any]
+SignalSampler = Callable[[list[str]], Mapping[str, Any]]
+
+SAMPLER_METHOD = "sample_signals"
+SAMPLED_SIGNALS_ATTRIBUTE = "SAMPLED_SIGNALS"
+RESET_METHOD = "reset_signals"
+# Metadata of suites entering their mode once for all tests, which only reset
+# their signals; user libraries skip their full reset per test for them
+SHARED_SCOPE_METADATA = "FRET Shared Scope"
+
+
+def resolve_signal_reader(name: str) -> SignalReader | None:
+    """Resolves the keyword `name` to a callable that runs it without arguments.
+
+    Returns None if the keyword is not a library keyword (e.g. a user keyword
+    of a resource file), which must then be run with `Run Keyword`.
+    """
+    # imported when running, so e.g. `fretish_robot.clock` does not need Robot
+    from robot.running import EXECUTION_CONTEXTS, LibraryKeyword
+
+    context = EXECUTION_CONTEXTS.current
+    if context is None:
+        return None
+
+    runner = context.namespace.get_runner(name, recommend_on_failure=False)
+    keyword = getattr(runner, "keyword", None)
+    if not isinstance(keyword, LibraryKeyword) or keyword.error:
+        return None
+
+    embedded_args = getattr(runner, "embedded_args", ())
+    if keyword.args.minargs > len(embedded_args):
+        return None
+
+    # `method` is looked up on each call, as the library instance depends on its scope
+    return lambda: keyword.method(*embedded_args)
+
+
+def find_library_hooks(method_name: str) -> list[Callable]:
+    """Returns the `method_name` methods of all imported libraries, in import order."""
+    from robot.running import EXECUTION_CONTEXTS
+
+    context = EXECUTION_CONTEXTS.current
+    if context is None:
+        return []
+
+    # Like for readers, the method is looked up on each call on the current instance
+    return [
+        lambda *args, library=library: getattr(library.instance, method_name)(*args)
+        for library in context.namespace.libraries
+        if callable(getattr(library.instance, method_name, None))
+    ]
+
+
+def find_signal_samplers() -> list[SignalSampler]:
+    """Returns the `sample_signals` methods of all imported libraries."""
+    return find_library_hooks(SAMPLER_METHOD)
+
+
+def sample_signals(
+    names: Sequence[str],
+    samplers: Sequence[SignalSampler],
+    read_signal: Callable[[str], Any],
+) -> dict[str, Any]:
+    """Samples `names`, batched with `samplers` where possible.
+
+    Each sampler is asked for the signals not sampled yet; the remaining ones
+    are read with `read_signal`. Returns the values in the order of `names`.
+    """
+    values: dict[str, Any] = {}
+    remaining = list(names)
+    for sampler in samplers:
+        if not remaining:
+            break
+        sampled = sampler(remaining)
+        values.update((name, sampled[name]) for name in remaining if name in sampled)
+        remaining = [name for name in remaining if name not in values]
+
+    for name in remaining:
+        values[name] = read_signal(name)
+
+    return {name: values[name] for name in names}
+
+
+class SignalChanges:
+    """Thread-safe record of signal changes reported by user libraries."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._version = 0
+        self._changed_at: dict[str, int] = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def notify(self, *names: str) -> None:
+        with self._condition:
+            self._version += 1
+            for name in names:
+                self._changed_at[name] = self._version
+            self._condition.notify_all()
+
+    def wait(self, names: Collection[str], since_version: int, timeout: float) -> bool:
+        """Waits up to `timeout` seconds until one of `names` changed after
+        `since_version`. Returns whether one changed."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.changed(names, since_version), timeout
+            )
+
+    def changed(self, names: Collection[str], since_version: int) -> bool:
+        """Returns whether one of `names` changed after `since_version`."""
+        return any(self._changed_at.get(n, 0) > since_version for n in names)
+
+
+SIGNAL_CHANGES = SignalChanges()
+
+
+def signal_changed(*names: str) -> None:
+    """Reports that the signals `names` may have changed.
+
+    Can be called by user libraries from any thread, e.g. from a device callback.
+    """
+    SIGNAL_CHANGES.notify(*names)
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Snapshots of signal values for a single evaluation timepoint.
+
+FRETLib samples all signals of a condition within a `timepoint`. User library
+functions decorated with `snapshot_cached` are only called once per timepoint
+and arguments, so signals built on the same device query share its result:
+
+```python
+@snapshot_cached
+def _tube_direction(self):
+    return self._exec("tube move get dir")
+
+@keyword
+def tube_moving_upwards(self):
+    return "upwards" in self._tube_direction()
+```
+
+The snapshot ends with the timepoint, so the next sample of `Within` or a check
+after `Upon` always queries again. Outside a timepoint, the decorated functions
+are called as usual.
+"""
+
+import contextlib
+import functools
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Each thread has its own snapshot, as background monitors sample concurrently
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def timepoint() -> Iterator[None]:
+    """Memoizes `snapshot_cached` functions until the end of the `with` block.
+
+    Nested timepoints share the snapshot of the outermost one.
+    """
+    if getattr(_local, "snapshot", None) is not None:
+        yield
+        return
+
+    _local.snapshot = {}
+    try:
+        yield
+    finally:
+        _local.snapshot = None
+
+
+def snapshot_cached(func: F) -> F:
+    """Calls `func` only once per timepoint for the same arguments."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        snapshot = getattr(_local, "snapshot", None)
+        if snapshot is None:
+            return func(*args, **kwargs)
+
+        key = (func, args, frozenset(kwargs.items()))
+        try:
+            return snapshot[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable arguments can not be cached
+            return func(*args, **kwargs)
+
+        result = snapshot[key] = func(*args, **kwargs)
+        return result
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Timing measurements of FRET timing keywords like `Within`.
+
+For each check, `TimingRecorder` stores monotonic timestamps of the trigger
+(`Upon`), the first sample, the first satisfying sample and the deadline. The
+measurements are aggregated per requirement id into latency percentiles and
+histograms, to see how much headroom a requirement has left.
+"""
+
+import csv
+import dataclasses
+import json
+import math
+import pathlib
+from collections.abc import Iterable
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, math.inf)
+PERCENTILES = (50, 90, 99)
+
+
+@dataclasses.dataclass(frozen=True)
+class TimingRecord:
+    """Timestamps (of `fretish_robot.clock`) of one timing keyword.
+
+    `triggered` is the start of the last `Upon`, `satisfied` the first satisfying
+    sample, and `deadline` the end of the timeframe. They are None if there was
+    no trigger, the check failed or the keyword has no timeframe.
+    """
+
+    req_id: str
+    test: str
+    keyword: str
+    started: float
+    first_sample: float
+    triggered: float | None = None
+    satisfied: float | None = None
+    deadline: float | None = None
+
+    @property
+    def latency(self) -> float | None:
+        """Seconds from the trigger (or the keyword start) until satisfied."""
+        if self.satisfied is None:
+            return None
+        reference = self.started if self.triggered is None else self.triggered
+        return self.satisfied - reference
+
+    @property
+    def headroom(self) -> float | None:
+        """Seconds left in the timeframe when satisfied."""
+        if self.satisfied is None or self.deadline is None:
+            return None
+        return self.deadline - self.satisfied
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """Linear interpolation between the closest ranks."""
+    position = (len(sorted_values) - 1) * percent / 100
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    fraction = position - low
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * fraction
+
+
+def _bucket_name(bound: float) -> str:
+    return f"<={bound}ms" if bound != math.inf else f">{HISTOGRAM_BOUNDS_MS[-2]}ms"
+
+
+def _to_ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def summarize(records: Iterable[TimingRecord]) -> dict[str, dict]:
+    """Aggregates `records` per requirement id.
+
+    Latencies and headrooms are in milliseconds, the histogram counts the
+    latencies of satisfied checks per bucket of `HISTOGRAM_BOUNDS_MS`.
+    """
+    by_req: dict[str, list[TimingRecord]] = {}
+    for record in records:
+        by_req.setdefault(record.req_id, []).append(record)
+
+    summary = {}
+    for req_id, req_records in by_req.items():
+        latencies = sorted(
+            record.latency * 1000
+            for record in req_records
+            if record.latency is not None
+        )
+        headrooms = [
+            record.headroom for record in req_records if record.headroom is not None
+        ]
+
+        histogram = dict.fromkeys(map(_bucket_name, HISTOGRAM_BOUNDS_MS), 0)
+        for latency in latencies:
+            bound = next(b for b in HISTOGRAM_BOUNDS_MS if latency <= b)
+            histogram[_bucket_name(bound)] += 1
+
+        stats: dict = {"count": len(req_records), "satisfied": len(latencies)}
+        for percent in PERCENTILES:
+            value = _percentile(latencies, percent) if latencies else None
+            stats[f"p{percent}_ms"] = None if value is None else round(value, 3)
+        stats["max_ms"] = round(latencies[-1], 3) if latencies else None
+        stats["min_headroom_ms"] = _to_ms(min(headrooms)) if headrooms else None
+        stats["histogram"] = histogram
+        summary[req_id] = stats
+
+    return summary
+
+
+class TimingRecorder:
+    """Collects the `TimingRecord`s of a suite."""
+
+    def __init__(self) -> None:
+        self.records: list[TimingRecord] = []
+
+    def add(self, record: TimingRecord) -> None:
+        self.records.append(record)
+
+    def clear(self) -> None:
+        self.records.clear()
+
+    def summary(self) -> dict[str, dict]:
+        return summarize(self.records)
+
+    def write_json(self, path: pathlib.Path) -> None:
+        """Writes the summary and every record, with its raw timestamps in
+        seconds of `fretish_robot.clock`, to correlate them with traces."""
+        content = {
+            "requirements": self.summary(),
+            "records": [
+                {
+                    "req_id": record.req_id,
+                    "test": record.test,
+                    "keyword": record.keyword,
+                    "started": record.started,
+                    "triggered": record.triggered,
+                    "first_sample": record.first_sample,
+                    "satisfied": record.satisfied,
+                    "deadline": record.deadline,
+                    "latency_ms": _to_ms(record.latency),
+                    "headroom_ms": _to_ms(record.headroom),
+                }
+                for record in self.records
+            ],
+        }
+        with open(path, "w") as json_file:
+            json.dump(content, json_file, indent=2)
+
+    def write_csv(self, path: pathlib.Path) -> None:
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(
+                [
+                    "req_id",
+                    "test",
+                    "keyword",
+                    "trigger_to_first_sample_ms",
+                    "latency_ms",
+                    "headroom_ms",
+                ]
+            )
+            for record in self.records:
+                reference = (
+                    record.started if record.triggered is None else record.triggered
+                )
+                writer.writerow(
+                    [
+                        record.req_id,
+                        record.test,
+                        record.keyword,
+                        _to_ms(record.first_sample - reference),
+                        _to_ms(record.latency),
+                        _to_ms(record.headroom),
+                    ]
+                )
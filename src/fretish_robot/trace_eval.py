@@ -0,0 +1,355 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Offline evaluation of FRET's future-time formulas (`ft`) over recorded traces.
+
+Needs NumPy, install it with `pip install fretish-robot[trace]`.
+
+A trace, recorded by FRETLib with `trace_output` (see `fretish_robot.traces`)
+or given as CSV with a `time` column and one column per signal, is resampled
+into timepoints of `step` seconds: signals hold their last sampled value,
+events are true only at the timepoint they happened, and scope mode variables
+like `_DQT__LPR_normal_VBR_homing_RPR__DQT_` are true while one of their modes
+was entered last. FRET's `Fin_`/`Lin_` variables mark the timepoint before
+entering and the last timepoint in a mode.
+
+Each formula is then evaluated for all timepoints at once with array
+operations, so one resampled trace is shared by all requirements. The bounds
+of temporal operators, like `F[<=200]`, count timepoints, so the `step` must
+match the unit of the requirements' timings (1 ms for milliseconds).
+"""
+
+import csv
+import dataclasses
+import json
+import math
+import pathlib
+from collections.abc import Callable, Iterable
+
+try:
+    import numpy as np
+except ImportError as err:
+    raise ImportError(
+        "Evaluating traces needs NumPy, install fretish-robot[trace]"
+    ) from err
+
+from fretish_robot import fretish
+from fretish_robot.requirements import FRETRequirement
+
+DEFAULT_STEP = 0.001
+MODE_COLUMN = "mode"
+
+# FRET's replacements of characters of scope modes in variable names
+_MODE_NAME_REPLACEMENTS = {'"': "_DQT_", "(": "_LPR_", "|": "_VBR_", ")": "_RPR_"}
+
+
+@dataclasses.dataclass
+class Trace:
+    """Samples of a trace, as `(times, values)` arrays per signal and mode."""
+
+    signals: dict[str, tuple[np.ndarray, np.ndarray]]
+    events: dict[str, np.ndarray]
+    modes: tuple[np.ndarray, np.ndarray] | None = None
+
+    @property
+    def duration(self) -> float:
+        ends = [times[-1] for times, _ in self.signals.values() if len(times)]
+        ends += [times[-1] for times in self.events.values() if len(times)]
+        if self.modes is not None and len(self.modes[0]):
+            ends.append(self.modes[0][-1])
+        return max(ends, default=0.0)
+
+
+@dataclasses.dataclass(frozen=True)
+class Verdict:
+    """Whether a requirement holds on a trace. `violated_at` is the time (in
+    seconds) of the first timepoint its `LAST V ...` parts do not hold, `error`
+    why it could not be checked."""
+
+    req_id: str
+    holds: bool
+    violated_at: float | None = None
+    error: str | None = None
+
+
+def load_trace(path: str | pathlib.Path) -> Trace:
+    """Loads a trace written by FRETLib (`.json`) or a CSV file with a `time`
+    column (in seconds), one column per signal and an optional `mode` column."""
+    path = pathlib.Path(path)
+    if path.suffix == ".csv":
+        return _load_csv_trace(path)
+
+    with open(path) as trace_file:
+        content = json.load(trace_file)
+    signals = {
+        name: (np.asarray(column["time"], float), np.asarray(column["value"]))
+        for name, column in content["signals"].items()
+    }
+    events = {
+        name: np.asarray(times, float) for name, times in content["events"].items()
+    }
+    modes = content.get("modes")
+    return Trace(
+        signals,
+        events,
+        (np.asarray(modes["time"], float), np.asarray(modes["value"]))
+        if modes and modes["time"]
+        else None,
+    )
+
+
+def _load_csv_trace(path: pathlib.Path) -> Trace:
+    with open(path, newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    if not rows:
+        return Trace({}, {})
+
+    times = np.asarray([float(row["time"]) for row in rows])
+    columns = {
+        name: np.asarray([_csv_value(row[name]) for row in rows])
+        for name in rows[0]
+        if name != "time"
+    }
+    modes = columns.pop(MODE_COLUMN, None)
+    return Trace(
+        {name: (times, values) for name, values in columns.items()},
+        {},
+        (times, modes) if modes is not None else None,
+    )
+
+
+def _csv_value(text: str) -> bool | float | str:
+    lowered = text.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def mode_variable(scope_mode: str) -> str:
+    """Returns FRET's variable name of `scope_mode`, like `"(a|b)"`."""
+    for char, replacement in _MODE_NAME_REPLACEMENTS.items():
+        scope_mode = scope_mode.replace(char, replacement)
+    return scope_mode
+
+
+def _scope_modes(scope_mode: str) -> list[str]:
+    if scope_mode.startswith('"(') and scope_mode.endswith(')"'):
+        return scope_mode[2:-2].split("|")
+    return [scope_mode]
+
+
+class TraceEvaluator:
+    """Evaluates formulas over a trace, resampled every `step` seconds."""
+
+    def __init__(self, trace: Trace, step: float = DEFAULT_STEP) -> None:
+        self.trace = trace
+        self.step = step
+        self.length = math.floor(trace.duration / step + 1e-9) + 1
+        self.times = np.arange(self.length) * step
+        self._columns: dict[str, np.ndarray] = {}
+
+    def column(
+        self, name: str, modes: dict[str, list[str]] | None = None
+    ) -> np.ndarray:
+        """Returns the values of the signal, event or mode variable `name` at
+        each timepoint. `modes` maps mode variable names to their modes."""
+        if name not in self._columns:
+            self._columns[name] = self._resample(name, modes or {})
+        return self._columns[name]
+
+    def _resample(self, name: str, modes: dict[str, list[str]]) -> np.ndarray:
+        if name in self.trace.signals:
+            times, values = self.trace.signals[name]
+            return self._hold(times, values)
+
+        if name in self.trace.events:
+            column = np.zeros(self.length, bool)
+            indices = np.floor(self.trace.events[name] / self.step + 1e-9).astype(int)
+            column[indices[indices < self.length]] = True
+            return column
+
+        for prefix, entering in (("Fin_", True), ("Lin_", False)):
+            mode = name.removeprefix(prefix)
+            if name.startswith(prefix) and (
+                mode in modes or mode in self.trace.signals
+            ):
+                in_mode = self.column(mode, modes).astype(bool)
+                following = np.append(in_mode[1:], in_mode[-1])
+                if entering:
+                    return ~in_mode & following
+                return in_mode & ~following
+
+        if name in modes and self.trace.modes is not None:
+            times, values = self.trace.modes
+            return self._hold(times, np.isin(values, modes[name]))
+
+        raise ValueError(f"'{name}' is not recorded in the trace")
+
+    def _hold(self, times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Samples `values` at each timepoint, holding the last value; before
+        the first sample, it holds the first value."""
+        indices = np.searchsorted(times, self.times + 1e-9, side="right") - 1
+        return values[np.clip(indices, 0, len(values) - 1)]
+
+    def evaluate(
+        self, node: fretish.Node, column: Callable[[str], np.ndarray] | None = None
+    ) -> np.ndarray:
+        """Returns the value of `node` at each timepoint."""
+        return _Evaluation(self.length, column or self.column).evaluate(node)
+
+    def check(self, fret_req: FRETRequirement) -> Verdict:
+        """Checks the `ft` formula of `fret_req`, which holds if it holds at
+        the first timepoint."""
+        if fret_req.ft is None:
+            raise ValueError(f"{fret_req.req_id} has no ft formula")
+
+        modes = {}
+        if fret_req.scope_mode is not None:
+            modes[mode_variable(fret_req.scope_mode)] = _scope_modes(
+                fret_req.scope_mode
+            )
+
+        evaluation = _Evaluation(self.length, lambda name: self.column(name, modes))
+        try:
+            formula = fretish.parse(fret_req.ft, temporal=True)
+            holds = bool(evaluation.evaluate(formula)[0])
+        except ValueError as err:  # including FRETishSyntaxError
+            return Verdict(fret_req.req_id, False, error=str(err))
+
+        violated_at = None
+        if not holds:
+            violations = [
+                np.flatnonzero(~evaluation.evaluate(body))
+                for body in _globally_bodies(formula)
+            ]
+            first = min((v[0] for v in violations if len(v)), default=None)
+            violated_at = None if first is None else float(self.times[first])
+        return Verdict(fret_req.req_id, holds, violated_at)
+
+
+def _globally_bodies(node: fretish.Node) -> list[fretish.Node]:
+    """Returns the bodies of the `LAST V body` conjuncts of `node`."""
+    node = fretish.strip_parens(node)
+    match node:
+        case fretish.BinaryOp("&", left, right):
+            return _globally_bodies(left) + _globally_bodies(right)
+        case fretish.Temporal("V", (first, body), None) if isinstance(
+            fretish.strip_parens(first), fretish.Last
+        ):
+            return [body]
+    return []
+
+
+_ELEMENTWISE_OPS: dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    "&": np.logical_and,
+    "|": np.logical_or,
+    "->": lambda a, b: np.logical_or(np.logical_not(a), b),
+    "<->": np.equal,
+    "xor": np.not_equal,
+    "=": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.divide,
+    "mod": np.mod,
+    "^": np.power,
+}
+
+# Past-time operators are evaluated as their future-time mirror on the
+# reversed trace
+_PAST_TO_FUTURE = {"Y": "X", "Z": "X", "O": "F", "H": "G", "S": "U", "T": "V"}
+
+
+class _Evaluation:
+    def __init__(self, length: int, column: Callable[[str], np.ndarray]) -> None:
+        self.length = length
+        self.column = column
+
+    def evaluate(self, node: fretish.Node) -> np.ndarray:
+        match node:
+            case fretish.Var(name):
+                return self.column(name)
+            case fretish.Const(value):
+                return np.full(self.length, value)
+            case fretish.Last():
+                return np.arange(self.length) == self.length - 1
+            case fretish.Paren(inner):
+                return self.evaluate(inner)
+            case fretish.Not(operand):
+                return np.logical_not(self.evaluate(operand))
+            case fretish.Neg(operand):
+                return np.negative(self.evaluate(operand))
+            case fretish.BinaryOp(op, left, right):
+                return _ELEMENTWISE_OPS[op](self.evaluate(left), self.evaluate(right))
+            case fretish.Temporal(op, operands, bound):
+                values = [self.evaluate(operand).astype(bool) for operand in operands]
+                if op in _PAST_TO_FUTURE:
+                    reversed_values = [v[::-1] for v in values]
+                    result = _future(_PAST_TO_FUTURE[op], reversed_values, bound)
+                    if op == "Z":
+                        # weak previous, true at the first timepoint
+                        result[-1] = True
+                    return result[::-1]
+                return _future(op, values, bound)
+        raise ValueError(f"Can not evaluate {type(node).__name__}")
+
+
+def _future(
+    op: str, values: list[np.ndarray], bound: tuple[int, int] | None
+) -> np.ndarray:
+    match op, values:
+        case "X", [a]:
+            # strong next, false at the last timepoint
+            return np.append(a[1:], False)
+        case "F", [a]:
+            return _eventually(a, bound)
+        case "G", [a]:
+            return ~_eventually(~a, bound)
+        case "U", [a, b] if bound is None:
+            return _until(a, b)
+        case "V", [a, b] if bound is None:
+            return ~_until(~a, ~b)
+    raise ValueError(f"Temporal operator {op} with bound {bound} is not supported")
+
+
+def _eventually(a: np.ndarray, bound: tuple[int, int] | None) -> np.ndarray:
+    """Whether `a` holds at some timepoint in `[i + low, i + high]`."""
+    length = len(a)
+    low, high = bound if bound is not None else (0, length)
+    # count[j] is the number of timepoints before j where `a` holds
+    count = np.concatenate(([0], np.cumsum(a)))
+    starts = np.minimum(np.arange(length) + low, length)
+    ends = np.minimum(np.arange(length) + high + 1, length)
+    return count[ends] - count[starts] > 0
+
+
+def _next_index(a: np.ndarray) -> np.ndarray:
+    """The first timepoint `>= i` where `a` holds, or the length if none."""
+    length = len(a)
+    indices = np.where(a, np.arange(length), length)
+    return np.minimum.accumulate(indices[::-1])[::-1]
+
+
+def _until(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Whether `b` holds at some timepoint `j >= i`, with `a` until then."""
+    next_b = _next_index(b)
+    next_not_a = _next_index(~a)
+    return (next_b < len(b)) & (next_b <= next_not_a)
+
+
+def check_trace(
+    fret_requirements: Iterable[FRETRequirement],
+    trace: Trace,
+    step: float = DEFAULT_STEP,
+) -> list[Verdict]:
+    """Checks the `ft` formulas of `fret_requirements` on `trace`."""
+    evaluator = TraceEvaluator(trace, step)
+    return [evaluator.check(fret_req) for fret_req in fret_requirements]
@@ -0,0 +1,90 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+"""Recording of signal traces, for the offline evaluation of FRET formulas with
+`fretish_robot.trace_eval`.
+
+With `trace_output`, FRETLib records every sampled signal value, every `Upon`
+event and every `In <mode> mode` keyword with its time. A trace is written as
+columnar JSON, with times in seconds since the start of the recording:
+
+```json
+{
+  "signals": {"result": {"time": [0.0, 0.012], "value": [0, 2]}},
+  "events": {"request_to_set_two": [0.01]},
+  "modes": {"time": [0.0], "value": ["test"]}
+}
+```
+"""
+
+import json
+import pathlib
+import re
+import threading
+from collections.abc import Mapping
+from typing import Any
+
+TRACE_SUFFIX = ".fret_trace.json"
+# also matches keywords qualified with their library, like `Lib.In normal mode`
+MODE_KEYWORD_RE = re.compile(r"(?:[^.\s]+\.)*In (?P<mode>.+) mode")
+
+
+class TraceRecorder:
+    """Collects the signal samples, events and modes of a suite.
+
+    Samples can be added from any thread, e.g. by background monitors.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start: float | None = None
+        self.signals: dict[str, dict[str, list]] = {}
+        self.events: dict[str, list[float]] = {}
+        self.modes: dict[str, list] = {"time": [], "value": []}
+
+    def _relative(self, timestamp: float) -> float:
+        if self._start is None:
+            self._start = timestamp
+        return timestamp - self._start
+
+    def add_samples(self, timestamp: float, values: Mapping[str, Any]) -> None:
+        with self._lock:
+            time = self._relative(timestamp)
+            for name, value in values.items():
+                column = self.signals.setdefault(name, {"time": [], "value": []})
+                column["time"].append(time)
+                column["value"].append(value)
+
+    def add_event(self, name: str, timestamp: float) -> None:
+        with self._lock:
+            self.events.setdefault(name, []).append(self._relative(timestamp))
+
+    def add_keyword(self, name: str, timestamp: float) -> None:
+        """Records the mode entered by the keyword `name`, if it is one."""
+        mode_keyword = MODE_KEYWORD_RE.fullmatch(name)
+        if mode_keyword:
+            self.set_mode(mode_keyword["mode"], timestamp)
+
+    def set_mode(self, mode: str, timestamp: float) -> None:
+        with self._lock:
+            self.modes["time"].append(self._relative(timestamp))
+            self.modes["value"].append(mode)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._start = None
+            self.signals = {}
+            self.events = {}
+            self.modes = {"time": [], "value": []}
+
+    def write_json(self, path: pathlib.Path) -> None:
+        content = {"signals": self.signals, "events": self.events, "modes": self.modes}
+        with open(path, "w") as json_file:
+            # values FRET can not compare are kept as text
+            json.dump(content, json_file, default=str)
+
+    def write_suite(self, output_dir: pathlib.Path, basename: str) -> pathlib.Path:
+        """Writes the trace as `<basename>.fret_trace.json` into `output_dir`."""
+        path = output_dir / f"{basename}{TRACE_SUFFIX}"
+        self.write_json(path)
+        return path
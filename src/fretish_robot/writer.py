@@ -1,17 +1,231 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+import io
+import json
 import pathlib
+import re
+from collections.abc import Iterable
+from typing import TextIO
 
-from robot.model import SuiteVisitor
+from robot.api import ExecutionResult, ResultVisitor
+from robot.model import SuiteVisitor, Tags
 from robot.running.model import Keyword, TestCase, TestSuite
 
+from fretish_robot.combinations import FULL_EXPANSION, CombinationStrategy
+from fretish_robot.generate_robot import (
+    SUITE_NAME,
+    GeneratedTest,
+    iter_generated_tests,
+    merged_requirements,
+    suite_libraries,
+)
+from fretish_robot.requirements import FRETRequirement
+from fretish_robot.sharding import SHARD_BY_TAG, balance_by_duration
 
-def write_testsuite(testsuite: TestSuite, root_output_dir: str):
+TESTSUITE_FILENAME = "tests.robot"
+TEST_CASES_HEADER = "*** Test Cases ***"
+SHARD_FILENAME_PATTERN = "tests_*.robot"
+MERGE_REPORT_FILENAME = "merged_requirements.json"
+
+
+def write_testsuite(
+    testsuite: TestSuite,
+    root_output_dir: str,
+    shard_by: str | None = None,
+    shard_count: int | None = None,
+    test_durations: dict[str, float] | None = None,
+):
+    """Writes `testsuite` as `tests.robot` into `root_output_dir`.
+
+    With `shard_by`, the tests are split into several `tests_<shard>.robot`
+    files instead, each with all library imports, so they can run in parallel:
+
+    * `scope`, `trigger`: one file per `SCOPE=` or `TRIGGER=` tag value.
+    * `prefix`: one file per requirement id prefix (`REQ-01` for `REQ-01-02`).
+    * `duration`: `shard_count` files, balanced by `test_durations` (seconds by
+      test name); tests without a known duration count with the average.
+    """
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+
+    if shard_by is None:
+        remove_shard_suites(root_output_folder)
+        with open(root_output_folder / TESTSUITE_FILENAME, "w") as r:
+            testsuite.visit(RobotRSTPrinter(r))
+        return
+
+    if shard_by == "duration":
+        shards = _shard_by_duration(testsuite, shard_count, test_durations or {})
+    else:
+        shards = _shard_by_tag(testsuite, SHARD_BY_TAG[shard_by])
+
+    _remove_previous_suites(root_output_folder)
+
+    for shard_name, tests in shards.items():
+        shard = _create_shard_suite(testsuite, shard_name, tests)
+        with open(root_output_folder / f"tests_{shard_name}.robot", "w") as r:
+            shard.visit(RobotRSTPrinter(r))
+
+
+def write_testsuites(testsuites: list[TestSuite], root_output_dir: str):
+    """Writes `testsuites`, e.g. from `generate_scope_suites`, as numbered
+    `tests_<number>_<name>.robot` files into `root_output_dir`, so they run in
+    the given order."""
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    _remove_previous_suites(root_output_folder)
+
+    width = len(str(len(testsuites)))
+    for number, testsuite in enumerate(testsuites, start=1):
+        name = _filename_part(testsuite.name.removeprefix(SUITE_NAME).strip())
+        with open(
+            root_output_folder / f"tests_{number:0{width}}_{name}.robot", "w"
+        ) as r:
+            testsuite.visit(RobotRSTPrinter(r))
+
+
+def remove_shard_suites(root_output_folder: pathlib.Path):
+    """Removes the `tests_*.robot` files of previous sharded or grouped runs,
+    which would otherwise run tests twice next to a new `tests.robot`."""
+    for stale in root_output_folder.glob(SHARD_FILENAME_PATTERN):
+        stale.unlink(missing_ok=True)
+
+
+def _remove_previous_suites(root_output_folder: pathlib.Path):
+    (root_output_folder / TESTSUITE_FILENAME).unlink(missing_ok=True)
+    remove_shard_suites(root_output_folder)
+
+
+def write_testsuite_content(content: str, root_output_dir: str):
+    """Writes an already rendered test suite as `tests.robot` into `root_output_dir`."""
     root_output_folder = pathlib.Path(root_output_dir)
     root_output_folder.mkdir(parents=True, exist_ok=True)
-    with open(root_output_folder / "tests.robot", "w") as r:
-        testsuite.visit(RobotRSTPrinter(r))
+    remove_shard_suites(root_output_folder)
+    with open(root_output_folder / TESTSUITE_FILENAME, "w") as r:
+        r.write(content)
+
+
+def _filename_part(value: str) -> str:
+    return re.sub(r"[^\w.-]", "_", value)
+
+
+def _shard_key(test: TestCase, tag_name: str) -> str:
+    for tag in test.tags:
+        name, _, value = tag.partition("=")
+        if name == tag_name:
+            if tag_name == "REQID":
+                value = value.rsplit("-", maxsplit=1)[0]
+            return _filename_part(value)
+    return "other"
+
+
+def _shard_by_tag(testsuite: TestSuite, tag_name: str) -> dict[str, list[TestCase]]:
+    shards: dict[str, list[TestCase]] = {}
+    for test in testsuite.tests:
+        shards.setdefault(_shard_key(test, tag_name), []).append(test)
+    return shards
+
+
+def _shard_by_duration(
+    testsuite: TestSuite, shard_count: int | None, test_durations: dict[str, float]
+) -> dict[str, list[TestCase]]:
+    if not shard_count or shard_count < 1:
+        raise ValueError("Sharding by duration needs a positive shard count")
+
+    tests = list(testsuite.tests)
+    shards = balance_by_duration([t.name for t in tests], shard_count, test_durations)
+    width = len(str(shard_count))
+    return {
+        f"{index + 1:0{width}}": [tests[position] for position in shard]
+        for index, shard in enumerate(shards)
+        if shard
+    }
+
+
+def _create_shard_suite(
+    testsuite: TestSuite, shard_name: str, tests: list[TestCase]
+) -> TestSuite:
+    shard = TestSuite(f"{testsuite.name} {shard_name}", metadata=testsuite.metadata)
+    for imp in testsuite.resource.imports:
+        shard.resource.imports.library(imp.name, imp.args)
+    for test in tests:
+        shard.tests.append(test.deepcopy())
+    return shard
+
+
+class _DurationCollector(ResultVisitor):
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+
+    def visit_test(self, test):
+        self.durations[test.name] = test.elapsed_time.total_seconds()
+
+
+def read_test_durations(robot_output_xml: str) -> dict[str, float]:
+    """Reads the test durations (in seconds, by test name) of a Robot Framework
+    `output.xml`, e.g. of a previous run, for sharding by duration."""
+    collector = _DurationCollector()
+    ExecutionResult(robot_output_xml).visit(collector)
+    return collector.durations
+
+
+def write_requirements(
+    fret_requirements: Iterable[FRETRequirement],
+    extra_libs: list[str],
+    root_output_dir: str,
+    combinations: CombinationStrategy = FULL_EXPANSION,
+):
+    """Fast path of `write_testsuite` for a suite generated from `fret_requirements`.
+
+    Tests are written as text while they are generated, without building a
+    `TestSuite` first, so memory use does not grow with the suite size.
+    """
+    write_generated_tests(
+        iter_generated_tests(fret_requirements, combinations),
+        extra_libs,
+        root_output_dir,
+    )
+
+
+def write_generated_tests(
+    tests: Iterable[GeneratedTest], extra_libs: list[str], root_output_dir: str
+):
+    """Writes already generated `tests` as `tests.robot` into `root_output_dir`."""
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    remove_shard_suites(root_output_folder)
+    with open(root_output_folder / TESTSUITE_FILENAME, "w") as r:
+        emitter = RobotTextEmitter(r)
+        emitter.write_header(suite_libraries(extra_libs))
+        emitter.write_tests(tests)
+
+
+def write_merge_report(tests: Iterable[GeneratedTest], root_output_dir: str):
+    """Writes the requirement ids of each test merged by `deduplicate_tests` as
+    `merged_requirements.json` into `root_output_dir`."""
+    root_output_folder = pathlib.Path(root_output_dir)
+    root_output_folder.mkdir(parents=True, exist_ok=True)
+    with open(root_output_folder / MERGE_REPORT_FILENAME, "w") as report_file:
+        json.dump(merged_requirements(tests), report_file, indent=2)
+
+
+def render_requirements(
+    fret_requirements: Iterable[FRETRequirement],
+    extra_libs: list[str],
+    combinations: CombinationStrategy = FULL_EXPANSION,
+) -> str:
+    output = io.StringIO()
+    emitter = RobotTextEmitter(output)
+    emitter.write_header(suite_libraries(extra_libs))
+    emitter.write_tests(iter_generated_tests(fret_requirements, combinations))
+    return output.getvalue()
+
+
+def render_testsuite(testsuite: TestSuite) -> str:
+    output = io.StringIO()
+    testsuite.visit(RobotRSTPrinter(output))
+    return output.getvalue()
 
 
 class RobotRSTPrinter(SuiteVisitor):
@@ -31,8 +245,11 @@ class RobotRSTPrinter(SuiteVisitor):
         for imp in suite.resource.imports:
             self._print_indented(f"Library    {imp.name}")
 
+        if suite.has_setup:
+            self._print_indented(f"Suite Setup    {suite.setup}")
+
         self._print_newline()
-        self._print_indented("*** Test Cases ***")
+        self._print_indented(TEST_CASES_HEADER)
 
         return True
 
@@ -44,6 +261,12 @@ class RobotRSTPrinter(SuiteVisitor):
         tagline = "    ".join(["[Tags]"] + list(test.tags))
         self._print_indented(tagline)
 
+        if test.has_setup:
+            self._print_indented(f"[Setup]    {test.setup}")
+
+        if test.template:
+            self._print_indented(f"[Template]    {test.template}")
+
         return True
 
     def end_test(self, test: TestCase) -> bool | None:
@@ -52,7 +275,15 @@ class RobotRSTPrinter(SuiteVisitor):
         return True
 
     def start_keyword(self, keyword: Keyword) -> bool | None:
-        self._print_indented(str(keyword))
+        # setups are written with their suite or test
+        if keyword.type == Keyword.SETUP:
+            return True
+
+        if isinstance(keyword.parent, TestCase) and keyword.parent.template:
+            # rows of templated tests only hold the arguments
+            self._print_indented("    ".join(keyword.args))
+        else:
+            self._print_indented(str(keyword))
         return True
 
     def _print_indented(self, line: str):
@@ -63,3 +294,30 @@ class RobotRSTPrinter(SuiteVisitor):
 
     def __print(self, line: str):
         print(line, file=self._writable)
+
+
+class RobotTextEmitter:
+    """Writes generated tests as `.robot` text, in the same format as
+    `RobotRSTPrinter` writes the corresponding `TestSuite`."""
+
+    def __init__(self, writable: TextIO):
+        self._writable = writable
+
+    def write_header(self, libraries: list[str], name: str = SUITE_NAME):
+        lines = ["*** Settings ***", f"Name    {name}"]
+        lines += [f"Library    {lib}" for lib in libraries]
+        lines += ["", TEST_CASES_HEADER, ""]
+        self._writable.write("\n".join(lines))
+
+    def write_tests(self, tests: Iterable[GeneratedTest]):
+        for test in tests:
+            self.write_test(test)
+
+    def write_test(self, test: GeneratedTest):
+        # `Tags` normalizes and sorts like the tags of a `TestCase`
+        lines = [test.name, "    ".join(["    [Tags]", *Tags(test.tags)])]
+        if test.template:
+            lines.append(f"    [Template]    {test.template}")
+        lines += ["    " + "    ".join(keyword) for keyword in test.body]
+        lines += ["", ""]
+        self._writable.write("\n".join(lines))
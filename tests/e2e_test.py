@@ -1,11 +1,19 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
+import json
 import pathlib
 import subprocess
+import time
 
 import pytest
 import robot
+import robot.api
+
+from fretish_robot.clock import REAL_CLOCK, current_clock
+from fretish_robot.generate_robot import iter_generated_tests
+from fretish_robot.requirements import FRETRequirement
+from fretish_robot.writer import write_generated_tests
 
 
 @pytest.fixture
@@ -49,3 +57,197 @@ def test__run_robot__on_executable_file__passes_properly(testfile_dir):
     res = robot.run_cli([testfile_dir / "executable_robotfile.robot"], exit=False)
 
     assert res == 0
+
+
+def test__run_robot__on_within_polling_file__passes_properly(testfile_dir):
+    res = robot.run_cli([testfile_dir / "within_polling.robot"], exit=False)
+
+    assert res == 0
+
+
+def test__run_robot__with_timing_output__writes_timings(testfile_dir, tmp_path):
+    robot.run(
+        testfile_dir / "within_polling.robot",
+        outputdir=tmp_path,
+        variable=[f"TIMING OUTPUT:{tmp_path}"],
+        log=None,
+        report=None,
+        stdout=None,
+    )
+
+    with open(tmp_path / "Within_Polling.fret_timings.json") as timings_file:
+        timings = json.load(timings_file)
+    assert timings["requirements"]["TEST_PUSH"]["satisfied"] == 1
+    assert timings["requirements"]["TEST_NOT_SATISFIED_IN_TIME"]["satisfied"] == 0
+    assert (tmp_path / "Within_Polling.fret_timings.csv").exists()
+
+    result = robot.api.ExecutionResult(tmp_path / "output.xml")
+    assert "TEST_PUSH: 1/1 satisfied" in result.suite.metadata["FRET Timings"]
+
+
+def test__run_robot__with_virtual_clock__timeframes_pass_instantly(
+    testfile_dir, tmp_path
+):
+    started = time.monotonic()
+    res = robot.run(
+        testfile_dir / "within_polling.robot",
+        variable=["CLOCK:virtual", f"TIMING OUTPUT:{tmp_path}"],
+        output=None,
+        log=None,
+        report=None,
+        stdout=None,
+    )
+
+    assert res == 0
+    assert time.monotonic() - started < 1
+    with open(tmp_path / "Within_Polling.fret_timings.json") as timings_file:
+        timings = json.load(timings_file)
+    # the model sets the result after 50 ms, sampled every 5 ms
+    assert timings["requirements"]["TEST_FIXED_POLLING"]["max_ms"] == 50
+    assert current_clock() is REAL_CLOCK
+
+
+def test__run_robot__with_trace_output__writes_trace(testfile_dir, tmp_path):
+    robot.run(
+        testfile_dir / "within_polling.robot",
+        variable=[f"TRACE OUTPUT:{tmp_path}"],
+        output=None,
+        log=None,
+        report=None,
+        stdout=None,
+    )
+
+    with open(tmp_path / "Within_Polling.fret_trace.json") as trace_file:
+        trace = json.load(trace_file)
+    assert len(trace["events"]["request_to_set_two_slowly"]) == 4
+    assert trace["modes"]["value"] == ["test"] * 4
+    result = trace["signals"]["result"]
+    assert result["time"] == sorted(result["time"])
+    assert 2 in result["value"]
+
+
+def test__run_robot__with_profiler__attributes_time_per_category(
+    testfile_dir, tmp_path
+):
+    robot.run(
+        testfile_dir / "executable_robotfile.robot",
+        listener=[f"fretish_robot.profiler.FRETProfiler:output_dir={tmp_path}"],
+        output=None,
+        log=None,
+        report=None,
+        stdout=None,
+    )
+
+    with open(tmp_path / "fret_profile.json") as profile_file:
+        profile = json.load(profile_file)
+    after_test = profile["tags"]["REQID=REQ-124"]["wall"]
+    assert after_test["sleep"] >= 0.1
+    assert after_test["events"] > 0
+    assert after_test["signals"] > 0
+
+    collapsed = (tmp_path / "fret_profile.collapsed").read_text().splitlines()
+    assert any(";fretish_robot.FRETLib.Upon;" in line for line in collapsed)
+    assert any(";fretish_robot.FRETLib.After;sleep " in line for line in collapsed)
+
+
+def test__run_robot__on_monitors_file__only_violated_monitors_fail(
+    testfile_dir, tmp_path
+):
+    robot.run(
+        testfile_dir / "monitors.robot",
+        output=tmp_path / "output.xml",
+        log=None,
+        report=None,
+        stdout=None,
+    )
+
+    result = robot.api.ExecutionResult(tmp_path / "output.xml")
+    statuses = {test.name: test.status for test in result.suite.all_tests}
+    messages = {test.name: test.message for test in result.suite.all_tests}
+    assert statuses == {
+        "TEST_ALWAYS": "PASS",
+        "TEST_ALWAYS_VIOLATED": "FAIL",
+        "TEST_NEVER": "PASS",
+        "TEST_EVENTUALLY": "PASS",
+        "TEST_EVENTUALLY_VIOLATED": "FAIL",
+        "TEST_HOLDS_FOR": "PASS",
+    }
+    assert "Sampled values: $result=1" in messages["TEST_ALWAYS_VIOLATED"]
+    assert "never became true" in messages["TEST_EVENTUALLY_VIOLATED"]
+
+
+def _monitored_requirement(req_id: str, event: str, timing: str, condition: str):
+    return FRETRequirement(
+        req_id=req_id,
+        requirement_phrase=f"In test mode, upon {event}, the component shall "
+        f"{timing} satisfy {condition}.",
+        scope_mode="test",
+        trigger_event=event,
+        timing=timing,
+        condition_to_check=condition,
+        variables=("test", event, "result"),
+    )
+
+
+def test__run_robot__generated_monitor_suite__observed_for_window(tmp_path):
+    fret_requirements = [
+        _monitored_requirement("REQ-A", "request_to_set_two", "always", "result = 2"),
+        _monitored_requirement(
+            "REQ-E", "request_to_set_two_slowly", "eventually", "result = 2"
+        ),
+        _monitored_requirement("REQ-N", "request_to_set_two", "never", "result = 1"),
+        _monitored_requirement(
+            "REQ-V", "request_to_set_two_slowly", "always", "result = 0"
+        ),
+    ]
+    write_generated_tests(
+        iter_generated_tests(fret_requirements),
+        ["fretish_robot.example_user_lib.ExampleUserLib"],
+        tmp_path,
+    )
+
+    robot.run(
+        tmp_path / "tests.robot",
+        variable=["FRET_MONITOR_WINDOW:200ms"],
+        output=tmp_path / "output.xml",
+        log=None,
+        report=None,
+        stdout=None,
+    )
+    result = robot.api.ExecutionResult(tmp_path / "output.xml")
+    statuses = {test.name: test.status for test in result.suite.all_tests}
+    elapsed = {test.name: test.elapsed_time for test in result.suite.all_tests}
+    assert statuses == {
+        "TEST_REQ-A-1": "PASS",
+        "TEST_REQ-E-1": "PASS",
+        "TEST_REQ-N-1": "PASS",
+        "TEST_REQ-V-1": "FAIL",
+    }
+    # the violation is found after the slow request set the result
+    assert "Sampled values: $result=2" in result.suite.tests[-1].message
+    # the satisfied Always and Never were observed for their whole window
+    assert elapsed["TEST_REQ-A-1"].total_seconds() >= 0.2
+    assert elapsed["TEST_REQ-N-1"].total_seconds() >= 0.2
+
+
+USER_SETUP_SUITE = """
+*** Settings ***
+Library    fretish_robot.example_user_lib.ExampleUserLib
+
+*** Test Cases ***
+Set Result
+    Request To Set Two
+
+User Setup Still Reset
+    [Setup]    No Operation
+    ${result} =    Result
+    Should Be Equal As Integers    ${result}    0
+"""
+
+
+def test__run_robot__user_written_setup__library_still_resets(tmp_path):
+    (tmp_path / "user_setup.robot").write_text(USER_SETUP_SUITE)
+
+    res = robot.run(tmp_path, output=None, report=None, log=None, stdout=None)
+
+    assert res == 0
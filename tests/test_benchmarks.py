@@ -0,0 +1,19 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+import subprocess
+import sys
+
+BENCHMARKS_DIR = pathlib.Path(__file__).parent.parent / "benchmarks"
+
+
+def test__requirement_model_benchmark__small_count__runs():
+    process = subprocess.run(
+        [sys.executable, BENCHMARKS_DIR / "requirement_model.py", "--count", "10"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert "FRETRequirement: construct" in process.stdout
@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from fretish_robot.clock import VirtualClock, make_clock
+from fretish_robot.monitors import Monitor
+from fretish_robot.satisfiable import compile_satisfiable
+from fretish_robot.signals import SIGNAL_CHANGES, signal_changed
+
+
+def test__advance__scheduled_callbacks__run_in_order_of_due_time():
+    clock = VirtualClock()
+    calls = []
+    clock.call_later(0.2, lambda: calls.append(("b", clock.now())))
+    clock.call_later(0.1, lambda: calls.append(("a", clock.now())))
+    clock.call_later(0.3, lambda: calls.append(("c", clock.now())))
+
+    clock.advance(0.25)
+
+    assert calls == [("a", 0.1), ("b", 0.2)]
+    assert clock.now() == 0.25
+
+
+def test__sleep__repeated_small_steps__reaches_due_time_exactly():
+    clock = VirtualClock()
+    fired = []
+    clock.call_later(0.05, fired.append, True)
+
+    for _ in range(10):
+        clock.sleep(0.005)
+
+    assert fired == [True]
+
+
+def test__call_later__cancelled__does_not_run():
+    clock = VirtualClock()
+    calls = []
+    clock.call_later(0.1, calls.append, 1).cancel()
+
+    clock.advance(1)
+
+    assert calls == []
+
+
+def test__wait_for_change__signal_changed_by_callback__stops_at_change():
+    clock = VirtualClock()
+    version = SIGNAL_CHANGES.version
+    clock.call_later(0.05, signal_changed, "virtual_signal")
+
+    assert clock.wait_for_change(["virtual_signal"], version, 1)
+    assert clock.now() == pytest.approx(0.05)
+
+
+def test__wait_for_change__no_change__advances_to_timeout():
+    clock = VirtualClock()
+
+    assert not clock.wait_for_change(["other"], SIGNAL_CHANGES.version, 0.5)
+    assert clock.now() == 0.5
+
+
+def test__make_clock__unknown_name__raises():
+    with pytest.raises(ValueError, match="Unknown clock"):
+        make_clock("wall")
+
+
+def test__monitor__virtual_clock__samples_while_advancing():
+    clock = VirtualClock()
+    state = {"result": 2}
+    clock.call_later(0.035, state.update, {"result": 1})
+    monitor = Monitor(
+        "always",
+        compile_satisfiable("($result == 2)"),
+        lambda: dict(state),
+        interval=0.01,
+        clock=clock,
+    )
+
+    monitor.start()
+    clock.advance(0.1)
+    violation = monitor.stop()
+
+    assert monitor.samples == 5
+    assert violation.elapsed == pytest.approx(0.04)
+
+
+def test__monitor_wait__virtual_clock__advances_to_window_end():
+    clock = VirtualClock()
+    monitor = Monitor(
+        "always",
+        compile_satisfiable("($result == 2)"),
+        lambda: {"result": 2},
+        interval=0.01,
+        window=0.2,
+        clock=clock,
+    )
+
+    monitor.start()
+    monitor.wait()
+
+    assert clock.now() == pytest.approx(0.2)
+    assert monitor.stop() is None
+    assert monitor.samples == 21
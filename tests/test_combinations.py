@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from fretish_robot.combinations import CombinationStrategy
+
+
+def test__select__full__all_combinations_in_order():
+    result = CombinationStrategy().select("REQ-1", 2, 3)
+
+    assert result == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+
+
+def test__select__each_choice__every_scope_and_event_once():
+    result = CombinationStrategy("each-choice").select("REQ-1", 2, 3)
+
+    assert len(result) == 3
+    assert {scope for scope, _ in result} == {0, 1}
+    assert {event for _, event in result} == {0, 1, 2}
+
+
+def test__select__sample__bounded_and_reproducible():
+    strategy = CombinationStrategy("sample", max_combinations=4, seed=7)
+
+    result = strategy.select("REQ-1", 5, 5)
+
+    assert len(result) == 4
+    assert result == sorted(result)
+    assert result == strategy.select("REQ-1", 5, 5)
+
+
+def test__select__sample_larger_than_expansion__all_combinations():
+    strategy = CombinationStrategy("sample", max_combinations=10)
+
+    result = strategy.select("REQ-1", 2, 2)
+
+    assert result == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"strategy": "pairwise"},
+        {"strategy": "sample"},
+        {"strategy": "sample", "max_combinations": 0},
+    ],
+)
+def test__combination_strategy__invalid__raises(kwargs):
+    with pytest.raises(ValueError):
+        CombinationStrategy(**kwargs)
@@ -0,0 +1,128 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib.util
+import pathlib
+
+import pytest
+import robot.api
+
+from fretish_robot.devices import (
+    DEVICE_ENV,
+    Device,
+    read_durations,
+    run_on_devices,
+    schedule,
+    simulators,
+)
+from fretish_robot.generate_robot import iter_generated_tests
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.writer import write_generated_tests
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+FRET_FILE = pathlib.Path(__file__).parent / "testfiles" / "fret_requirements.json"
+SUITE = "Generated FRET Testsuite"
+MICROSCOPE_LIB_FILE = (
+    pathlib.Path(__file__).parent.parent
+    / "examples"
+    / "digital_microscope"
+    / "assets"
+    / "robot_files"
+    / "DigitalMicroscopeLib.py"
+)
+
+
+def _write_suite(folder: pathlib.Path) -> pathlib.Path:
+    fret_requirements = load_fret_requirements(FRET_FILE)
+    write_generated_tests(iter_generated_tests(fret_requirements), LIBS, folder)
+    return folder
+
+
+def test__parse__name_with_variables__round_trips():
+    device = Device.parse("dut1:PORT=/dev/ttyUSB0,BAUD=115200")
+
+    assert device == Device("dut1", (("PORT", "/dev/ttyUSB0"), ("BAUD", "115200")))
+    assert str(device) == "dut1:PORT=/dev/ttyUSB0,BAUD=115200"
+
+
+@pytest.mark.parametrize("spec", ["", "dut 1", "dut.1", "dut1:PORT"])
+def test__parse__invalid_spec__raises(spec):
+    with pytest.raises(ValueError):
+        Device.parse(spec)
+
+
+def test__schedule__durations__longest_tests_on_different_devices(tmp_path):
+    suite_folder = _write_suite(tmp_path / "robot_files")
+
+    durations = {
+        f"{SUITE}.{test}": 1.0
+        for test in ["TEST_REQ-125-2", "TEST_REQ-126-1", "TEST_REQ-126-2"]
+    }
+    durations |= {f"{SUITE}.TEST_REQ-123-1": 10.0, f"{SUITE}.TEST_REQ-125-1": 10.0}
+
+    shards = schedule(str(suite_folder), simulators(2), durations)
+
+    assert sorted(shards) == ["sim-1", "sim-2"]
+    long_tests = [
+        [test for test in tests if test.endswith(("TEST_REQ-123-1", "TEST_REQ-125-1"))]
+        for tests in shards.values()
+    ]
+    assert [len(tests) for tests in long_tests] == [1, 1]
+    assert sum(len(tests) for tests in shards.values()) == 5
+
+
+def test__schedule__same_test_names_in_two_suites__durations_by_full_name(tmp_path):
+    _write_suite(tmp_path / "robot_files" / "a")
+    _write_suite(tmp_path / "robot_files" / "b")
+    suite_path = str(tmp_path / "robot_files")
+    durations = {
+        test: 1.0
+        for tests in schedule(suite_path, [Device("d")], {}).values()
+        for test in tests
+    }
+    durations |= {f"A.{SUITE}.TEST_REQ-123-1": 20.0, f"B.{SUITE}.TEST_REQ-123-1": 0.1}
+
+    shards = schedule(suite_path, simulators(2), durations)
+
+    assert f"A.{SUITE}.TEST_REQ-123-1" in shards["sim-1"]
+    assert len(shards["sim-1"]) == 1
+    assert len(shards["sim-2"]) == 9
+
+
+def test__run_on_devices__simulators__combines_all_tests(tmp_path):
+    suite_folder = _write_suite(tmp_path / "robot_files")
+    output_dir = tmp_path / "results"
+
+    run_on_devices(str(suite_folder), simulators(2), str(output_dir))
+
+    result = robot.api.ExecutionResult(output_dir / "output.xml")
+    assert result.suite.name == "Robot Files"
+    assert [suite.name for suite in result.suite.suites] == ["sim-1", "sim-2"]
+    assert result.suite.suites[1].metadata["FRET Device"] == "sim-2"
+    assert sorted(test.name for test in result.suite.all_tests) == [
+        "TEST_REQ-123-1",
+        "TEST_REQ-125-1",
+        "TEST_REQ-125-2",
+        "TEST_REQ-126-1",
+        "TEST_REQ-126-2",
+    ]
+    assert {
+        tag for test in result.suite.all_tests for tag in test.tags if "DEVICE" in tag
+    } == {"DEVICE=sim-1", "DEVICE=sim-2"}
+    assert (output_dir / "log.html").exists()
+    # durations of the combined run are keyed like the tests of the suite
+    shards = schedule(str(suite_folder), simulators(2), {})
+    assert sorted(read_durations(output_dir / "output.xml")) == sorted(
+        test for tests in shards.values() for test in tests
+    )
+
+
+def test__microscope_lib__device_of_pool__connects_to_its_port(monkeypatch):
+    spec = importlib.util.spec_from_file_location(
+        "DigitalMicroscopeLib", MICROSCOPE_LIB_FILE
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setenv(DEVICE_ENV, "dut2:PORT=/dev/ttyUSB1")
+
+    assert module.DigitalMicroscopeLib()._device_port() == "/dev/ttyUSB1"
@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from fretish_robot.fretish import (
+    BinaryOp,
+    FRETishSyntaxError,
+    Last,
+    Temporal,
+    Var,
+    normalize,
+    parse,
+    to_dnf,
+    to_python,
+)
+
+TEST_EXPR = "a != 1 & b = 1 | c = 4 ^ 3 - 1 & b = 2 | d <= a"
+EXPECTED_PYTHON = "a != 1 and b == 1 or c == 4 ** 3 - 1 and b == 2 or d <= a"
+EXPECTED_PREFIXED = "$a != 1 and $b == 1 or $c == 4 ** 3 - 1 and $b == 2 or $d <= $a"
+
+
+def test__to_python__all_python_fretish_diffs__all_translated():
+    result = to_python(parse(TEST_EXPR))
+
+    assert result == EXPECTED_PYTHON
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("(d <= 2)", "(d <= 2)"),
+        ("(d != 2)", "(d != 2)"),
+        ("! (d = 2)", "not (d == 2)"),
+        ("!(d = 2)", "not (d == 2)"),
+        ("(d ^ 2)", "(d ** 2)"),
+        ("(d & 2==2)", "(d and 2 == 2)"),
+        ("(d|2 = 2)", "(d or 2 == 2)"),
+        ("(d mod 2 = TRUE)", "(d % 2 == True)"),
+        ("(a -> (b -> c))", "(not a or (not b or c))"),
+        ("a | b -> c", "not (a or b) or c"),
+        ("! a & b", "not a and b"),
+        ("! (a & b)", "not (a and b)"),
+        ("(a <-> b = 2)", "(a == (b == 2))"),
+    ],
+)
+def test__to_python__python_correctly_translated(expr, expected):
+    result = to_python(parse(expr))
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("(d <= 2)", "($d <= 2)"),
+        ("(d)", "($d)"),
+        ("( d)", "($d)"),
+        ("!(d )", "not ($d)"),
+        ("d <= 2 & d >= 4", "$d <= 2 and $d >= 4"),
+        ("(no_d <= 2)", "(no_d <= 2)"),
+        ("(d_a <= 2)", "(d_a <= 2)"),
+    ],
+)
+def test__to_python__variables__only_variables_prefixed(expr, expected):
+    result = to_python(parse(expr), ["d"])
+
+    assert result == expected
+
+
+def test__to_python__string_with_multiple_vars__all_prefixed():
+    result = to_python(parse(TEST_EXPR), ["a", "b", "c", "d"])
+
+    assert result == EXPECTED_PREFIXED
+
+
+def test__parse__temporal_formula__typed_ast():
+    result = parse("LAST V (X[<=3] a -> F[<2] b)", temporal=True)
+
+    assert result == Temporal(
+        "V",
+        (
+            Last(),
+            parse("(X[<=3] a -> F[<2] b)", temporal=True),
+        ),
+    )
+    assert parse("X[<=3] a -> F[<2] b", temporal=True) == BinaryOp(
+        "->",
+        Temporal("X", (Var("a"),), (0, 3)),
+        Temporal("F", (Var("b"),), (0, 1)),
+    )
+
+
+@pytest.mark.parametrize("expr", ["(a & b", "a b", "a & ", "a ; b", "a = b = c"])
+def test__parse__invalid_expression__raises(expr):
+    with pytest.raises(FRETishSyntaxError):
+        parse(expr)
+
+
+def test__to_python__temporal_formula__raises():
+    with pytest.raises(FRETishSyntaxError):
+        to_python(parse("X a", temporal=True))
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("V & (T > 2)", "$V and ($T > 2)"),
+        ("S xor xor", "$S != $xor"),
+        ("mod mod 2 = LAST", "$mod % 2 == $LAST"),
+    ],
+)
+def test__to_python__signals_named_like_operators__are_variables(expr, expected):
+    result = to_python(parse(expr), ["V", "T", "S", "xor", "mod", "LAST"])
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("a", [("a",)]),
+        ("(a | b) & c", [("a", "c"), ("b", "c")]),
+        ("a & (b | c) & d", [("a", "b", "d"), ("a", "c", "d")]),
+        ("(a & b) | (b & a)", [("a", "b")]),
+        ("(a & b) | a | (c & a)", [("a",)]),
+    ],
+)
+def test__to_dnf__positive_expressions__minimal_conjuncts(expr, expected):
+    result = to_dnf(parse(expr))
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("expr", ["! a", "a -> b", "a = 1", "F a"])
+def test__to_dnf__other_operators__raises(expr):
+    with pytest.raises(FRETishSyntaxError):
+        to_dnf(parse(expr))
+
+
+@pytest.mark.parametrize(
+    "left,right",
+    [
+        ("(b & (a & c))", "a & b & c"),
+        ("x > 2 | y", "y | (2 < x)"),
+        ("(a = 1) -> b", "a = 1 -> (b)"),
+    ],
+)
+def test__normalize__equivalent_expressions__equal(left, right):
+    assert normalize(parse(left)) == normalize(parse(right))
+
+
+@pytest.mark.parametrize("left,right", [("a -> b", "b -> a"), ("a - b", "b - a")])
+def test__normalize__different_expressions__not_equal(left, right):
+    assert normalize(parse(left)) != normalize(parse(right))
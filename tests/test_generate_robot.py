@@ -1,88 +1,169 @@
 # SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
 # SPDX-License-Identifier: Apache-2.0
 
-import pytest
-
-from fretish_robot.generate_robot import _extract_events, _prefix_vars, _to_python_expr
+import dataclasses
 
-TEST_EXPR = "a != 1 & b = 1 | c = 4 ^ 3 - 1 & b = 2 | d <= a"
-EXPECTED_PYTHON = "a != 1 and b == 1 or c == 4 ** 3 - 1 and b == 2 or d <= a"
-EXPECTED_PREFIXED = "$a != 1 and $b == 1 or $c == 4 ** 3 - 1 and $b == 2 or $d <= $a"
+import pytest
 
+from fretish_robot.combinations import CombinationStrategy
+from fretish_robot.generate_robot import (
+    _extract_events,
+    _generate_tests,
+    _to_satisfiable,
+    deduplicate_tests,
+    merged_requirements,
+)
+from fretish_robot.requirements import FRETRequirement
 
-def test__to_python_expr__all_python_fretish_diffs__all_translated__all_():
-    result = _to_python_expr(TEST_EXPR)
 
-    assert result == EXPECTED_PYTHON
+def _fret_req(condition: str, variables: tuple[str, ...]) -> FRETRequirement:
+    return FRETRequirement(
+        req_id="REQ-1",
+        requirement_phrase="",
+        scope_mode=None,
+        trigger_event=None,
+        timing="immediately",
+        condition_to_check=condition,
+        variables=variables,
+    )
 
 
 @pytest.mark.parametrize(
-    "expr,expected",
+    "condition,expected",
     [
-        ("(d <= 2)", "(d <= 2)"),
-        ("(d != 2)", "(d != 2)"),
-        ("! (d == 2)", "not (d == 2)"),
-        ("(d ^ 2)", "(d ** 2)"),
-        ("(d & 2==2)", "(d and 2==2)"),
-        ("(d | 2==2)", "(d or 2==2)"),
-        ("(d | 2 = 2)", "(d or 2 == 2)"),
+        ("((1 <= result) & (result <= 2))", "((1 <= $result) and ($result <= 2))"),
+        ("(a -> (b & (result = 2)))", "when $a then ($b and ($result == 2))"),
+        ("((! a) -> (b -> result))", "when (not $a) then (not $b or $result)"),
+        ("(a -> b) -> result", "when (not $a or $b) then $result"),
     ],
 )
-def test__to_python_expr__python_correctly_translated(expr, expected):
-    result = _to_python_expr(expr)
+def test__to_satisfiable__different_conditions__correctly_translated(
+    condition, expected
+):
+    result = _to_satisfiable(_fret_req(condition, ("a", "b", "result")))
 
     assert result == expected
 
 
 @pytest.mark.parametrize(
-    "expr,expected",
+    "expr, expected",
     [
-        ("(d <= 2)", "($d <= 2)"),
-        ("(d)", "($d)"),
-        ("( d)", "( $d)"),
-        ("(d )", "($d )"),
-        ("!(d )", "!($d )"),
-        ("d <= 2 and d >= 4", "$d <= 2 and $d >= 4"),
+        ("a", [(("a",), ("a",))]),
+        ("(( a | b) |c_d)", [(("a",), ("a",)), (("b",), ("b",)), (("c_d",), ("c_d",))]),
+        ("a & b", [(("a", "b"), ("a", "b"))]),
+        ("(a | b) & c", [(("a", "c"), ("a", "c")), (("b", "c"), ("b", "c"))]),
+        ("a | (b & a) | a", [(("a",), ("a",))]),
+        ("(a > 2) xor b", [(("a",), ("a",)), (("b",), ("b",))]),
+        ("V & T", [(("V", "T"), ("V", "T"))]),
+        (None, [((), ("always",))]),
     ],
 )
-def test__prefix_vars__expression_different_positions_suffixes__properly_replaced(
-    expr, expected
-):
-    result = _prefix_vars(expr, ["d"])
+def test___extract_events__different_inputes__correctly_extracted(expr, expected):
+    result = _extract_events(expr)
 
     assert result == expected
 
 
 @pytest.mark.parametrize(
-    "expr",
+    "timing, expected",
     [
-        "(no_d <= 2)",
-        "(nod <= 2)",
-        "(da <= 2)",
-        "(d_a <= 2)",
-        "(a != 2)",
+        ("always", [("Always", "Satisfy", "$result"), ("Wait For Monitors",)]),
+        ("eventually", [("Eventually", "Satisfy", "$result"), ("Wait For Monitors",)]),
+        ("never", [("Never", "Satisfy", "$result"), ("Wait For Monitors",)]),
+        (
+            "for 200 ms",
+            [("Holds For", "200 ms", "Satisfy", "$result"), ("Wait For Monitors",)],
+        ),
+        (
+            "until done",
+            [("FAIL", "timing requirement 'until done' not implemented")],
+        ),
     ],
 )
-def test__prefix_vars__expression_with_suffixes__not_replaced(expr):
-    result = _prefix_vars(expr, ["d"])
+def test__generate_tests__different_timings__correct_check(timing, expected):
+    fret_req = dataclasses.replace(_fret_req("result", ("result",)), timing=timing)
 
-    assert result == expr
+    (test,) = _generate_tests(fret_req)
 
+    assert list(test.body[-len(expected) :]) == expected
 
-def test__prefix_vars__string_with_multiple_vars__all_prefixed():
-    result = _prefix_vars(EXPECTED_PYTHON, ["a", "b", "c", "d"])
 
-    assert result == EXPECTED_PREFIXED
+def _multi_req() -> FRETRequirement:
+    return dataclasses.replace(
+        _fret_req("result", ("result",)),
+        scope_mode='"(a|b|c)"',
+        trigger_event="(x | y)",
+    )
 
 
-@pytest.mark.parametrize(
-    "expr, expected",
-    [
-        ("a", [("a", "a")]),
-        ("(( a | b) |c_d)", [("a", "a"), ("b", "b"), ("c_d", "c_d")]),
-    ],
-)
-def test___extract_events__different_inputes__correctly_extracted(expr, expected):
-    result = _extract_events(expr)
+def test__generate_tests__sampled__named_as_in_full_expansion():
+    full = {test.name: test for test in _generate_tests(_multi_req())}
+    strategy = CombinationStrategy("sample", max_combinations=2, seed=3)
 
-    assert result == expected
+    result = list(_generate_tests(_multi_req(), strategy))
+
+    assert len(result) == 2
+    assert all(full[test.name] == test for test in result)
+
+
+def test__generate_tests__template__one_test_with_row_per_combination():
+    strategy = CombinationStrategy("each-choice", template=True)
+
+    (test,) = _generate_tests(_multi_req(), strategy)
+
+    assert test.name == "TEST_REQ-1"
+    assert test.template == "Check Combination"
+    assert test.body == (
+        ("a", "x", "Immediately", "Satisfy", "$result"),
+        ("b", "y", "Immediately", "Satisfy", "$result"),
+        ("c", "x", "Immediately", "Satisfy", "$result"),
+    )
+    assert test.tags == (
+        "REQID=REQ-1",
+        "SCOPE=a",
+        "SCOPE=b",
+        "SCOPE=c",
+        "TRIGGER=x",
+        "TRIGGER=y",
+    )
+
+
+def test__generate_tests__conjunct_trigger__fires_all_events():
+    fret_req = dataclasses.replace(
+        _fret_req("result", ("result",)), trigger_event="(a | b) & c"
+    )
+
+    result = list(_generate_tests(fret_req))
+
+    assert [test.body[:-1] for test in result] == [
+        (("Upon", "a"), ("Upon", "c")),
+        (("Upon", "b"), ("Upon", "c")),
+    ]
+    assert result[0].tags == (
+        "REQID=REQ-1",
+        "SCOPE=always",
+        "TRIGGER=a",
+        "TRIGGER=c",
+    )
+
+
+def test__deduplicate_tests__equivalent_conditions__merged_with_all_reqids():
+    first = _fret_req("(a & (b > 2))", ("a", "b"))
+    second = dataclasses.replace(_fret_req("(2 < b) & a", ("a", "b")), req_id="REQ-2")
+    other = dataclasses.replace(first, req_id="REQ-3", timing="always")
+
+    result = deduplicate_tests([first, second, other])
+
+    assert [test.name for test in result] == ["TEST_REQ-1-1", "TEST_REQ-3-1"]
+    assert "REQID=REQ-2" in result[0].tags
+    assert merged_requirements(result) == {"TEST_REQ-1-1": ["REQ-1", "REQ-2"]}
+
+
+def test__deduplicate_tests__different_triggers__kept():
+    first = dataclasses.replace(_fret_req("a", ("a",)), trigger_event="x")
+    second = dataclasses.replace(first, req_id="REQ-2", trigger_event="y")
+
+    result = deduplicate_tests([first, second])
+
+    assert len(result) == 2
+    assert merged_requirements(result) == {}
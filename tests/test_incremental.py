@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import pathlib
+
+import pytest
+
+from fretish_robot import incremental
+from fretish_robot.combinations import CombinationStrategy
+from fretish_robot.generate_robot import generate_robot_suite_from_fret
+from fretish_robot.incremental import write_testsuite_incrementally
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.writer import render_testsuite, write_testsuite
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+
+
+@pytest.fixture
+def fret_requirements() -> list:
+    testfile = pathlib.Path(__file__).parent / "testfiles" / "fret_requirements.json"
+    return sorted(load_fret_requirements(testfile), key=lambda r: r.req_id)
+
+
+def _full_output(fret_requirements) -> str:
+    return render_testsuite(generate_robot_suite_from_fret(fret_requirements, LIBS))
+
+
+def test__write_testsuite_incrementally__no_manifest__all_regenerated(
+    fret_requirements, tmp_path
+):
+    result = write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    assert result == ["REQ-123", "REQ-125", "REQ-126"]
+    assert (tmp_path / "tests.robot").read_text() == _full_output(fret_requirements)
+
+
+def test__write_testsuite_incrementally__one_changed__only_changed_regenerated(
+    fret_requirements, tmp_path
+):
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+    fret_requirements[1] = dataclasses.replace(
+        fret_requirements[1], timing="within 5 seconds"
+    )
+
+    result = write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    assert result == ["REQ-125"]
+    assert (tmp_path / "tests.robot").read_text() == _full_output(fret_requirements)
+
+
+def test__write_testsuite_incrementally__requirement_removed__tests_removed(
+    fret_requirements, tmp_path
+):
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+    del fret_requirements[0]
+
+    result = write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    assert result == []
+    assert (tmp_path / "tests.robot").read_text() == _full_output(fret_requirements)
+
+
+def test__write_testsuite_incrementally__libraries_changed__all_regenerated(
+    fret_requirements, tmp_path
+):
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    result = write_testsuite_incrementally(fret_requirements, [], tmp_path)
+
+    assert result == ["REQ-123", "REQ-125", "REQ-126"]
+
+
+def test__write_testsuite_incrementally__combinations_changed__all_regenerated(
+    fret_requirements, tmp_path
+):
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+    each_choice = CombinationStrategy("each-choice")
+
+    result = write_testsuite_incrementally(
+        fret_requirements, LIBS, tmp_path, combinations=each_choice
+    )
+
+    assert result == ["REQ-123", "REQ-125", "REQ-126"]
+
+
+def test__write_testsuite_incrementally__generator_upgraded__all_regenerated(
+    fret_requirements, tmp_path, monkeypatch
+):
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+    monkeypatch.setattr(incremental, "_generator_version", lambda: "99.0")
+
+    result = write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    assert result == ["REQ-123", "REQ-125", "REQ-126"]
+
+
+def test__write_testsuite_incrementally__after_sharded_write__shards_removed(
+    fret_requirements, tmp_path
+):
+    testsuite = generate_robot_suite_from_fret(fret_requirements, LIBS)
+    write_testsuite(testsuite, tmp_path, shard_by="scope")
+
+    write_testsuite_incrementally(fret_requirements, LIBS, tmp_path)
+
+    assert sorted(p.name for p in tmp_path.glob("*.robot")) == ["tests.robot"]
@@ -0,0 +1,43 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import pathlib
+
+import pytest
+
+from fretish_robot.generate_robot import generate_robot_suite_from_fret
+from fretish_robot.parallel import render_testsuite_parallel
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.writer import render_testsuite
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+
+
+@pytest.fixture
+def fret_requirements() -> list:
+    testfile = pathlib.Path(__file__).parent / "testfiles" / "fret_requirements.json"
+    fret_requirements = load_fret_requirements(testfile)
+    many = [
+        dataclasses.replace(fret_req, req_id=f"{fret_req.req_id}-{i:03}")
+        for i in range(50)
+        for fret_req in fret_requirements
+    ]
+    return sorted(many, key=lambda r: r.req_id)
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test__render_testsuite_parallel__jobs__identical_to_serial(fret_requirements, jobs):
+    expected = render_testsuite(generate_robot_suite_from_fret(fret_requirements, LIBS))
+
+    result = render_testsuite_parallel(fret_requirements, LIBS, jobs)
+
+    assert result == expected
+
+
+def test__render_testsuite_parallel__no_requirements__only_header():
+    expected = render_testsuite(generate_robot_suite_from_fret([], LIBS))
+
+    result = render_testsuite_parallel([], LIBS, 2)
+
+    assert result == expected
@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import itertools
+
+import pytest
+
+from fretish_robot.polling import PollingStrategy
+
+
+def _first_intervals(strategy: PollingStrategy, count: int = 5) -> list[float]:
+    return list(itertools.islice(strategy.intervals(), count))
+
+
+def test__intervals__fixed__repeats_interval():
+    strategy = PollingStrategy(backoff="fixed", interval=0.01)
+
+    assert _first_intervals(strategy) == [0.01] * 5
+
+
+def test__intervals__exponential__doubles():
+    strategy = PollingStrategy(backoff="exponential", interval=1, max_interval=2)
+
+    assert _first_intervals(strategy) == [1, 2, 4, 8, 16]
+
+
+def test__intervals__capped__stops_at_max_interval():
+    strategy = PollingStrategy(backoff="capped", interval=1, max_interval=5)
+
+    assert _first_intervals(strategy) == [1, 2, 4, 5, 5]
+
+
+def test__polling_strategy__unknown_backoff__raises():
+    with pytest.raises(ValueError, match="Unknown backoff"):
+        PollingStrategy(backoff="linear")
+
+
+@pytest.mark.parametrize("interval", [0, -0.01])
+def test__polling_strategy__non_positive_interval__raises(interval):
+    with pytest.raises(ValueError, match="must be positive"):
+        PollingStrategy(backoff="fixed", interval=interval)
+
+
+def test__polling_strategy__max_interval_below_interval__raises():
+    with pytest.raises(ValueError, match="below the polling interval"):
+        PollingStrategy(backoff="capped", interval=0.1, max_interval=0.05)
+
+
+def test__polling_strategy__fixed_above_default_max_interval__allowed():
+    strategy = PollingStrategy(backoff="fixed", interval=0.1)
+
+    assert _first_intervals(strategy, 2) == [0.1, 0.1]
@@ -0,0 +1,144 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import dataclasses
+import io
+import pathlib
+import subprocess
+import textwrap
+
+from fretish_robot.combinations import CombinationStrategy
+from fretish_robot.generate_robot import (
+    generate_robot_suite_from_fret,
+    iter_generated_tests,
+)
+from fretish_robot.preflight import check_keywords, write_keyword_table
+from fretish_robot.requirements import load_fret_requirements
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+REPO_DIR = pathlib.Path(__file__).parent.parent
+FRET_FILE = REPO_DIR / "tests" / "testfiles" / "fret_requirements.json"
+EXAMPLE_DIR = REPO_DIR / "examples" / "digital_microscope" / "assets"
+
+
+def test__check_keywords__example_lib__all_resolved():
+    tests = iter_generated_tests(load_fret_requirements(FRET_FILE))
+
+    uses = {use.name: use for use in check_keywords(tests, LIBS)}
+
+    assert not any(use.missing for use in uses.values())
+    assert uses["In second mode"].kind == "mode"
+    assert uses["request_to_set_one"].kind == "event"
+    assert uses["result"].resolved == f"{LIBS[0]}.result"
+    assert sorted(uses["result"].req_ids) == ["REQ-123", "REQ-125", "REQ-126"]
+
+
+def test__check_keywords__unknown_event__missing():
+    fret_req = dataclasses.replace(
+        load_fret_requirements(FRET_FILE)[0], trigger_event="(no_such_event & x)"
+    )
+
+    uses = check_keywords(iter_generated_tests([fret_req]), LIBS)
+
+    missing = [use.name for use in uses if use.missing]
+    assert missing == ["no_such_event", "x"]
+
+
+def test__check_keywords__template_rows__checked_like_steps():
+    combinations = CombinationStrategy(template=True)
+    tests = iter_generated_tests(load_fret_requirements(FRET_FILE), combinations)
+
+    uses = check_keywords(tests, LIBS)
+
+    assert "In second mode" in [use.name for use in uses]
+    assert not any(use.missing for use in uses)
+
+
+def test__check_keywords__embedded_arguments__resolved():
+    tests = iter_generated_tests(load_fret_requirements(EXAMPLE_DIR / "req_fret.json"))
+    library = str(EXAMPLE_DIR / "robot_files" / "DigitalMicroscopeLib.py")
+
+    uses = {use.name: use for use in check_keywords(tests, [library])}
+
+    assert uses["request_move_up"].resolved == "DigitalMicroscopeLib.request_move_up"
+    assert uses["In normal mode"].resolved == "DigitalMicroscopeLib.In normal mode"
+
+
+SAMPLER_LIB = """
+from robot.api.deco import not_keyword
+
+class SamplerLib:
+    SAMPLED_SIGNALS = ("result",)
+
+    def in_test_mode(self):
+        pass
+
+    def in_second_mode(self):
+        pass
+
+    def request_to_set_two(self):
+        pass
+
+    @not_keyword
+    def sample_signals(self, names):
+        return {"result": 2} if "result" in names else {}
+"""
+
+
+def _sampler_lib(tmp_path: pathlib.Path) -> str:
+    library = tmp_path / "SamplerLib.py"
+    library.write_text(textwrap.dedent(SAMPLER_LIB))
+    return str(library)
+
+
+def test__check_keywords__sampler_lib__only_declared_signals_sampled(tmp_path):
+    tests = iter_generated_tests(load_fret_requirements(FRET_FILE)[:1])
+
+    uses = {use.name: use for use in check_keywords(tests, [_sampler_lib(tmp_path)])}
+
+    assert uses["result"].sampled
+    assert uses["get_true"].missing
+    assert uses["get_random_bool"].missing
+
+
+def test__check_keywords__microscope_example__all_resolved_or_sampled():
+    tests = iter_generated_tests(load_fret_requirements(EXAMPLE_DIR / "req_fret.json"))
+    library = str(EXAMPLE_DIR / "robot_files" / "DigitalMicroscopeLib.py")
+
+    uses = check_keywords(tests, [library])
+
+    assert not any(use.missing for use in uses)
+
+
+def test__fret_to_robot_check__sampler_lib_unresolved_signal__fails(tmp_path):
+    process = subprocess.run(
+        [
+            "fret-to-robot",
+            "--check",
+            FRET_FILE,
+            "--extra-libraries",
+            _sampler_lib(tmp_path),
+            "--robot-output-folder",
+            tmp_path,
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert process.returncode == 1
+    assert "MISSING  signal  get_true" in process.stdout
+    assert "sampled  signal  result" in process.stdout
+
+
+def test__fretlib__keyword_table__runs_qualified_keywords(tmp_path):
+    fret_requirements = load_fret_requirements(FRET_FILE)
+    uses = check_keywords(iter_generated_tests(fret_requirements), LIBS)
+    write_keyword_table(uses, tmp_path)
+    suite = generate_robot_suite_from_fret(fret_requirements, LIBS)
+    suite.resource.imports[0].args = (
+        f"keyword_table={tmp_path / 'keyword_table.json'}",
+    )
+
+    result = suite.run(output=None, log=None, report=None, stdout=io.StringIO())
+
+    assert result.return_code == 0
@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import json
+import pathlib
+
+import pytest
+
+from fretish_robot import requirements
+from fretish_robot.requirements import (
+    _iter_json_array,
+    _transform_to_fret_req,
+    iter_fret_requirements,
+    iter_sorted_fret_requirements,
+)
+
+FRET_REQUIREMENTS_FILE = (
+    pathlib.Path(__file__).parent / "testfiles" / "fret_requirements.json"
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test__iter_fret_requirements__different_chunk_sizes__same_as_json_load(
+    chunk_size, monkeypatch
+):
+    monkeypatch.setattr(requirements, "_READ_CHUNK_SIZE", chunk_size)
+    with open(FRET_REQUIREMENTS_FILE) as f:
+        expected = [_transform_to_fret_req(req) for req in json.load(f)]
+
+    result = list(iter_fret_requirements(FRET_REQUIREMENTS_FILE))
+
+    assert result == expected
+
+
+def test__iter_sorted_fret_requirements__unordered_export__sorted_by_id():
+    expected = sorted(
+        iter_fret_requirements(FRET_REQUIREMENTS_FILE), key=lambda r: r.req_id
+    )
+
+    result = list(iter_sorted_fret_requirements(FRET_REQUIREMENTS_FILE))
+
+    assert result == expected
+    assert [r.req_id for r in result] != [
+        r.req_id for r in iter_fret_requirements(FRET_REQUIREMENTS_FILE)
+    ]
+
+
+@pytest.mark.parametrize(
+    "content,expected",
+    [
+        ("[]", []),
+        (' [ 12 , 345, {"a": [1, 2]} ] ', [12, 345, {"a": [1, 2]}]),
+        ('[{"a": "]"},\n{"b": ","}]', [{"a": "]"}, {"b": ","}]),
+    ],
+)
+def test__iter_json_array__small_chunks__all_elements(content, expected, monkeypatch):
+    monkeypatch.setattr(requirements, "_READ_CHUNK_SIZE", 2)
+
+    result = list(_iter_json_array(io.StringIO(content)))
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("content", ["", "{}", "[1, 2", "[1 2]"])
+def test__iter_json_array__invalid_content__raises(content):
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(io.StringIO(content)))
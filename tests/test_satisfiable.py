@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+from fretish_robot.satisfiable import compile_satisfiable, with_sampled_values
+
+
+@pytest.mark.parametrize(
+    "expr,values,expected",
+    [
+        ("($result == 2)", {"result": 2}, True),
+        ("($result == 2)", {"result": 1}, False),
+        ("((1 <= $result) and ($result <= 2))", {"result": 3}, False),
+        ("when $a then ($b and $c)", {"a": False, "b": False, "c": False}, True),
+        ("when $a then ($b and $c)", {"a": True, "b": True, "c": False}, False),
+        ("when $a then ($b and $c)", {"a": True, "b": True, "c": True}, True),
+        ("$pass and not $in", {"pass": True, "in": False}, True),
+    ],
+)
+def test__compile_satisfiable__evaluate__correct_result(expr, values, expected):
+    result = compile_satisfiable(expr).evaluate(values)
+
+    assert result == expected
+
+
+def test__compile_satisfiable__repeated_vars__each_var_listed_once():
+    result = compile_satisfiable("when ($a > 1) then ($a < $b) and $when_done")
+
+    assert result.variables == ("a", "b", "when_done")
+    assert result.pre_cond_expression == "($a > 1)"
+    assert result.check_expression == "($a < $b) and $when_done"
+
+
+def test__compile_satisfiable__same_expression__compiled_once():
+    assert compile_satisfiable("$x == 1") is compile_satisfiable("$x == 1")
+
+
+def test__compiled_satisfiable__invalid_types__raises_with_expression():
+    with pytest.raises(RuntimeError, match=r"'\$x < 1' failed: TypeError"):
+        compile_satisfiable("$x < 1").evaluate({"x": "a"})
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        ({}, "failed."),
+        ({"a": 1, "b": "x"}, "failed. Sampled values: $a=1, $b='x'"),
+    ],
+)
+def test__with_sampled_values__values__appended_if_any(values, expected):
+    assert with_sampled_values("failed.", values) == expected
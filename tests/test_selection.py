@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+
+import robot
+import robot.api
+
+from fretish_robot.generate_robot import iter_generated_tests
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.selection import (
+    load_signal_index,
+    robot_options,
+    select_tests,
+    signal_index,
+    write_signal_index,
+)
+from fretish_robot.writer import write_generated_tests
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+FRET_FILE = pathlib.Path(__file__).parent / "testfiles" / "fret_requirements.json"
+
+
+def _index() -> dict:
+    fret_requirements = sorted(
+        load_fret_requirements(FRET_FILE), key=lambda r: r.req_id
+    )
+    return signal_index(iter_generated_tests(fret_requirements))
+
+
+def test__signal_index__fixture_requirements__keywords_map_to_tests():
+    index = _index()
+
+    assert index["keywords"]["In second mode"] == {
+        "kind": "mode",
+        "tests": ["TEST_REQ-125-2"],
+    }
+    assert index["keywords"]["request_to_set_one"]["tests"] == ["TEST_REQ-126-1"]
+    assert index["keywords"]["get_random_bool"]["kind"] == "signal"
+    assert index["tests"]["TEST_REQ-126-2"] == ["REQ-126"]
+
+
+def test__signal_index__mode__indexed_by_bare_name_and_embedded_keyword():
+    index = _index()
+
+    assert index["keywords"]["second"]["tests"] == ["TEST_REQ-125-2"]
+    assert "TEST_REQ-125-2" in index["keywords"]["In ${mode_name} mode"]["tests"]
+
+
+def test__select_tests__embedded_mode_keyword__all_mode_tests_selected():
+    tests, unknown = select_tests(_index(), ["In ${mode} mode"])
+
+    assert tests == [
+        "TEST_REQ-123-1",
+        "TEST_REQ-125-1",
+        "TEST_REQ-125-2",
+        "TEST_REQ-126-1",
+        "TEST_REQ-126-2",
+    ]
+    assert unknown == []
+
+
+def test__select_tests__keyword_name_differently_written__selected():
+    tests, unknown = select_tests(_index(), ["Request To Set One", "unknown_signal"])
+
+    assert tests == ["TEST_REQ-126-1"]
+    assert unknown == ["unknown_signal"]
+
+
+def test__robot_options__all_tests_of_requirement__selected_by_tag():
+    index = _index()
+    tests, _ = select_tests(index, ["get_random_bool", "request_to_set_one"])
+
+    assert robot_options(index, tests) == [
+        "--include",
+        "REQID=REQ-125",
+        "--test",
+        "TEST_REQ-123-1",
+        "--test",
+        "TEST_REQ-126-1",
+    ]
+
+
+def test__robot_options__generated_suite__runs_only_selected_tests(tmp_path):
+    fret_requirements = load_fret_requirements(FRET_FILE)
+    write_generated_tests(iter_generated_tests(fret_requirements), LIBS, tmp_path)
+    write_signal_index(signal_index(iter_generated_tests(fret_requirements)), tmp_path)
+    index = load_signal_index(tmp_path)
+    tests, _ = select_tests(index, ["In test mode", "request_to_set_one"])
+
+    robot.run_cli(
+        [*robot_options(index, tests), "--outputdir", str(tmp_path), str(tmp_path)],
+        exit=False,
+    )
+
+    result = robot.api.ExecutionResult(tmp_path / "output.xml")
+    assert sorted(test.name for test in result.suite.all_tests) == [
+        "TEST_REQ-123-1",
+        "TEST_REQ-125-1",
+        "TEST_REQ-126-1",
+        "TEST_REQ-126-2",
+    ]
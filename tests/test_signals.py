@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib.util
+import pathlib
+import threading
+
+from fretish_robot.signals import SignalChanges, sample_signals
+
+EXAMPLE_LIB_FILE = (
+    pathlib.Path(__file__).parent.parent
+    / "examples"
+    / "digital_microscope"
+    / "assets"
+    / "robot_files"
+    / "DigitalMicroscopeLib.py"
+)
+
+
+def _read_signal(name: str) -> str:
+    return f"read {name}"
+
+
+def test__sample_signals__no_samplers__reads_each_signal():
+    result = sample_signals(["a", "b"], [], _read_signal)
+
+    assert result == {"a": "read a", "b": "read b"}
+
+
+def test__sample_signals__partial_sampler__reads_remaining_signals():
+    calls = []
+
+    def sampler(names):
+        calls.append(list(names))
+        return {"b": "batched b", "unrequested": 0}
+
+    result = sample_signals(["a", "b", "c"], [sampler], _read_signal)
+
+    assert result == {"a": "read a", "b": "batched b", "c": "read c"}
+    assert list(result) == ["a", "b", "c"]
+    assert calls == [["a", "b", "c"]]
+
+
+def test__sample_signals__several_samplers__later_ones_get_remaining_signals():
+    calls = []
+
+    def first(names):
+        calls.append(list(names))
+        return {"a": 1}
+
+    def second(names):
+        calls.append(list(names))
+        return {"b": 2}
+
+    result = sample_signals(["a", "b"], [first, second], _read_signal)
+
+    assert result == {"a": 1, "b": 2}
+    assert calls == [["a", "b"], ["b"]]
+
+
+def test__signal_changes_wait__other_signal_changed__times_out():
+    changes = SignalChanges()
+    version = changes.version
+    changes.notify("other")
+
+    assert not changes.wait(["result"], version, timeout=0.01)
+
+
+def test__signal_changes_wait__signal_changed_in_thread__returns_true():
+    changes = SignalChanges()
+    version = changes.version
+    threading.Timer(0.01, changes.notify, args=["result"]).start()
+
+    assert changes.wait(["result"], version, timeout=5)
+
+
+class _FakeZephyrLibrary:
+    def __init__(self):
+        self.threads = set()
+        self.commands = []
+
+    def run_command(self, command):
+        self.threads.add(threading.current_thread())
+        self.commands.append(command)
+        return [
+            "Tube is on hold",
+            "Tube is in the upper position (height: 10)",
+            "Configured illumination value: 50",
+            "Minimum illumination value: 0",
+        ]
+
+
+def _microscope_lib():
+    spec = importlib.util.spec_from_file_location(
+        "DigitalMicroscopeLib", EXAMPLE_LIB_FILE
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    library = module.DigitalMicroscopeLib()
+    library._lib = _FakeZephyrLibrary()
+    return library
+
+
+def test__microscope_sample_signals__background_thread__sampled_without_keywords():
+    library = _microscope_lib()
+    names = ["tube_at_upper_end", "tube_position_hold", "min_brightness"]
+    values = {}
+    thread = threading.Thread(
+        target=lambda: values.update(library.sample_signals(names))
+    )
+
+    thread.start()
+    thread.join()
+
+    assert values == {
+        "tube_at_upper_end": True,
+        "tube_position_hold": True,
+        "min_brightness": 0,
+    }
+    assert library._lib.threads == {thread}
+
+
+def test__microscope_reset_signals__device_signals__reset_in_shared_mode():
+    library = _microscope_lib()
+    library._shared_scope = "normal"
+
+    library.reset_signals(["tube_moving_upwards", "answer_request_ok"])
+
+    assert library._lib.commands == ["system reset", "mode set normal"]
+
+
+def test__microscope_reset_signals__answer_signals_only__no_device_reset():
+    library = _microscope_lib()
+    library._shared_scope = "normal"
+
+    library.reset_signals(["answer_request_denied"])
+
+    assert library._lib.commands == []
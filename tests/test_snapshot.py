@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import threading
+
+from fretish_robot.snapshot import snapshot_cached, timepoint
+
+
+class _Device:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    @snapshot_cached
+    def query(self, command: str) -> str:
+        self.queries.append(command)
+        return f"{command} {len(self.queries)}"
+
+
+def test__snapshot_cached__same_timepoint__queried_once():
+    device = _Device()
+
+    with timepoint():
+        first = device.query("get")
+        second = device.query("get")
+
+    assert first == second
+    assert device.queries == ["get"]
+
+
+def test__snapshot_cached__different_arguments__queried_each():
+    device = _Device()
+
+    with timepoint():
+        device.query("get a")
+        device.query("get b")
+
+    assert device.queries == ["get a", "get b"]
+
+
+def test__snapshot_cached__next_timepoint__queried_again():
+    device = _Device()
+
+    with timepoint():
+        device.query("get")
+    with timepoint():
+        device.query("get")
+
+    assert device.queries == ["get", "get"]
+
+
+def test__snapshot_cached__outside_timepoint__not_cached():
+    device = _Device()
+
+    device.query("get")
+    device.query("get")
+
+    assert device.queries == ["get", "get"]
+
+
+def test__snapshot_cached__other_thread__not_shared():
+    device = _Device()
+
+    with timepoint():
+        device.query("get")
+        thread = threading.Thread(target=device.query, args=["get"])
+        thread.start()
+        thread.join()
+
+    assert device.queries == ["get", "get"]
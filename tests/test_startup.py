@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+import sys
+
+# Startup budgets in milliseconds, generous for slow CI machines. Importing
+# Robot Framework alone takes about 200 ms, which the CLI must not pay.
+CLI_BUDGET_MS = 120
+FRETLIB_BUDGET_MS = 120
+
+HELP_CODE = """
+import sys
+from fretish_robot.cli import main
+sys.argv = ["fret-to-robot", "--help"]
+try:
+    main()
+except SystemExit:
+    pass
+"""
+
+
+def _import_times(code: str) -> dict[str, float]:
+    """Runs `code` with `-X importtime` and returns the cumulative import time
+    (in milliseconds) of each imported module."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test__import_cli__no_robot_framework__within_budget():
+    times = _import_times("import fretish_robot.cli")
+
+    assert not [name for name in times if name.split(".")[0] == "robot"]
+    assert times["fretish_robot.cli"] < CLI_BUDGET_MS
+
+
+def test__cli_help__no_generation_imported():
+    times = _import_times(HELP_CODE)
+
+    assert "robot" not in times
+    assert "fretish_robot.generate_robot" not in times
+    assert "fretish_robot.writer" not in times
+
+
+def test__import_fretlib__fresh_process__within_budget():
+    times = _import_times("import fretish_robot.FRETLib")
+
+    # Robot Framework itself is imported by every run, only FRETLib's share counts
+    assert times["fretish_robot.FRETLib"] - times["robot"] < FRETLIB_BUDGET_MS
+    assert "robot.libraries.BuiltIn" not in times
+    assert "fretish_robot.traces" not in times
+    assert "cProfile" not in times
+
+
+def test__import_fretlib__fresh_process__builtin_loaded_lazily():
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, fretish_robot.FRETLib; print(*sys.modules, sep='\\n')",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert "robot.libraries.BuiltIn" not in completed.stdout.splitlines()
+
+
+def test__import_signals__no_robot_framework():
+    times = _import_times("import fretish_robot.signals")
+
+    assert not [name for name in times if name.split(".")[0] == "robot"]
@@ -0,0 +1,109 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import csv
+import json
+
+import pytest
+
+from fretish_robot.timings import TimingRecord, TimingRecorder, summarize
+
+
+def _record(
+    req_id="REQ-1",
+    satisfied: float | None = 1.0,
+    triggered: float | None = None,
+    deadline: float | None = None,
+) -> TimingRecord:
+    return TimingRecord(
+        req_id=req_id,
+        test=f"TEST_{req_id}-1",
+        keyword="Within",
+        started=0.5,
+        first_sample=0.5,
+        triggered=triggered,
+        satisfied=satisfied,
+        deadline=deadline,
+    )
+
+
+@pytest.mark.parametrize(
+    "record, latency, headroom",
+    [
+        (_record(satisfied=1.0), 0.5, None),
+        (_record(satisfied=1.0, triggered=0.0), 1.0, None),
+        (_record(satisfied=1.0, deadline=1.2), 0.5, pytest.approx(0.2)),
+        (_record(satisfied=None, deadline=1.2), None, None),
+    ],
+)
+def test__timing_record__different_timestamps__correct_latency_and_headroom(
+    record, latency, headroom
+):
+    assert record.latency == latency
+    assert record.headroom == headroom
+
+
+def test__summarize__several_records__percentiles_per_requirement():
+    records = [_record(satisfied=0.5 + ms / 1000) for ms in range(1, 101)]
+    records.append(_record(req_id="REQ-2", satisfied=None))
+
+    summary = summarize(records)
+
+    assert summary["REQ-1"]["count"] == 100
+    assert summary["REQ-1"]["p50_ms"] == 50.5
+    assert summary["REQ-1"]["p99_ms"] == 99.01
+    assert summary["REQ-1"]["max_ms"] == 100
+    assert summary["REQ-2"] == {
+        "count": 1,
+        "satisfied": 0,
+        "p50_ms": None,
+        "p90_ms": None,
+        "p99_ms": None,
+        "max_ms": None,
+        "min_headroom_ms": None,
+        "histogram": summary["REQ-2"]["histogram"],
+    }
+    assert sum(summary["REQ-2"]["histogram"].values()) == 0
+
+
+def test__summarize__latencies__counted_in_histogram_buckets():
+    records = [
+        _record(satisfied=0.5 + 0.0005),
+        _record(satisfied=0.5 + 0.015),
+        _record(satisfied=0.5 + 10),
+    ]
+
+    histogram = summarize(records)["REQ-1"]["histogram"]
+
+    assert histogram["<=1ms"] == 1
+    assert histogram["<=20ms"] == 1
+    assert histogram[">5000ms"] == 1
+    assert sum(histogram.values()) == 3
+
+
+def test__write_csv__records__one_row_per_record(tmp_path):
+    recorder = TimingRecorder()
+    recorder.add(_record(satisfied=0.6, deadline=0.7))
+    recorder.add(_record(satisfied=None))
+
+    recorder.write_csv(tmp_path / "timings.csv")
+
+    with open(tmp_path / "timings.csv", newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [row["latency_ms"] for row in rows] == ["100.0", ""]
+    assert rows[0]["headroom_ms"] == "100.0"
+
+
+def test__write_json__records__raw_timestamps_included(tmp_path):
+    recorder = TimingRecorder()
+    recorder.add(_record(triggered=0.25, satisfied=0.6, deadline=0.7))
+
+    recorder.write_json(tmp_path / "timings.json")
+
+    with open(tmp_path / "timings.json") as json_file:
+        record = json.load(json_file)["records"][0]
+    assert record["triggered"] == 0.25
+    assert record["first_sample"] == 0.5
+    assert record["satisfied"] == 0.6
+    assert record["deadline"] == 0.7
+    assert record["latency_ms"] == 350.0
@@ -0,0 +1,151 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import pathlib
+
+import pytest
+
+from fretish_robot import fretish
+from fretish_robot.requirements import FRETRequirement, load_fret_requirements
+
+np = pytest.importorskip("numpy")
+
+from fretish_robot.trace_eval import (  # noqa: E402
+    Trace,
+    TraceEvaluator,
+    check_trace,
+    load_trace,
+)
+
+EXAMPLE_REQUIREMENTS = (
+    pathlib.Path(__file__).parents[1]
+    / "examples"
+    / "digital_microscope"
+    / "assets"
+    / "req_fret.json"
+)
+
+
+def _requirement(ft: str, scope_mode: str | None = None) -> FRETRequirement:
+    return FRETRequirement(
+        req_id="REQ-1",
+        requirement_phrase="",
+        scope_mode=scope_mode,
+        trigger_event=None,
+        timing="",
+        condition_to_check="",
+        variables=(),
+        ft=ft,
+    )
+
+
+def _signal(*samples: tuple[float, object]) -> tuple[np.ndarray, np.ndarray]:
+    times, values = zip(*samples)
+    return np.asarray(times, float), np.asarray(values)
+
+
+def _response_trace(done_at: float) -> Trace:
+    return Trace(
+        signals={"done": _signal((0.0, False), (done_at, True), (0.01, True))},
+        events={"request": np.asarray([0.002])},
+    )
+
+
+@pytest.mark.parametrize(
+    "done_at, holds, violated_at",
+    [(0.004, True, None), (0.006, False, 0.002)],
+)
+def test__check__bounded_response__verdict_with_violation_time(
+    done_at, holds, violated_at
+):
+    evaluator = TraceEvaluator(_response_trace(done_at), step=0.001)
+
+    verdict = evaluator.check(_requirement("(LAST V (request -> (F[<=2] done)))"))
+
+    assert verdict.holds is holds
+    assert verdict.violated_at == (
+        None if violated_at is None else pytest.approx(violated_at)
+    )
+
+
+def test__check__unrecorded_signal__error_verdict():
+    evaluator = TraceEvaluator(_response_trace(0.004))
+
+    verdict = evaluator.check(_requirement("(LAST V (request -> unknown))"))
+
+    assert not verdict.holds
+    assert "'unknown' is not recorded" in verdict.error
+
+
+def test__check__unparsable_formula__error_verdict():
+    evaluator = TraceEvaluator(_response_trace(0.004))
+
+    verdict = evaluator.check(_requirement("(LAST V (request -> ))"))
+
+    assert not verdict.holds
+    assert verdict.error is not None
+
+
+def test__column__signal_sampled_irregularly__holds_last_value():
+    trace = Trace(
+        signals={"result": _signal((0.0, 0), (0.0015, 2), (0.003, 3))}, events={}
+    )
+    evaluator = TraceEvaluator(trace, step=0.001)
+
+    assert evaluator.column("result").tolist() == [0, 0, 2, 3]
+
+
+def test__column__mode_variables__true_in_entered_modes():
+    trace = Trace(
+        signals={"x": _signal((0.0, 0), (0.005, 0))},
+        events={},
+        modes=_signal((0.0, "idle"), (0.002, "capture"), (0.004, "idle")),
+    )
+    evaluator = TraceEvaluator(trace, step=0.001)
+    variable = "_DQT__LPR_capture_VBR_live_RPR__DQT_"
+    modes = {variable: ["capture", "live"]}
+
+    assert evaluator.column(variable, modes).tolist() == [0, 0, 1, 1, 0, 0]
+    assert evaluator.column(f"Fin_{variable}", modes).tolist() == [0, 1, 0, 0, 0, 0]
+    assert evaluator.column(f"Lin_{variable}", modes).tolist() == [0, 0, 0, 1, 0, 0]
+
+
+def test__check_trace__scoped_requirement__only_checked_in_mode():
+    trace = Trace(
+        signals={"ok": _signal((0.0, False), (0.002, True), (0.004, False))},
+        events={},
+        modes=_signal((0.0, "idle"), (0.002, "test"), (0.004, "idle")),
+    )
+    scope_mode = '"(test|second)"'
+    variable = "_DQT__LPR_test_VBR_second_RPR__DQT_"
+
+    [verdict] = check_trace(
+        [_requirement(f"(LAST V ({variable} -> ok))", scope_mode)], trace
+    )
+
+    assert verdict.holds
+
+
+def test__load_trace__csv__signals_and_modes(tmp_path):
+    path = tmp_path / "bench.csv"
+    path.write_text("time,mode,result,ready\n0,idle,0,false\n0.002,test,2,true\n")
+
+    trace = load_trace(path)
+
+    assert trace.signals["result"][1].tolist() == [0, 2]
+    assert trace.signals["ready"][1].tolist() == [False, True]
+    assert trace.modes[1].tolist() == ["idle", "test"]
+    assert trace.duration == pytest.approx(0.002)
+
+
+def test__evaluate__example_formulas__boolean_per_timepoint():
+    trace = Trace(signals={"x": _signal((0.0, 0), (0.01, 0))}, events={})
+    evaluator = TraceEvaluator(trace, step=0.001)
+
+    def column(name: str) -> np.ndarray:
+        return np.zeros(evaluator.length, bool)
+
+    for fret_req in load_fret_requirements(EXAMPLE_REQUIREMENTS, formulas=True):
+        values = evaluator.evaluate(fretish.parse(fret_req.ft, temporal=True), column)
+        assert values.dtype == bool
+        assert values.shape == (evaluator.length,)
@@ -0,0 +1,194 @@
+# SPDX-FileCopyrightText: Copyright 2023–2024 Carl Zeiss Meditec AG
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import pathlib
+
+import pytest
+import robot
+
+from fretish_robot.combinations import CombinationStrategy
+from fretish_robot.generate_robot import (
+    deduplicate_tests,
+    generate_robot_suite_from_fret,
+    generate_scope_suites,
+)
+from fretish_robot.requirements import load_fret_requirements
+from fretish_robot.writer import (
+    render_requirements,
+    render_testsuite,
+    write_merge_report,
+    write_requirements,
+    write_testsuite,
+    write_testsuite_content,
+    write_testsuites,
+)
+
+LIBS = ["fretish_robot.example_user_lib.ExampleUserLib"]
+REPO_DIR = pathlib.Path(__file__).parent.parent
+FRET_FILES = [
+    REPO_DIR / "tests" / "testfiles" / "fret_requirements.json",
+    REPO_DIR / "examples" / "digital_microscope" / "assets" / "req_fret.json",
+]
+
+
+@pytest.fixture
+def testsuite():
+    fret_requirements = sorted(
+        load_fret_requirements(FRET_FILES[0]), key=lambda r: r.req_id
+    )
+    return generate_robot_suite_from_fret(fret_requirements, LIBS)
+
+
+@pytest.mark.parametrize("fret_file", FRET_FILES)
+def test__render_requirements__fret_files__same_as_model_path(fret_file):
+    fret_requirements = sorted(
+        load_fret_requirements(fret_file), key=lambda r: r.req_id
+    )
+    expected = render_testsuite(generate_robot_suite_from_fret(fret_requirements, LIBS))
+
+    result = render_requirements(fret_requirements, LIBS)
+
+    assert result == expected
+
+
+def _test_names(robot_file: pathlib.Path) -> list[str]:
+    return [
+        line for line in robot_file.read_text().splitlines() if line.startswith("TEST_")
+    ]
+
+
+@pytest.mark.parametrize(
+    "shard_by,expected_files",
+    [
+        ("scope", ["tests_second.robot", "tests_test.robot"]),
+        (
+            "trigger",
+            ["tests_request_to_set_one.robot", "tests_request_to_set_two.robot"],
+        ),
+        ("prefix", ["tests_REQ.robot"]),
+    ],
+)
+def test__write_testsuite__shard_by_tag__one_file_per_tag_value(
+    testsuite, tmp_path, shard_by, expected_files
+):
+    write_testsuite(testsuite, tmp_path, shard_by=shard_by)
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == expected_files
+    all_tests = sum((_test_names(tmp_path / f) for f in files), [])
+    assert sorted(all_tests) == sorted(t.name for t in testsuite.tests)
+    for f in files:
+        assert f"Library    {LIBS[0]}" in (tmp_path / f).read_text()
+
+
+def test__write_testsuite__shard_by_duration__balanced_by_durations(
+    testsuite, tmp_path
+):
+    durations = {"TEST_REQ-123-1": 10.0, "TEST_REQ-125-1": 1.0, "TEST_REQ-126-2": 1.0}
+
+    write_testsuite(
+        testsuite,
+        tmp_path,
+        shard_by="duration",
+        shard_count=2,
+        test_durations=durations,
+    )
+
+    # TEST_REQ-125-2 and TEST_REQ-126-1 count with the average of 4 seconds
+    assert _test_names(tmp_path / "tests_1.robot") == ["TEST_REQ-123-1"]
+    assert _test_names(tmp_path / "tests_2.robot") == [
+        "TEST_REQ-125-1",
+        "TEST_REQ-125-2",
+        "TEST_REQ-126-1",
+        "TEST_REQ-126-2",
+    ]
+
+
+def test__write_testsuite__shards__run_as_directory(testsuite, tmp_path):
+    (tmp_path / "tests.robot").write_text("stale")
+    write_testsuite(testsuite, tmp_path / ".", shard_by="scope")
+
+    res = robot.run(tmp_path, output=None, report=None, log=None, stdout=None)
+
+    assert res == 0
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda suite, reqs, path: write_testsuite(suite, path),
+        lambda suite, reqs, path: write_requirements(reqs, LIBS, path),
+        lambda suite, reqs, path: write_testsuite_content(
+            render_testsuite(suite), path
+        ),
+    ],
+    ids=["write_testsuite", "write_requirements", "write_testsuite_content"],
+)
+def test__default_write__after_sharded_write__only_tests_robot_left(
+    write, testsuite, tmp_path
+):
+    fret_requirements = load_fret_requirements(FRET_FILES[0])
+    write_testsuite(testsuite, tmp_path, shard_by="scope")
+
+    write(testsuite, fret_requirements, tmp_path)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["tests.robot"]
+
+
+def test__write_testsuites__scope_suites__numbered_files_with_setups(tmp_path):
+    (tmp_path / "tests.robot").write_text("stale")
+    fret_requirements = load_fret_requirements(FRET_FILES[0])
+
+    write_testsuites(generate_scope_suites(fret_requirements, LIBS), tmp_path)
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["tests_1_test.robot", "tests_2_second.robot"]
+    content = (tmp_path / "tests_1_test.robot").read_text()
+    assert "Suite Setup    In test mode" in content
+    assert "Metadata    FRET Shared Scope    test" in content
+    assert "[Setup]    Reset Signals    result" in content
+
+
+def test__write_testsuites__scope_suites__run_as_directory(tmp_path):
+    fret_requirements = load_fret_requirements(FRET_FILES[0])
+    write_testsuites(generate_scope_suites(fret_requirements, LIBS), tmp_path)
+
+    res = robot.run(tmp_path, output=None, report=None, log=None, stdout=None)
+
+    assert res == 0
+
+
+def test__render_requirements__template__same_as_model_path():
+    fret_requirements = load_fret_requirements(FRET_FILES[0])
+    combinations = CombinationStrategy(template=True)
+    suite = generate_robot_suite_from_fret(fret_requirements, LIBS, combinations)
+
+    result = render_requirements(fret_requirements, LIBS, combinations)
+
+    assert result == render_testsuite(suite)
+    assert "[Template]    Check Combination" in result
+
+
+def test__write_requirements__template__all_rows_pass(tmp_path):
+    fret_requirements = load_fret_requirements(FRET_FILES[0])
+    combinations = CombinationStrategy(template=True)
+    write_requirements(fret_requirements, LIBS, tmp_path, combinations)
+
+    res = robot.run(tmp_path, output=None, report=None, log=None, stdout=None)
+
+    assert res == 0
+
+
+def test__write_merge_report__merged_tests__lists_reqids(tmp_path):
+    fret_requirements = sorted(
+        load_fret_requirements(FRET_FILES[0]), key=lambda r: r.req_id
+    )
+    tests = deduplicate_tests(fret_requirements)
+
+    write_merge_report(tests, tmp_path)
+
+    # REQ-125 checks the same as REQ-123 in test mode
+    with open(tmp_path / "merged_requirements.json") as report_file:
+        report = json.load(report_file)
+    assert report == {"TEST_REQ-123-1": ["REQ-123", "REQ-125"]}